@@ -76,7 +76,7 @@ echo 1. اذهب إلى: https://render.com
 echo 2. سجل دخول بحساب GitHub
 echo 3. اضغط "New +" → "Web Service"
 echo 4. اختر: %REPO_NAME%
-echo 5. Start Command: gunicorn web_app:app --bind 0.0.0.0:$PORT
+echo 5. Start Command: gunicorn web_app:app --bind 0.0.0.0:$PORT --workers 1 --worker-class gthread --threads 16
 echo 6. اضغط "Create Web Service"
 echo.
 echo بعد 3-5 دقائق سيكون التطبيق جاهز! 🎉
@@ -0,0 +1,150 @@
+"""
+نتائج تحليل قائمة المراقبة كاملة لمسار /api/analysis (من لقطة التحليل في الخلفية فقط)
+- صفحات بمؤشر (cursor) فوق نتائج اللقطة مرتبة حسب الحقل المطلوب
+  المؤشر يحفظ قيمة ورمز آخر صف في الصفحة (keyset) ووقت اللقطة التي أخذ منها
+  فإذا تحدثت اللقطة بين صفحتين يرفض المؤشر (StaleCursorError) ويبدأ العميل من الصفحة الأولى
+- تصفية حسب السوق: SA (أسهم .SR) أو US
+- بث NDJSON لصفوف اللقطة: سطر لكل سهم ثم سطر ملخص أخير
+"""
+
+import base64
+import json
+import math
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+from markets import MARKETS, get_market
+
+SORT_FIELDS = ('score', 'symbol', 'price', 'rsi')
+
+
+class CursorError(ValueError):
+    """مؤشر صفحة غير صالح أو لا يطابق الترتيب المطلوب"""
+
+
+class StaleCursorError(CursorError):
+    """المؤشر من لقطة أقدم من الحالية (الترتيب تغير - يجب البدء من الصفحة الأولى)"""
+
+
+def parse_market(market: Optional[str]) -> Optional[str]:
+    """رمز السوق بأحرف كبيرة (None = كل الأسواق)"""
+    if not market:
+        return None
+    market = market.upper()
+    if market not in MARKETS:
+        raise ValueError(f"سوق غير معروف: {market} (المتاح: {', '.join(sorted(MARKETS))})")
+    return market
+
+
+def filter_market(items: List, market: Optional[str], symbol=lambda item: item) -> List:
+    """
+    العناصر التي تنتمي للسوق المطلوب
+    :param symbol: دالة تعيد رمز السهم من العنصر (الافتراضي: العنصر نفسه رمز)
+    """
+    if market is None:
+        return list(items)
+    return [item for item in items if get_market(symbol(item)) == market]
+
+
+def _sort_key(row: Dict, sort: str) -> Tuple:
+    """مفتاح الترتيب: القيمة ثم الرمز (القيم المفقودة في آخر الترتيب التنازلي)"""
+    value = row.get(sort)
+    if isinstance(value, float) and math.isnan(value):
+        value = None
+    if sort == 'symbol':
+        return (True, '', row['symbol'])
+    return (value is not None, value if value is not None else 0, row['symbol'])
+
+
+def encode_cursor(row: Dict, sort: str, descending: bool, version: str = None) -> str:
+    """
+    مؤشر الصفحة التالية من آخر صف في الصفحة
+    :param version: معرف اللقطة التي أخذت منها الصفحة (مثلاً وقت تحديثها)
+    """
+    payload = [sort, descending, list(_sort_key(row, sort)), version]
+    return base64.urlsafe_b64encode(json.dumps(payload, default=float).encode()).decode().rstrip("=")
+
+
+def _valid_key(key, sort: str) -> bool:
+    """شكل مفتاح الترتيب كما ينتجه _sort_key"""
+    if not isinstance(key, list) or len(key) != 3:
+        return False
+    present, value, symbol = key
+    if not isinstance(present, bool) or not isinstance(symbol, str):
+        return False
+    if sort == 'symbol':
+        return isinstance(value, str)
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool, version: str = None) -> Tuple:
+    """مفتاح آخر صف من المؤشر"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != 4 or not _valid_key(payload[2], sort):
+            raise ValueError(payload)
+        cursor_sort, cursor_descending, key, cursor_version = payload
+    except (ValueError, TypeError) as e:
+        raise CursorError(f"مؤشر غير صالح: {cursor}") from e
+    if cursor_sort != sort or cursor_descending != descending:
+        raise CursorError("المؤشر يخص ترتيباً آخر")
+    if cursor_version != version:
+        raise StaleCursorError("تحدثت النتائج منذ الصفحة السابقة - ابدأ من الصفحة الأولى")
+    return tuple(key)
+
+
+def sort_rows(rows: Iterable[Dict], sort: str = "score", descending: bool = True) -> List[Dict]:
+    """الصفوف مرتبة حسب الحقل (الرمز يفصل بين المتساوية)"""
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"حقل ترتيب غير معروف: {sort} (المتاح: {', '.join(SORT_FIELDS)})")
+    return sorted(rows, key=lambda row: _sort_key(row, sort), reverse=descending)
+
+
+def paginate(rows: List[Dict], sort: str = "score", descending: bool = True,
+             limit: int = None, cursor: str = None, version: str = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    صفحة واحدة من النتائج مرتبة
+    :param sort: حقل الترتيب (SORT_FIELDS)
+    :param limit: عدد الصفوف في الصفحة (الافتراضي والحد الأقصى من config)
+    :param cursor: مؤشر الصفحة من الطلب السابق (None = الصفحة الأولى)
+    :param version: معرف اللقطة الحالية - المؤشر من لقطة أخرى يرفض بـ StaleCursorError
+    :return: (الصفوف، مؤشر الصفحة التالية أو None إذا كانت الأخيرة)
+    """
+    limit = min(limit or config.ANALYSIS_PAGE_SIZE, config.ANALYSIS_PAGE_MAX)
+    if limit < 1:
+        raise ValueError("عدد الصفوف يجب أن يكون 1 على الأقل")
+
+    ordered = sort_rows(rows, sort, descending)
+    if cursor:
+        after = decode_cursor(cursor, sort, descending, version)
+        if descending:
+            ordered = [row for row in ordered if _sort_key(row, sort) < after]
+        else:
+            ordered = [row for row in ordered if _sort_key(row, sort) > after]
+
+    page = ordered[:limit]
+    next_cursor = encode_cursor(page[-1], sort, descending, version) if len(ordered) > limit else None
+    return page, next_cursor
+
+
+def _json_default(value):
+    """قيم numpy وpandas في JSON"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def to_ndjson(data: Dict) -> str:
+    """سطر NDJSON واحد"""
+    return json.dumps(data, ensure_ascii=False, default=_json_default) + "\n"
+
+
+def stream_rows(rows: List[Dict], summary: Dict = None) -> Iterator[str]:
+    """
+    سطر NDJSON لكل صف ثم سطر ملخص أخير {"done": true, "count": ..., ...}
+    :param summary: حقول إضافية في سطر الملخص (مثل وقت اللقطة)
+    """
+    for row in rows:
+        yield to_ndjson(row)
+    yield to_ndjson({'done': True, 'count': len(rows), **(summary or {})})
@@ -0,0 +1,246 @@
+"""
+لقطة تحليل قائمة الأسهم محسوبة في الخلفية
+- خيط واحد يحلل config.WATCHLIST كاملة كل فترة ويستبدل اللقطة دفعة واحدة
+- الطلبات تقرأ آخر لقطة جاهزة فقط (بدون جلب بيانات أو حساب مؤشرات داخل الطلب)
+- لكل مجموعة مؤشرات مسموحة (حسب باقات الاشتراك) نتائجها داخل نفس اللقطة
+  من نفس الشموع والمؤشرات المحسوبة مرة واحدة
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import config
+from clock import wall_clock
+from metrics import stage
+from risk_management import RiskManager
+from scanner import WatchlistScanner
+from technical_analysis import TechnicalAnalyzer, analyze_stock, resolve_indicator_groups
+
+
+def indicator_key(allowed: List[str] = None) -> str:
+    """مفتاح مجموعة المؤشرات المسموحة في اللقطة ('all' = الكل)"""
+    return 'all' if allowed is None else ','.join(sorted(allowed))
+
+
+def analysis_row(symbol: str, analysis: Dict) -> Dict:
+    """صف سهم واحد في النتائج من ناتج analyze_stock"""
+    return {
+        'symbol': symbol,
+        'price': analysis['analysis']['price'],
+        'recommendation': analysis['recommendation'],
+        'score': analysis['score'],
+        'rsi': analysis['analysis']['rsi_value'],
+        'buy_signals': analysis.get('buy_signals', []),
+        'sell_signals': analysis.get('sell_signals', [])
+    }
+
+
+def build_view(results: List[Dict]) -> Dict:
+    """
+    نتائج مرتبة حسب النقاط مع أفضل فرصة ومحاكاة إدارة المخاطر لها
+    :param results: صف لكل سهم (symbol, price, recommendation, score, rsi, buy_signals, sell_signals)
+    """
+    stocks = sorted(results, key=lambda x: x['score'], reverse=True)
+
+    best = None
+    if stocks and stocks[0]['score'] > 0:
+        best_stock = stocks[0]
+
+        # حساب إدارة المخاطر
+        rm = RiskManager(initial_capital=10000, max_risk_per_trade=0.02, verbose=False)
+        entry_price = best_stock['price']
+        stop_loss = entry_price * 0.98
+        take_profit = entry_price * 1.05
+        position_size = rm.calculate_position_size(best_stock['symbol'], entry_price, stop_loss)
+
+        if position_size > 0:
+            best = {
+                'symbol': best_stock['symbol'],
+                'price': entry_price,
+                'position_size': position_size,
+                'total_value': position_size * entry_price,
+                'stop_loss': stop_loss,
+                'take_profit': take_profit,
+                'risk_amount': position_size * (entry_price - stop_loss)
+            }
+
+    return {'stocks': stocks, 'best_opportunity': best}
+
+
+@dataclass(frozen=True)
+class AnalysisSnapshot:
+    """نتائج تحليل واحدة كاملة - لا تتغير بعد إنشائها (التحديث ينشئ لقطة جديدة)"""
+    views: Dict[str, Dict]          # indicator_key -> {'stocks', 'best_opportunity'}
+    updated_at: datetime
+    duration: float                 # زمن الحساب بالثواني
+    symbols: int
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def view(self, allowed: List[str] = None) -> Optional[Dict]:
+        """نتائج مجموعة المؤشرات المسموحة (None إذا لم تحسب في هذه اللقطة)"""
+        return self.views.get(indicator_key(allowed))
+
+    def age(self, now: datetime = None) -> float:
+        """عمر اللقطة بالثواني"""
+        now = now or datetime.now(self.updated_at.tzinfo)
+        return (now - self.updated_at).total_seconds()
+
+
+class SnapshotRefresher:
+    """تحديث لقطة التحليل في خيط خلفي"""
+
+    def __init__(self, symbols: List[str] = None, interval: float = None,
+                 indicator_sets: List[Optional[List[str]]] = None, period: str = "6mo",
+                 clock=None):
+        """
+        :param symbols: الأسهم (الافتراضي config.WATCHLIST كاملة)
+        :param interval: الفاصل بين التحديثات بالثواني (الافتراضي من config)
+        :param indicator_sets: مجموعات المؤشرات المسموحة المطلوبة (None داخل القائمة = الكل)
+        :param clock: الساعة لوقت اللقطة (الافتراضي: الوقت الحقيقي)
+        """
+        self.symbols = symbols
+        self.interval = config.ANALYSIS_SNAPSHOT_INTERVAL if interval is None else interval
+        self.period = period
+        self.clock = clock or wall_clock
+        self._indicator_sets = {indicator_key(allowed): allowed for allowed in (indicator_sets or [None])}
+
+        self._snapshot: Optional[AnalysisSnapshot] = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # إحصائيات
+        self.refreshes = 0
+        self.failures = 0
+
+    # ==================== القراءة ====================
+
+    def get(self) -> Optional[AnalysisSnapshot]:
+        """آخر لقطة جاهزة (None قبل اكتمال أول تحديث)"""
+        return self._snapshot
+
+    def wait_ready(self, timeout: float = None) -> Optional[AnalysisSnapshot]:
+        """انتظار أول لقطة"""
+        self._ready.wait(timeout)
+        return self._snapshot
+
+    def is_stale(self, snapshot: AnalysisSnapshot = None) -> bool:
+        """أقدم من فترتي تحديث (التحديث متأخر أو يفشل)"""
+        snapshot = snapshot or self._snapshot
+        return snapshot is None or snapshot.age(self.clock.now()) > 2 * self.interval
+
+    def track(self, allowed: List[str] = None):
+        """إضافة مجموعة مؤشرات جديدة للتحديث القادم (مثلاً باقة لم تكن معروفة)"""
+        with self._lock:
+            if indicator_key(allowed) in self._indicator_sets:
+                return
+            self._indicator_sets[indicator_key(allowed)] = allowed
+        self._wake.set()
+
+    # ==================== التحديث ====================
+
+    def refresh(self) -> AnalysisSnapshot:
+        """حساب لقطة جديدة واستبدال الحالية بها"""
+        with self._refresh_lock:
+            with self._lock:
+                indicator_sets = dict(self._indicator_sets)
+            symbols = list(self.symbols or config.WATCHLIST)
+
+            # المؤشرات اللازمة لأوسع مجموعة - تحسب مرة واحدة لكل سهم
+            names = set()
+            for allowed in indicator_sets.values():
+                names.update(resolve_indicator_groups(TechnicalAnalyzer.SIGNAL_INDICATORS, allowed))
+
+            def analyze(symbol, data, indicators):
+                return {key: analyze_stock(symbol, period=self.period, data=data, indicators=indicators,
+                                           allowed_indicators=allowed)
+                        for key, allowed in indicator_sets.items()}
+
+            started = time.perf_counter()
+            rows = {key: [] for key in indicator_sets}
+            errors = {}
+            with stage("snapshot"):
+                scan = WatchlistScanner().scan(symbols, analyze, period=self.period,
+                                               batch_indicators=True, indicator_names=sorted(names))
+                for symbol, result, error in scan:
+                    if error:
+                        errors[symbol] = str(error)
+                        continue
+                    for key, analysis in result.items():
+                        rows[key].append(analysis_row(symbol, analysis))
+
+            snapshot = AnalysisSnapshot(
+                views={key: build_view(results) for key, results in rows.items()},
+                updated_at=self.clock.now(),
+                duration=time.perf_counter() - started,
+                symbols=len(symbols),
+                errors=errors,
+            )
+            # استبدال المرجع ذري - القراء يرون اللقطة القديمة أو الجديدة كاملة
+            self._snapshot = snapshot
+            self.refreshes += 1
+            self._ready.set()
+            return snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                # اللقطة السابقة تبقى متاحة
+                self.failures += 1
+                print(f"❌ خطأ في تحديث لقطة التحليل: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self) -> 'SnapshotRefresher':
+        """تشغيل الخيط الخلفي (لا شيء إذا كان يعمل)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="analysis-snapshot", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        """إيقاف الخيط بعد انتهاء التحديث الجاري"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get_stats(self) -> Dict:
+        """إحصائيات التحديث"""
+        snapshot = self._snapshot
+        return {
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'symbols': snapshot.symbols if snapshot else 0,
+            'errors': len(snapshot.errors) if snapshot else 0,
+            'duration': snapshot.duration if snapshot else None,
+            'age': snapshot.age(self.clock.now()) if snapshot else None,
+        }
+
+
+_snapshot_refresher = None
+_snapshot_refresher_lock = threading.Lock()
+
+
+def get_snapshot_refresher() -> SnapshotRefresher:
+    """المحدث المشترك على مستوى العملية (مجموعات المؤشرات من باقات الاشتراك)"""
+    global _snapshot_refresher
+    with _snapshot_refresher_lock:
+        if _snapshot_refresher is None:
+            from subscription_system import SubscriptionManager
+            indicator_sets = [None]
+            for plan in SubscriptionManager.PLANS.values():
+                indicators = plan['features'].get('technical_indicators', 'all')
+                indicator_sets.append(None if indicators == 'all' else list(indicators))
+            _snapshot_refresher = SnapshotRefresher(indicator_sets=indicator_sets)
+        return _snapshot_refresher
@@ -3,15 +3,17 @@
 يدعم الأسهم الأمريكية والسعودية
 """
 
-import time
-import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Dict, List
 from colorama import init, Fore, Style
 import config
+from clock import wall_clock
 from technical_analysis import TechnicalAnalyzer
 from trading_strategy import CompositeStrategy
 from risk_management import RiskManager, Position
+from quote_cache import get_quote
+from scanner import WatchlistScanner
+from metrics import get_metrics, stage
 
 init(autoreset=True)
 
@@ -19,15 +21,27 @@ init(autoreset=True)
 class AutoTradingBot:
     """بوت التداول التلقائي الكامل"""
     
-    def __init__(self, initial_capital: float = 10000):
-        """تهيئة البوت"""
+    def __init__(self, initial_capital: float = 10000, clock=None):
+        """
+        تهيئة البوت
+        
+        :param clock: الساعة (الافتراضي: الوقت الحقيقي - SimulatedClock لإعادة التشغيل السريع)
+        """
+        self.clock = clock or wall_clock
         self.watchlist = config.WATCHLIST
         self.strategy = CompositeStrategy()
+        self.scanner = WatchlistScanner()
+        # المؤشرات التي تقرأها الاستراتيجية + ATR لوقف الخسارة (الباقي لا يحسب)
+        self.required_indicators = (
+            self.strategy.required_indicators + ['ATR']
+            if self.strategy.required_indicators is not None else None
+        )
         self.risk_manager = RiskManager(
             initial_capital=initial_capital,
             max_risk_per_trade=config.MAX_POSITION_SIZE,
             max_portfolio_risk=config.MAX_DAILY_LOSS,
-            max_positions=config.MAX_OPEN_POSITIONS
+            max_positions=config.MAX_OPEN_POSITIONS,
+            clock=self.clock
         )
         
         self.scan_count = 0
@@ -50,16 +64,14 @@ class AutoTradingBot:
         print("=" * 90)
         print(f"الوضع: {mode_color}{mode_text}{Style.RESET_ALL} | "
               f"رأس المال: {Fore.GREEN}${self.risk_manager.current_capital:,.2f}{Style.RESET_ALL} | "
-              f"الوقت: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+              f"الوقت: {self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("=" * 90 + "\n")
     
     def get_current_price(self, symbol: str) -> float:
         """الحصول على السعر الحالي"""
         try:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period="1d", interval="1m")
-            if not data.empty:
-                return data['Close'].iloc[-1]
+            with stage("quote", symbol):
+                return get_quote(symbol)
         except:
             pass
         return None
@@ -69,25 +81,17 @@ class AutoTradingBot:
         current_price = latest['Close']
         atr = latest.get('ATR')
         
-        # حساب وقف الخسارة وجني الأرباح
-        stop_loss = self.risk_manager.calculate_stop_loss(
-            current_price, 
-            atr=atr,
-            percent=config.STOP_LOSS_PERCENT
-        )
-        
-        take_profit = self.risk_manager.calculate_take_profit(
-            current_price,
-            stop_loss,
-            risk_reward_ratio=config.TAKE_PROFIT_PERCENT / config.STOP_LOSS_PERCENT
-        )
-        
-        # حساب حجم المركز
-        position_size = self.risk_manager.calculate_position_size(
+        # حساب وقف الخسارة وجني الأرباح وحجم المركز
+        plan = self.risk_manager.plan_entry(
             symbol,
             current_price,
-            stop_loss
+            atr=atr,
+            stop_loss_percent=config.STOP_LOSS_PERCENT,
+            risk_reward_ratio=config.TAKE_PROFIT_PERCENT / config.STOP_LOSS_PERCENT
         )
+        stop_loss = plan['stop_loss']
+        take_profit = plan['take_profit']
+        position_size = plan['quantity']
         
         if position_size > 0:
             # فتح المركز
@@ -129,41 +133,57 @@ class AutoTradingBot:
                     return True
         return False
     
+    def analyze_symbol(self, symbol: str, data, indicators=None):
+        """تحليل سهم واحد (يعمل داخل خيوط الماسح)"""
+        analyzer = TechnicalAnalyzer(symbol, period="3mo")
+        analyzer.set_data(data, indicators)
+        
+        # المؤشرات الناقصة من الحساب الجماعي تحسب هنا حتى لا يحسب زمنها على الاستراتيجية
+        with stage("indicators", symbol):
+            analyzer.ensure_indicators(self.required_indicators)
+        
+        with stage("strategy", symbol):
+            signal = self.strategy.generate_signal(analyzer)
+            latest = analyzer.get_latest_values(self.required_indicators)
+        return signal, latest
+    
     def scan_and_trade(self):
         """مسح السوق وتنفيذ الصفقات تلقائياً"""
         self.scan_count += 1
-        print(f"{Fore.YELLOW}🔍 المسح #{self.scan_count} - {datetime.now().strftime('%H:%M:%S')}{Style.RESET_ALL}\n")
+        metrics = get_metrics()
+        before = metrics.snapshot()
+        print(f"{Fore.YELLOW}🔍 المسح #{self.scan_count} - {self.clock.now().strftime('%H:%M:%S')}{Style.RESET_ALL}\n")
         
         buy_opportunities = []
         sell_signals = []
         
-        for symbol in self.watchlist:
+        # جلب وتحليل جميع الأسهم بالتوازي - النتائج تصل فور جاهزيتها
+        results = self.scanner.scan(self.watchlist, self.analyze_symbol, period="3mo",
+                                    batch_indicators=True,
+                                    indicator_names=self.required_indicators)
+        
+        for symbol, result, error in results:
             try:
                 print(f"   📊 {symbol}...", end=" ")
                 
-                # التحليل
-                analyzer = TechnicalAnalyzer(symbol, period="3mo")
-                analyzer.fetch_data()
-                analyzer.calculate_all_indicators()
-                
-                signal = self.strategy.generate_signal(analyzer)
-                latest = analyzer.get_latest_values()
+                if error:
+                    raise error
+                signal, latest = result
                 
                 # معالجة الإشارات
-                if signal['action'] == 'BUY' and signal['confidence'] >= self.min_confidence:
-                    print(f"{Fore.GREEN}✅ شراء ({signal['confidence']:.0f}%){Style.RESET_ALL}")
-                    buy_opportunities.append((symbol, signal, latest))
-                    self.total_signals += 1
-                
-                elif signal['action'] == 'SELL' and signal['confidence'] >= self.min_confidence:
-                    print(f"{Fore.RED}❌ بيع ({signal['confidence']:.0f}%){Style.RESET_ALL}")
-                    sell_signals.append((symbol, signal))
-                    self.total_signals += 1
-                
-                else:
-                    print(f"{Fore.WHITE}⚪ {signal['action']}{Style.RESET_ALL}")
-                
-                time.sleep(0.3)  # تجنب تجاوز حدود API
+                with stage("print", symbol):
+                    if signal['action'] == 'BUY' and signal['confidence'] >= self.min_confidence:
+                        print(f"{Fore.GREEN}✅ شراء ({signal['confidence']:.0f}%){Style.RESET_ALL}")
+                        buy_opportunities.append((symbol, signal, latest))
+                        self.total_signals += 1
+                    
+                    elif signal['action'] == 'SELL' and signal['confidence'] >= self.min_confidence:
+                        print(f"{Fore.RED}❌ بيع ({signal['confidence']:.0f}%){Style.RESET_ALL}")
+                        sell_signals.append((symbol, signal))
+                        self.total_signals += 1
+                    
+                    else:
+                        print(f"{Fore.WHITE}⚪ {signal['action']}{Style.RESET_ALL}")
                 
             except Exception as e:
                 print(f"{Fore.RED}❌ خطأ{Style.RESET_ALL}")
@@ -178,7 +198,8 @@ class AutoTradingBot:
             print(f"{'='*90}{Style.RESET_ALL}\n")
             
             for symbol, signal in sell_signals:
-                self.execute_sell(symbol, signal)
+                with stage("risk", symbol):
+                    self.execute_sell(symbol, signal)
         
         # تنفيذ أوامر الشراء
         if buy_opportunities:
@@ -197,9 +218,13 @@ class AutoTradingBot:
                 
                 # التحقق من عدم وجود مركز مفتوح
                 if symbol not in self.risk_manager.positions:
-                    self.execute_buy(symbol, signal, latest)
+                    with stage("risk", symbol):
+                        self.execute_buy(symbol, signal, latest)
                 else:
                     print(f"{Fore.YELLOW}⚠️  {symbol} لديه مركز مفتوح بالفعل{Style.RESET_ALL}\n")
+        
+        # أين ذهب وقت المسح
+        metrics.print_summary(before)
     
     def update_positions(self):
         """تحديث المراكز المفتوحة"""
@@ -244,7 +269,8 @@ class AutoTradingBot:
         print()
         
         # تحديث وإغلاق تلقائي
-        self.risk_manager.update_positions(current_prices)
+        with stage("risk"):
+            self.risk_manager.update_positions(current_prices)
     
     def show_statistics(self):
         """عرض الإحصائيات"""
@@ -289,8 +315,15 @@ class AutoTradingBot:
         
         print(f"\n{Fore.CYAN}{'='*90}{Style.RESET_ALL}\n")
     
-    def run_continuous(self, interval_minutes: int = 5, max_scans: int = None):
-        """التشغيل المستمر"""
+    def run_continuous(self, interval_minutes: int = 5, max_scans: int = None,
+                       close_on_exit: bool = None):
+        """
+        التشغيل المستمر
+        
+        :param interval_minutes: الفاصل بين المسحات (على ساعة البوت)
+        :param max_scans: أقصى عدد مسحات (None = حتى Ctrl+C)
+        :param close_on_exit: إغلاق المراكز عند الإيقاف (None = سؤال المستخدم)
+        """
         self.print_header()
         
         if self.simulation_mode:
@@ -329,20 +362,24 @@ class AutoTradingBot:
                     break
                 
                 # الانتظار
-                next_scan = datetime.now() + timedelta(minutes=interval_minutes)
+                next_scan = self.clock.now() + timedelta(minutes=interval_minutes)
                 print(f"{Fore.YELLOW}⏰ المسح التالي في: {next_scan.strftime('%H:%M:%S')}{Style.RESET_ALL}")
                 print(f"{Fore.YELLOW}⏹️  للإيقاف: Ctrl+C{Style.RESET_ALL}\n")
                 
-                time.sleep(interval_minutes * 60)
+                self.clock.sleep(interval_minutes * 60)
         
         except KeyboardInterrupt:
             print(f"\n\n{Fore.RED}⏹️  إيقاف البوت بواسطة المستخدم{Style.RESET_ALL}\n")
         
         finally:
-            self.shutdown()
+            self.shutdown(close_on_exit)
     
-    def shutdown(self):
-        """إيقاف البوت"""
+    def shutdown(self, close_positions: bool = None):
+        """
+        إيقاف البوت
+        
+        :param close_positions: إغلاق المراكز المفتوحة (None = سؤال المستخدم)
+        """
         print(f"{Fore.CYAN}{'='*90}")
         print(f"{'📊 تقرير نهائي':^90}")
         print(f"{'='*90}{Style.RESET_ALL}\n")
@@ -354,8 +391,10 @@ class AutoTradingBot:
                 pos = self.risk_manager.positions[symbol]
                 print(f"   • {symbol}: {pos.quantity:.0f} سهم @ ${pos.entry_price:.2f}")
             
-            close_all = input(f"\n{Fore.YELLOW}هل تريد إغلاق جميع المراكز؟ (نعم/لا): {Style.RESET_ALL}")
-            if close_all.lower() in ['نعم', 'yes', 'y']:
+            if close_positions is None:
+                close_all = input(f"\n{Fore.YELLOW}هل تريد إغلاق جميع المراكز؟ (نعم/لا): {Style.RESET_ALL}")
+                close_positions = close_all.lower() in ['نعم', 'yes', 'y']
+            if close_positions:
                 print(f"\n{Fore.RED}🔴 إغلاق جميع المراكز...{Style.RESET_ALL}\n")
                 for symbol in list(self.risk_manager.positions.keys()):
                     try:
@@ -0,0 +1,285 @@
+"""
+ذاكرة نتائج الاختبار الخلفي على القرص
+- المفتاح بصمة المحتوى: السهم والفاصل الزمني والشموع والاستراتيجية ومعاملاتها ورأس المال
+- نفس الاختبار على نفس الشموع يعود فوراً من القرص
+- إضافة شموع جديدة في آخر بيانات محفوظة (نفس أول شمعة ونفس الشموع حتى آخر شمعة محفوظة حسب أوقاتها)
+  تكمل من آخر حالة: محاكاة الصفقات للشموع الجديدة فقط. المؤشرات والإشارات المتجهة لا تحفظ
+  وتحسب على كل الشموع من جديد في كل تشغيل (تحتاج التاريخ كاملاً) - أي أن الإكمال يوفر المحاكاة فقط
+- النافذة المتدحرجة (period="1y") تسقط أقدم شمعة كل يوم فلا تكمل أبداً: للإكمال تستخدم
+  بداية ثابتة (anchored_start) لمدة شهر - الفترة المختبرة = الفترة المطلوبة + حتى شهر
+- حجم المجلد محدود: الأقدم استخداماً يحذف أولاً (LRU)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from backtester import WARMUP_BARS, MIN_CONFIDENCE, resume_backtest, backtest_result
+from data_cache import period_start
+from market_data import OHLCV_COLUMNS
+
+# يتغير عند تغيير محرك الاختبار لإبطال النتائج القديمة
+CACHE_VERSION = 1
+
+
+def strategy_fingerprint(strategy) -> Dict:
+    """فئة الاستراتيجية ومعاملاتها (الاستراتيجيات الفرعية في CompositeStrategy تدخل بمعاملاتها)"""
+    def describe(value):
+        if hasattr(value, 'generate_signal'):
+            return strategy_fingerprint(value)
+        if isinstance(value, (list, tuple)):
+            return [describe(item) for item in value]
+        if isinstance(value, dict):
+            return {str(key): describe(item) for key, item in value.items()}
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return value
+        return repr(value)
+
+    strategy_class = type(strategy)
+    return {
+        'class': f"{strategy_class.__module__}.{strategy_class.__qualname__}",
+        'params': {name: describe(value) for name, value in sorted(vars(strategy).items())},
+    }
+
+
+def anchored_start(period: str, now: pd.Timestamp = None, freq: str = "month") -> Optional[pd.Timestamp]:
+    """
+    بداية ثابتة لاختبار يغطي الفترة على الأقل: بداية الفترة مقربة لأول الشهر أو السنة (UTC)
+    تتغير مرة كل شهر (أو سنة) فقط - الأيام الجديدة تضاف في آخر البيانات فيكمل الاختبار من القرص
+    الفترة المختبرة أطول من المطلوبة بحتى شهر (أو سنة) - تعرض للمستخدم مع النتيجة
+    :param freq: "month" أو "year"
+    :return: None للفترة max
+    """
+    if freq not in ("month", "year"):
+        raise ValueError(f"دقة غير مدعومة: {freq} (المتاح: month, year)")
+    start = period_start(period, now)
+    if start is None:
+        return None
+    return pd.Timestamp(year=start.year, month=start.month if freq == "month" else 1, day=1, tz='UTC')
+
+
+def data_key(settings: str, data: pd.DataFrame) -> str:
+    """بصمة الإعدادات والشموع (الأوقات + OHLCV)"""
+    digest = hashlib.sha1(settings.encode())
+    digest.update(str(data.index.tz).encode())
+    digest.update(data.index.as_unit('ns').asi8.tobytes())
+    for name in OHLCV_COLUMNS:
+        if name in data.columns:
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(data[name].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+class BacktestCache:
+    """نتائج الاختبار الخلفي على القرص - ملف JSON لكل نتيجة"""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        """
+        :param cache_dir: مجلد النتائج (الافتراضي من config)
+        :param max_bytes: أقصى حجم للمجلد (الافتراضي من config)
+        """
+        self.cache_dir = cache_dir or config.BACKTEST_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else config.BACKTEST_CACHE_MAX_MB * 1024 * 1024
+        self._lock = threading.Lock()
+
+        # إحصائيات
+        self.hits = 0
+        self.resumed = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, "entries", f"{key}.json")
+
+    def _head_path(self, settings_key: str) -> str:
+        """آخر نتيجة محفوظة لنفس الإعدادات (للإكمال عند إضافة شموع)"""
+        return os.path.join(self.cache_dir, "heads", f"{settings_key}.json")
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict]:
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path: str, payload: Dict):
+        """كتابة ذرية عبر ملف مؤقت"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    # ==================== الحالة ====================
+
+    @staticmethod
+    def _encode_state(state: Dict, tz) -> Dict:
+        trades = [
+            {key: pd.Timestamp(value).value if key == 'date' else
+                  value if isinstance(value, str) else float(value)
+             for key, value in trade.items()}
+            for trade in state['trades']
+        ]
+        return {
+            'position': int(state['position']),
+            'capital': float(state['capital']),
+            'shares': float(state['shares']),
+            'tz': str(tz) if tz is not None else None,
+            'trades': trades,
+        }
+
+    @staticmethod
+    def _decode_state(payload: Dict) -> Dict:
+        tz = payload['tz']
+
+        def timestamp(value):
+            return pd.Timestamp(value, tz='UTC').tz_convert(tz) if tz else pd.Timestamp(value)
+
+        trades = [{key: timestamp(value) if key == 'date' else value for key, value in trade.items()}
+                  for trade in payload['trades']]
+        return {
+            'position': payload['position'],
+            'capital': payload['capital'],
+            'shares': payload['shares'],
+            'trades': trades,
+        }
+
+    def _load_state(self, key: str) -> Optional[Dict]:
+        path = self._entry_path(key)
+        payload = self._read(path)
+        if payload is None:
+            return None
+        try:
+            state = self._decode_state(payload)
+        except (KeyError, TypeError, ValueError):
+            return None  # ملف تالف - يعاد الحساب
+        try:
+            os.utime(path)  # آخر استخدام لترتيب الحذف
+        except OSError:
+            pass
+        return state
+
+    # ==================== التشغيل ====================
+
+    def run(self, symbol: str, strategy, data: pd.DataFrame, interval: str = "1d",
+            initial_capital: float = 10000, min_confidence: float = MIN_CONFIDENCE,
+            warmup: int = WARMUP_BARS) -> Dict:
+        """
+        نتيجة الاختبار الخلفي من القرص أو بحسابها (نفس نتيجة run_backtest)
+        نفس الشموع = من القرص. شموع جديدة بعد نتيجة محفوظة بنفس البداية = إكمال محاكاة الصفقات
+        من حالتها (المؤشرات والإشارات تحسب على كل الشموع في كل مرة). غير ذلك = حساب كامل
+        :param interval: الفاصل الزمني للشموع (جزء من المفتاح)
+        """
+        settings = json.dumps({
+            'version': CACHE_VERSION,
+            'symbol': symbol,
+            'interval': interval,
+            'strategy': strategy_fingerprint(strategy),
+            'initial_capital': initial_capital,
+            'min_confidence': min_confidence,
+            'warmup': warmup,
+        }, sort_keys=True, default=str)
+        settings_key = hashlib.sha1(settings.encode()).hexdigest()
+        key = data_key(settings, data)
+
+        state = self._load_state(key)
+        if state is not None:
+            self.hits += 1
+            return backtest_result(symbol, strategy, data, initial_capital, state)
+
+        # شموع جديدة بعد نتيجة محفوظة: الإكمال من حالتها إذا كانت نفس البداية
+        # ولم تتغير الشموع حتى آخر وقت محفوظ (المطابقة بالأوقات لا بعدد الشموع)
+        prior = None
+        head = self._read(self._head_path(settings_key))
+        if head and 'first' in head and 'last' in head and len(data) > 0:
+            stamps = data.index.as_unit('ns').asi8
+            if stamps[0] == head['first'] and stamps[-1] > head['last']:
+                overlap = data.iloc[:int(np.searchsorted(stamps, head['last'], side='right'))]
+                if len(overlap) == head.get('bars') and data_key(settings, overlap) == head.get('key'):
+                    prior = self._load_state(head['key'])
+
+        if prior is not None:
+            self.resumed += 1
+        else:
+            self.misses += 1
+
+        state = resume_backtest(symbol, strategy, data, initial_capital, warmup, min_confidence, prior)
+
+        with self._lock:
+            self._write(self._entry_path(key), self._encode_state(state, data.index.tz))
+            stamps = data.index.as_unit('ns').asi8
+            self._write(self._head_path(settings_key), {
+                'key': key, 'bars': len(data), 'first': int(stamps[0]), 'last': int(stamps[-1])
+            })
+            self.evict()
+
+        return backtest_result(symbol, strategy, data, initial_capital, state)
+
+    def evict(self):
+        """حذف الأقدم استخداماً حتى يصبح حجم النتائج ضمن الحد"""
+        folder = os.path.join(self.cache_dir, "entries")
+        if not os.path.isdir(folder):
+            return
+
+        entries = []
+        for name in os.listdir(folder):
+            if not name.endswith('.json'):
+                continue
+            try:
+                info = os.stat(os.path.join(folder, name))
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                continue
+            total -= size
+            self.evicted += 1
+
+    def clear(self):
+        """حذف كل النتائج المحفوظة"""
+        for folder in ("entries", "heads"):
+            path = os.path.join(self.cache_dir, folder)
+            if not os.path.isdir(path):
+                continue
+            for name in os.listdir(path):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(path, name))
+
+    def get_stats(self) -> Dict:
+        """إحصائيات الذاكرة"""
+        total = self.hits + self.resumed + self.misses
+        return {
+            'hits': self.hits,
+            'resumed': self.resumed,
+            'misses': self.misses,
+            'evicted': self.evicted,
+            'hit_rate': ((self.hits + self.resumed) / total * 100) if total > 0 else 0,
+        }
+
+
+_backtest_cache = None
+_backtest_cache_lock = threading.Lock()
+
+
+def get_backtest_cache() -> BacktestCache:
+    """الذاكرة المشتركة على مستوى العملية"""
+    global _backtest_cache
+    with _backtest_cache_lock:
+        if _backtest_cache is None:
+            _backtest_cache = BacktestCache()
+        return _backtest_cache
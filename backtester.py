@@ -0,0 +1,246 @@
+"""
+محرك الاختبار الخلفي
+- المؤشرات تحسب مرة واحدة على كامل التاريخ بدلاً من إعادة حسابها لكل شمعة
+- إشارات الاستراتيجية تنتج كمصفوفات متوازية مع الشموع (signal_series)
+- تنفيذ الصفقات في مرور خطي واحد
+كل المؤشرات سببية (قيمتها عند الشمعة i لا تعتمد على ما بعدها)
+لذلك النتائج مطابقة لإعادة الحساب على البيانات حتى كل شمعة
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from technical_analysis import TechnicalAnalyzer
+
+# أول شمعة يبدأ عندها التداول (لضمان وجود بيانات كافية للمؤشرات)
+WARMUP_BARS = 50
+
+# أقل ثقة لتنفيذ الإشارة
+MIN_CONFIDENCE = 60
+
+
+class BarView:
+    """
+    عرض شمعة واحدة من مؤشرات محسوبة مسبقاً بنفس واجهة TechnicalAnalyzer التي تقرأها الاستراتيجيات
+    position تحدد الشمعة التي تعتبر "الأحدث"
+    """
+
+    def __init__(self, symbol: str, data: pd.DataFrame, indicators: Dict[str, pd.Series]):
+        self.symbol = symbol
+        self.index = data.index
+        self.close = data['Close'].to_numpy()
+        self.volume = data['Volume'].to_numpy()
+        self.columns = {key: series.to_numpy() for key, series in indicators.items()
+                        if isinstance(series, pd.Series)}
+        self.position = len(self.index) - 1
+
+    @classmethod
+    def from_analyzer(cls, analyzer: TechnicalAnalyzer) -> 'BarView':
+        return cls(analyzer.symbol, analyzer.data, analyzer.indicators)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get_latest_values(self, names: List[str] = None) -> Dict:
+        """قيم الشمعة الحالية (القيم الفارغة = None كما في TechnicalAnalyzer)"""
+        i = self.position
+        latest = {
+            'Symbol': self.symbol,
+            'Timestamp': self.index[i],
+            'Close': self.close[i],
+            'Volume': self.volume[i],
+        }
+        for key, values in self.columns.items():
+            value = values[i]
+            latest[key] = value if not np.isnan(value) else None
+        return latest
+
+
+def strategy_signals(strategy, analyzer: TechnicalAnalyzer,
+                     start: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    إشارات الاستراتيجية لكل الشموع من مؤشرات محسوبة مرة واحدة
+    الاستراتيجيات التي تدعم signal_series تحسب كل الشموع دفعة واحدة
+    والباقي يقيم شمعة بشمعة عبر BarView
+    :param start: أول شمعة تحسب إشارتها (ما قبلها HOLD)
+    :return: (الإجراءات, الثقة) كمصفوفتين بطول الشموع
+    """
+    signals = None
+    if hasattr(strategy, 'signal_series'):
+        try:
+            signals = strategy.signal_series(analyzer)
+        except NotImplementedError:
+            pass  # استراتيجية تطبق generate_signal فقط
+
+    if signals is not None:
+        actions = signals['action'].to_numpy(dtype=object, copy=True)
+        confidence = signals['confidence'].to_numpy(dtype=float, copy=True)
+        actions[:start] = 'HOLD'
+        confidence[:start] = 0
+        return actions, confidence
+
+    analyzer.ensure_indicators(strategy.required_indicators)
+    view = BarView.from_analyzer(analyzer)
+
+    actions = np.full(len(view), 'HOLD', dtype=object)
+    confidence = np.zeros(len(view))
+    for i in range(start, len(view)):
+        view.position = i
+        signal = strategy.generate_signal(view)
+        actions[i] = signal['action']
+        confidence[i] = signal['confidence']
+
+    return actions, confidence
+
+
+def simulate_trades(index: pd.DatetimeIndex, close: np.ndarray, actions: np.ndarray,
+                    confidence: np.ndarray, initial_capital: float,
+                    start: int = 0, min_confidence: float = MIN_CONFIDENCE) -> Tuple[float, List[Dict]]:
+    """
+    تنفيذ الإشارات في مرور واحد (شراء بكامل رأس المال وبيع بكامل المركز)
+    :return: (رأس المال النهائي بعد إغلاق المركز المفتوح, الصفقات)
+    """
+    capital, shares, trades = execute_signals(index, close, actions, confidence, initial_capital,
+                                              start=start, min_confidence=min_confidence)
+
+    # إغلاق أي مركز مفتوح
+    if shares > 0:
+        capital = shares * close[-1]
+
+    return capital, trades
+
+
+def execute_signals(index: pd.DatetimeIndex, close: np.ndarray, actions: np.ndarray,
+                    confidence: np.ndarray, capital: float, shares: float = 0,
+                    start: int = 0, min_confidence: float = MIN_CONFIDENCE) -> Tuple[float, float, List[Dict]]:
+    """
+    تنفيذ الإشارات من الشمعة start بدءاً من حالة (نقد، أسهم) معينة بدون إغلاق المركز في النهاية
+    :return: (النقد, الأسهم, الصفقات الجديدة)
+    """
+    actionable = confidence > min_confidence
+    buys = (actions == 'BUY') & actionable
+    sells = (actions == 'SELL') & actionable
+    buys[:start] = False
+    sells[:start] = False
+
+    trades = []
+
+    # الشموع بدون إشارة قابلة للتنفيذ لا تغير الحالة - نمر على الباقي فقط
+    for i in np.flatnonzero(buys | sells):
+        current_price = close[i]
+
+        if buys[i] and shares == 0:
+            shares = capital / current_price
+            capital = 0
+            trades.append({
+                'date': index[i],
+                'action': 'BUY',
+                'price': current_price,
+                'shares': shares,
+                'confidence': confidence[i]
+            })
+
+        elif sells[i] and shares > 0:
+            capital = shares * current_price
+            trades.append({
+                'date': index[i],
+                'action': 'SELL',
+                'price': current_price,
+                'shares': shares,
+                'value': capital,
+                'confidence': confidence[i]
+            })
+            shares = 0
+
+    return capital, shares, trades
+
+
+def equity_curve(index: pd.DatetimeIndex, close: np.ndarray, trades: List[Dict],
+                 initial_capital: float) -> np.ndarray:
+    """قيمة المحفظة عند إغلاق كل شمعة من قائمة الصفقات"""
+    equity = np.empty(len(close))
+    positions = index.get_indexer([trade['date'] for trade in trades])
+
+    cash = initial_capital
+    shares = 0
+    last = 0
+    for trade, position in zip(trades, positions):
+        if trade['action'] == 'BUY':
+            equity[last:position] = cash
+            shares = trade['shares']
+        else:
+            equity[last:position] = shares * close[last:position]
+            cash = trade['value']
+            shares = 0
+        last = position
+
+    equity[last:] = shares * close[last:] if shares else cash
+    return equity
+
+
+def max_drawdown(equity: np.ndarray) -> float:
+    """أقصى تراجع من القمة كنسبة مئوية موجبة"""
+    if not len(equity):
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    return float(np.max((peaks - equity) / peaks) * 100)
+
+
+def run_backtest(symbol: str, strategy, data: pd.DataFrame,
+                 initial_capital: float = 10000, warmup: int = WARMUP_BARS,
+                 min_confidence: float = MIN_CONFIDENCE) -> Dict:
+    """
+    اختبار خلفي على بيانات جاهزة (نفس نتيجة backtest_strategy)
+    :param warmup: عدد الشموع الأولى بدون تداول
+    :param min_confidence: أقل ثقة لتنفيذ الإشارة
+    """
+    state = resume_backtest(symbol, strategy, data, initial_capital, warmup, min_confidence)
+    return backtest_result(symbol, strategy, data, initial_capital, state)
+
+
+def resume_backtest(symbol: str, strategy, data: pd.DataFrame, initial_capital: float = 10000,
+                    warmup: int = WARMUP_BARS, min_confidence: float = MIN_CONFIDENCE,
+                    state: Dict = None) -> Dict:
+    """
+    تشغيل الاختبار حتى آخر شمعة بدون إغلاق المركز المفتوح
+    :param state: حالة محفوظة لبداية نفس البيانات (تنفذ الشموع الجديدة بعدها فقط)
+    :return: الحالة {'position': عدد الشموع المنفذة, 'capital', 'shares', 'trades'}
+    """
+    if state is None:
+        state = {'position': 0, 'capital': initial_capital, 'shares': 0, 'trades': []}
+    start = max(warmup, state['position'])
+
+    analyzer = TechnicalAnalyzer(symbol)
+    analyzer.set_data(data)
+
+    actions, confidence = strategy_signals(strategy, analyzer, start=start)
+    capital, shares, trades = execute_signals(data.index, data['Close'].to_numpy(), actions, confidence,
+                                              state['capital'], state['shares'],
+                                              start=start, min_confidence=min_confidence)
+    return {'position': len(data), 'capital': capital, 'shares': shares,
+            'trades': state['trades'] + trades}
+
+
+def backtest_result(symbol: str, strategy, data: pd.DataFrame, initial_capital: float,
+                    state: Dict) -> Dict:
+    """نتيجة الاختبار من الحالة (المركز المفتوح يغلق بسعر آخر شمعة)"""
+    capital = state['capital']
+    if state['shares'] > 0:
+        capital = state['shares'] * data['Close'].to_numpy()[-1]
+    trades = state['trades']
+
+    # حساب النتائج
+    total_return = ((capital - initial_capital) / initial_capital) * 100
+    num_trades = len([t for t in trades if t['action'] == 'BUY'])
+
+    return {
+        'strategy': strategy.name,
+        'symbol': symbol,
+        'initial_capital': initial_capital,
+        'final_capital': capital,
+        'total_return': total_return,
+        'num_trades': num_trades,
+        'trades': trades
+    }
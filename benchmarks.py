@@ -0,0 +1,277 @@
+"""
+قياس أداء مسارات التحليل والتداول
+- يعمل بدون شبكة على شموع صناعية (synthetic_data) أو مسجلة (ReplayProvider)
+- لكل عملية: نسب زمن التنفيذ (p50 / p90 / p99) والإنتاجية
+- حفظ النتائج كـ JSON ومقارنتها بخط أساس محفوظ - التراجع فوق الحد يفشل التشغيل
+
+الاستخدام:
+    python benchmarks.py --output results.json
+    python benchmarks.py --save-baseline
+    python benchmarks.py --baseline .benchmarks/baseline.json --threshold 0.25
+    python benchmarks.py --only scan_market --universe 2000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+import config
+from market_data import ReplayProvider, get_provider, set_provider
+from risk_management import RiskManager
+from synthetic_data import SyntheticMarket, synthetic_symbols
+from technical_analysis import TechnicalAnalyzer
+from trading_strategy import CompositeStrategy, MomentumStrategy, backtest_strategy
+
+
+# عدد المراكز المفتوحة في قياس تحديث المراكز
+RISK_POSITIONS = 500
+
+
+def measure(func: Callable, repeat: int = 20, warmup: int = 1, items: int = 1) -> Dict:
+    """
+    تشغيل دالة عدة مرات وقياس زمن كل مرة
+    :param items: عدد العناصر في كل تشغيل (لحساب الإنتاجية - مثلاً عدد الأسهم في المسح)
+    :return: النسب بالمللي ثانية والإنتاجية بالعناصر في الثانية
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples = np.array(samples)
+    mean = float(samples.mean())
+    return {
+        'repeat': repeat,
+        'items': items,
+        'mean_ms': mean,
+        'min_ms': float(samples.min()),
+        'max_ms': float(samples.max()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p90_ms': float(np.percentile(samples, 90)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'throughput': items / (mean / 1000) if mean > 0 else 0.0,
+    }
+
+
+# ==================== العمليات ====================
+
+def _fresh_analyzer(symbol: str, data: pd.DataFrame) -> TechnicalAnalyzer:
+    analyzer = TechnicalAnalyzer(symbol)
+    analyzer.set_data(data)
+    return analyzer
+
+
+def bench_indicators(frames: Dict[str, pd.DataFrame]) -> Callable:
+    symbol, data = next(iter(frames.items()))
+    return lambda: _fresh_analyzer(symbol, data).calculate_all_indicators()
+
+
+def bench_generate_signals(frames: Dict[str, pd.DataFrame]) -> Callable:
+    symbol, data = next(iter(frames.items()))
+    return lambda: _fresh_analyzer(symbol, data).generate_signals()
+
+
+def bench_composite_signal(frames: Dict[str, pd.DataFrame]) -> Callable:
+    symbol, data = next(iter(frames.items()))
+    strategy = CompositeStrategy()
+    return lambda: strategy.generate_signal(_fresh_analyzer(symbol, data))
+
+
+def bench_backtest(frames: Dict[str, pd.DataFrame]) -> Callable:
+    symbol, data = next(iter(frames.items()))
+    strategy = MomentumStrategy()
+    return lambda: backtest_strategy(symbol, strategy, data=data)
+
+
+def bench_risk_update(frames: Dict[str, pd.DataFrame], positions: int = RISK_POSITIONS) -> Callable:
+    """تحديث عدد كبير من المراكز (بدون وقف خسارة أو جني أرباح ليبقى العدد ثابتاً)"""
+    rm = RiskManager(initial_capital=1e9, max_positions=positions, verbose=False)
+    for n in range(positions):
+        rm.open_position(f"S{n}", 10, 100.0)
+    rng = np.random.default_rng(0)
+    prices = [{f"S{n}": price for n, price in enumerate(rng.uniform(90, 110, positions))}
+              for _ in range(16)]
+    counter = iter(range(10 ** 9))
+    return lambda: rm.update_positions(prices[next(counter) % len(prices)])
+
+
+def bench_scan_market(frames: Dict[str, pd.DataFrame]) -> Callable:
+    """مسح كامل لقائمة المراقبة عبر TradingBot (الطباعة مكتومة)"""
+    from bot import TradingBot
+
+    bot = TradingBot(list(frames))
+
+    def scan():
+        with contextlib.redirect_stdout(io.StringIO()):
+            bot.scan_market()
+    return scan
+
+
+# (الاسم، منشئ الدالة، عدد العناصر في كل تشغيل: None = سهم واحد، 'symbols' = كل الأسهم)
+BENCHMARKS = [
+    ('indicators', bench_indicators, None),
+    ('generate_signals', bench_generate_signals, None),
+    ('composite_signal', bench_composite_signal, None),
+    ('backtest', bench_backtest, None),
+    ('risk_update', bench_risk_update, 'positions'),
+    ('scan_market', bench_scan_market, 'symbols'),
+]
+
+
+def load_frames(symbols: List[str], bars: int, data_dir: str = None) -> Dict[str, pd.DataFrame]:
+    """الشموع المسجلة من data_dir إن وجدت وإلا شموع صناعية (ثابتة لكل سهم)"""
+    frames = {}
+    if data_dir:
+        replay = ReplayProvider(data_dir)
+        for symbol in symbols:
+            data = replay.get_history(symbol, "1d")
+            if not data.empty:
+                frames[symbol] = data.iloc[-bars:]
+    for symbol in symbols:
+        if symbol not in frames:
+            frames[symbol] = SyntheticMarket(symbol).bars(bars)
+    return frames
+
+
+def run_benchmarks(names: List[str] = None, repeat: int = 20, bars: int = 500,
+                   symbols: List[str] = None, data_dir: str = None) -> Dict:
+    """
+    تشغيل العمليات المطلوبة على بيانات بدون شبكة
+    :param names: أسماء العمليات (None = الكل)
+    :param bars: عدد الشموع لكل سهم
+    :param symbols: الأسهم (الافتراضي config.WATCHLIST)
+    :param data_dir: مجلد شموع مسجلة (بتنسيق ReplayProvider)
+    """
+    symbols = symbols or config.WATCHLIST
+    frames = load_frames(symbols, bars, data_dir)
+
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={'1d': frames}))
+    results = {}
+    try:
+        for name, factory, items in BENCHMARKS:
+            if names and name not in names:
+                continue
+            func = factory(frames)
+            count = {'symbols': len(frames), 'positions': RISK_POSITIONS}.get(items, 1)
+            # المسح الكامل أبطأ بكثير - عدد مرات أقل
+            runs = max(3, repeat // 4) if items == 'symbols' else repeat
+            results[name] = measure(func, repeat=runs, items=count)
+    finally:
+        set_provider(previous)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'symbols': len(frames),
+            'bars': bars,
+        },
+        'results': results,
+    }
+
+
+# ==================== خط الأساس ====================
+
+def save_results(report: Dict, path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def load_results(path: str) -> Dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(report: Dict, baseline: Dict, threshold: float = None, metric: str = 'p50_ms') -> List[Dict]:
+    """
+    مقارنة النتائج بخط الأساس
+    :param threshold: أقصى زيادة مسموحة في الزمن (0.25 = 25%)
+    :return: صف لكل عملية مشتركة مع regression=True إذا تجاوزت الحد
+    """
+    threshold = config.BENCHMARK_THRESHOLD if threshold is None else threshold
+    rows = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or previous[metric] <= 0:
+            continue
+        change = current[metric] / previous[metric] - 1
+        rows.append({
+            'name': name,
+            'baseline': previous[metric],
+            'current': current[metric],
+            'change': change,
+            'regression': change > threshold,
+        })
+    return rows
+
+
+def print_report(report: Dict, comparison: List[Dict] = None):
+    """طباعة جدول النتائج"""
+    print("=" * 90)
+    print(f"{'العملية':<18}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'الإنتاجية/ث':>14}")
+    print("=" * 90)
+    for name, stats in report['results'].items():
+        print(f"{name:<18}{stats['p50_ms']:>10.2f}{stats['p90_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+              f"{stats['throughput']:>14.1f}")
+
+    if comparison:
+        print("\nمقارنة بخط الأساس (p50):")
+        for row in comparison:
+            mark = "❌" if row['regression'] else "✅"
+            print(f"  {mark} {row['name']:<18} {row['baseline']:>9.2f} → {row['current']:>9.2f} ms "
+                  f"({row['change'] * 100:+.1f}%)")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="قياس أداء التحليل والتداول")
+    parser.add_argument('--only', nargs='*', help="أسماء العمليات: " + ", ".join(n for n, _, _ in BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--bars', type=int, default=500)
+    parser.add_argument('--data-dir', help="مجلد شموع مسجلة (بدلاً من الشموع الصناعية)")
+    parser.add_argument('--universe', type=int, help="عدد أسهم صناعية بدلاً من قائمة المراقبة (اختبار التوسع)")
+    parser.add_argument('--output', help="حفظ النتائج كـ JSON")
+    parser.add_argument('--baseline', default=config.BENCHMARK_BASELINE)
+    parser.add_argument('--threshold', type=float, default=config.BENCHMARK_THRESHOLD)
+    parser.add_argument('--save-baseline', action='store_true', help="حفظ النتائج كخط أساس جديد")
+    args = parser.parse_args(argv)
+
+    symbols = synthetic_symbols(args.universe) if args.universe else None
+    report = run_benchmarks(args.only, repeat=args.repeat, bars=args.bars, symbols=symbols,
+                            data_dir=args.data_dir)
+    if args.output:
+        save_results(report, args.output)
+
+    comparison = None
+    if args.save_baseline:
+        save_results(report, args.baseline)
+    elif os.path.exists(args.baseline):
+        comparison = compare(report, load_results(args.baseline), args.threshold)
+
+    print_report(report, comparison)
+    if comparison and any(row['regression'] for row in comparison):
+        print(f"\n❌ تراجع في الأداء أكبر من {args.threshold * 100:.0f}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,15 +3,17 @@
 يجمع بين التحليل الفني والاستراتيجيات الذكية وإدارة المخاطر
 """
 
-import time
-import yfinance as yf
-from datetime import datetime, timedelta
 from typing import Dict, List
 from colorama import init, Fore, Style
 import config
+from clock import wall_clock
 from technical_analysis import TechnicalAnalyzer
 from trading_strategy import CompositeStrategy
 from risk_management import RiskManager
+from quote_cache import get_quote
+from scanner import WatchlistScanner
+from compact_storage import memory_report
+from metrics import get_metrics, stage
 
 # تهيئة الألوان
 init(autoreset=True)
@@ -21,24 +23,35 @@ class TradingBot:
     """البوت الرئيسي للتداول"""
     
     def __init__(self, watchlist: List[str], initial_capital: float = 10000, 
-                 trading_mode: str = "PAPER"):
+                 trading_mode: str = "PAPER", history: str = None, clock=None):
         """
         تهيئة البوت
         
         :param watchlist: قائمة الأسهم للمتابعة
         :param initial_capital: رأس المال الأولي
         :param trading_mode: وضع التداول (PAPER أو LIVE)
+        :param history: الاحتفاظ بسجل الشموع والمؤشرات (none / compact / full - الافتراضي من config)
+        :param clock: الساعة (الافتراضي: الوقت الحقيقي - SimulatedClock لإعادة التشغيل السريع)
         """
         self.watchlist = watchlist
+        self.clock = clock or wall_clock
         self.trading_mode = trading_mode
+        self.history = history or config.ANALYSIS_HISTORY
         
         # تهيئة المكونات
         self.strategy = CompositeStrategy()
+        self.scanner = WatchlistScanner()
+        # المؤشرات التي تقرأها الاستراتيجية + ATR لوقف الخسارة (الباقي لا يحسب)
+        self.required_indicators = (
+            self.strategy.required_indicators + ['ATR']
+            if self.strategy.required_indicators is not None else None
+        )
         self.risk_manager = RiskManager(
             initial_capital=initial_capital,
             max_risk_per_trade=config.MAX_POSITION_SIZE,
             max_portfolio_risk=config.MAX_DAILY_LOSS,
-            max_positions=config.MAX_OPEN_POSITIONS
+            max_positions=config.MAX_OPEN_POSITIONS,
+            clock=self.clock
         )
         
         # تخزين التحليلات
@@ -56,48 +69,71 @@ class TradingBot:
         print("=" * 80)
         print(f"وضع التداول: {Fore.GREEN if self.trading_mode == 'PAPER' else Fore.RED}{self.trading_mode}{Style.RESET_ALL}")
         print(f"رأس المال: {Fore.GREEN}${self.risk_manager.current_capital:,.2f}{Style.RESET_ALL}")
-        print(f"الوقت: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"الوقت: {self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("=" * 80 + "\n")
     
+    def analyze_symbol(self, symbol: str, data, indicators=None):
+        """تحليل سهم واحد (يعمل داخل خيوط الماسح)"""
+        analyzer = TechnicalAnalyzer(symbol, period="6mo")
+        analyzer.set_data(data, indicators)
+        
+        # المؤشرات الناقصة من الحساب الجماعي تحسب هنا حتى لا يحسب زمنها على الاستراتيجية
+        with stage("indicators", symbol):
+            analyzer.ensure_indicators(self.required_indicators)
+        
+        # توليد الإشارة
+        with stage("strategy", symbol):
+            signal = self.strategy.generate_signal(analyzer)
+            latest = analyzer.get_latest_values(self.required_indicators)
+        
+        # سجل الشموع والمؤشرات (المضغوط لا يحتفظ بكائنات pandas)
+        if self.history == "compact":
+            history = analyzer.to_compact()
+        elif self.history == "full":
+            history = (analyzer.data, analyzer.indicators)
+        else:
+            history = None
+        return signal, latest, history
+    
     def scan_market(self):
         """مسح السوق وتحليل الأسهم"""
         self.scan_count += 1
-        self.last_update = datetime.now()
+        self.last_update = self.clock.now()
         
         print(f"{Fore.YELLOW}🔍 جارٍ مسح السوق... (المسح #{self.scan_count}){Style.RESET_ALL}\n")
         
         opportunities = []
         
-        for symbol in self.watchlist:
+        # جلب وتحليل جميع الأسهم بالتوازي - النتائج تصل فور جاهزيتها
+        results = self.scanner.scan(self.watchlist, self.analyze_symbol, period="6mo",
+                                    batch_indicators=True,
+                                    indicator_names=self.required_indicators)
+        
+        for symbol, result, error in results:
             try:
                 print(f"   📊 تحليل {symbol}...", end=" ")
                 
-                # إنشاء المحلل
-                analyzer = TechnicalAnalyzer(symbol, period="6mo")
-                analyzer.fetch_data()
-                analyzer.calculate_all_indicators()
-                
-                # توليد الإشارة
-                signal = self.strategy.generate_signal(analyzer)
-                latest = analyzer.get_latest_values()
+                if error:
+                    raise error
+                signal, latest, history = result
                 
                 # تخزين التحليل
                 self.analyses[symbol] = {
                     'signal': signal,
                     'latest': latest,
-                    'timestamp': datetime.now()
+                    'history': history,
+                    'timestamp': self.clock.now()
                 }
                 
                 # طباعة النتيجة
-                if signal['action'] == 'BUY':
-                    print(f"{Fore.GREEN}✅ إشارة شراء ({signal['confidence']:.0f}%){Style.RESET_ALL}")
-                    opportunities.append((symbol, signal, latest))
-                elif signal['action'] == 'SELL':
-                    print(f"{Fore.RED}⚠️  إشارة بيع ({signal['confidence']:.0f}%){Style.RESET_ALL}")
-                else:
-                    print(f"{Fore.WHITE}⚪ لا توجد إشارة{Style.RESET_ALL}")
-                
-                time.sleep(0.5)  # تجنب تجاوز حدود API
+                with stage("print", symbol):
+                    if signal['action'] == 'BUY':
+                        print(f"{Fore.GREEN}✅ إشارة شراء ({signal['confidence']:.0f}%){Style.RESET_ALL}")
+                        opportunities.append((symbol, signal, latest))
+                    elif signal['action'] == 'SELL':
+                        print(f"{Fore.RED}⚠️  إشارة بيع ({signal['confidence']:.0f}%){Style.RESET_ALL}")
+                    else:
+                        print(f"{Fore.WHITE}⚪ لا توجد إشارة{Style.RESET_ALL}")
                 
             except Exception as e:
                 print(f"{Fore.RED}❌ خطأ: {str(e)}{Style.RESET_ALL}")
@@ -140,25 +176,17 @@ class TradingBot:
         atr = latest.get('ATR')
         
         if action == 'BUY':
-            # حساب وقف الخسارة وجني الأرباح
-            stop_loss = self.risk_manager.calculate_stop_loss(
-                current_price, 
-                atr=atr,
-                percent=config.STOP_LOSS_PERCENT
-            )
-            
-            take_profit = self.risk_manager.calculate_take_profit(
-                current_price,
-                stop_loss,
-                risk_reward_ratio=config.TAKE_PROFIT_PERCENT / config.STOP_LOSS_PERCENT
-            )
-            
-            # حساب حجم المركز
-            position_size = self.risk_manager.calculate_position_size(
+            # حساب وقف الخسارة وجني الأرباح وحجم المركز
+            plan = self.risk_manager.plan_entry(
                 symbol,
                 current_price,
-                stop_loss
+                atr=atr,
+                stop_loss_percent=config.STOP_LOSS_PERCENT,
+                risk_reward_ratio=config.TAKE_PROFIT_PERCENT / config.STOP_LOSS_PERCENT
             )
+            stop_loss = plan['stop_loss']
+            take_profit = plan['take_profit']
+            position_size = plan['quantity']
             
             if position_size > 0:
                 # فتح المركز
@@ -172,7 +200,7 @@ class TradingBot:
                 
                 if success:
                     self.alerts.append({
-                        'timestamp': datetime.now(),
+                        'timestamp': self.clock.now(),
                         'type': 'TRADE',
                         'symbol': symbol,
                         'action': 'BUY',
@@ -197,15 +225,21 @@ class TradingBot:
         current_prices = {}
         for symbol in self.risk_manager.positions.keys():
             try:
-                ticker = yf.Ticker(symbol)
-                data = ticker.history(period="1d", interval="1m")
-                if not data.empty:
-                    current_prices[symbol] = data['Close'].iloc[-1]
+                with stage("quote", symbol):
+                    price = get_quote(symbol)
+                if price:
+                    current_prices[symbol] = price
             except Exception as e:
                 print(f"   ❌ خطأ في تحديث {symbol}: {str(e)}")
         
         # تحديث المراكز
-        self.risk_manager.update_positions(current_prices)
+        with stage("risk"):
+            self.risk_manager.update_positions(current_prices)
+    
+    def get_memory_report(self) -> Dict:
+        """استهلاك الذاكرة لسجل التحليلات المحفوظ لكل سهم (لتقدير حجم العمليات العاملة)"""
+        histories = {symbol: analysis.get('history') for symbol, analysis in self.analyses.items()}
+        return memory_report(histories)
     
     def print_opportunities(self, opportunities: List):
         """طباعة الفرص المتاحة"""
@@ -232,47 +266,62 @@ class TradingBot:
     
     def run_once(self):
         """تشغيل دورة واحدة"""
+        metrics = get_metrics()
+        before = metrics.snapshot()
         self.print_header()
         
         # مسح السوق
         opportunities = self.scan_market()
         
         # طباعة الفرص
-        self.print_opportunities(opportunities)
+        with stage("print"):
+            self.print_opportunities(opportunities)
         
         # تنفيذ الصفقات للفرص الجيدة
         for symbol, signal, latest in opportunities:
-            if self.evaluate_opportunity(symbol, signal, latest):
-                print(f"\n{Fore.GREEN}✨ تقييم إيجابي لـ {symbol} - جارٍ تنفيذ الصفقة...{Style.RESET_ALL}")
-                self.execute_trade(symbol, signal['action'], signal, latest)
+            with stage("risk", symbol):
+                if self.evaluate_opportunity(symbol, signal, latest):
+                    print(f"\n{Fore.GREEN}✨ تقييم إيجابي لـ {symbol} - جارٍ تنفيذ الصفقة...{Style.RESET_ALL}")
+                    self.execute_trade(symbol, signal['action'], signal, latest)
         
         # تحديث المراكز المفتوحة
         self.update_positions()
         
         # طباعة ملخص المحفظة
-        self.risk_manager.print_portfolio_summary()
+        with stage("print"):
+            self.risk_manager.print_portfolio_summary()
+        
+        # أين ذهب وقت الدورة
+        metrics.print_summary(before)
     
-    def run_continuous(self, interval: int = 60):
+    def run_continuous(self, interval: int = 60, max_cycles: int = None):
         """
         تشغيل مستمر
         
-        :param interval: الفاصل الزمني بين الفحوصات (بالثواني)
+        :param interval: الفاصل الزمني بين الفحوصات (بالثواني - على ساعة البوت)
+        :param max_cycles: أقصى عدد دورات ثم الإيقاف (None = حتى Ctrl+C)
         """
         print(f"{Fore.CYAN}🚀 بدء البوت في وضع التشغيل المستمر{Style.RESET_ALL}")
         print(f"الفاصل الزمني: {interval} ثانية\n")
         
         try:
+            cycle = 0
             while True:
+                cycle += 1
                 self.run_once()
                 
+                if max_cycles and cycle >= max_cycles:
+                    break
+                
                 print(f"\n{Fore.YELLOW}⏰ الفحص التالي بعد {interval} ثانية...{Style.RESET_ALL}")
                 print(f"{Fore.YELLOW}اضغط Ctrl+C للإيقاف{Style.RESET_ALL}\n")
                 
-                time.sleep(interval)
+                self.clock.sleep(interval)
         
         except KeyboardInterrupt:
             print(f"\n{Fore.RED}⏹️  توقف البوت بواسطة المستخدم{Style.RESET_ALL}")
-            self.shutdown()
+        
+        self.shutdown()
     
     def shutdown(self):
         """إيقاف البوت وحفظ البيانات"""
@@ -286,8 +335,9 @@ class TradingBot:
             
             for symbol in list(self.risk_manager.positions.keys()):
                 try:
-                    ticker = yf.Ticker(symbol)
-                    current_price = ticker.history(period="1d")['Close'].iloc[-1]
+                    current_price = get_quote(symbol)
+                    if current_price is None:
+                        raise ValueError("لا يوجد سعر حالي")
                     self.risk_manager.close_position(symbol, current_price, "إيقاف البوت")
                 except Exception as e:
                     print(f"خطأ في إغلاق {symbol}: {str(e)}")
@@ -0,0 +1,62 @@
+"""
+الساعة المستخدمة في التداول
+- WallClock: الوقت الحقيقي
+- SimulatedClock: وقت افتراضي يضبطه الاختبار الخلفي أو إعادة التشغيل
+  الانتظار فيها (sleep) يقدم الوقت مباشرة فتعاد أيام من عمل البوت في ثوانٍ
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+
+
+class WallClock:
+    """الوقت الحقيقي للنظام"""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        """ثوانٍ متزايدة لحساب مدد الصلاحية"""
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """ساعة افتراضية لا تتحرك إلا عند ضبطها"""
+
+    def __init__(self, start: Optional[datetime] = None):
+        """
+        :param start: الوقت الابتدائي (الافتراضي: الوقت الحقيقي عند الإنشاء)
+        """
+        self._now = self._to_datetime(start) if start is not None else datetime.now()
+
+    @staticmethod
+    def _to_datetime(value) -> datetime:
+        """تحويل الوقت (نص أو Timestamp أو datetime) إلى datetime بنفس المنطقة الزمنية"""
+        return pd.Timestamp(value).to_pydatetime()
+
+    def now(self) -> datetime:
+        return self._now
+
+    def monotonic(self) -> float:
+        return pd.Timestamp(self._now).value / 1e9
+
+    def set(self, value):
+        """ضبط الوقت الحالي"""
+        self._now = self._to_datetime(value)
+
+    def advance(self, seconds: float):
+        """تقديم الوقت"""
+        self._now = self._now + timedelta(seconds=seconds)
+
+    def sleep(self, seconds: float):
+        """الانتظار يقدم الوقت الافتراضي ويعود فوراً"""
+        self.advance(seconds)
+
+
+wall_clock = WallClock()
@@ -0,0 +1,269 @@
+"""
+تخزين مضغوط للشموع والمؤشرات
+- مصفوفة أوقات واحدة (int64) مشتركة لكل أعمدة السهم بدلاً من فهرس لكل Series
+- OHLCV والمؤشرات في كتلة float32 واحدة ثنائية الأبعاد (كل عمود متجاور في الذاكرة)
+- كائنات pandas تبنى فقط عند الطلب كعروض (views) على نفس الذاكرة بدون نسخ
+- SharedBars تضع الكتل في ذاكرة مشتركة لتقرأها عدة عمليات بدون نسخ أو pickle
+"""
+
+from multiprocessing import shared_memory
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from market_data import OHLCV_COLUMNS
+
+
+class CompactBars:
+    """شموع ومؤشرات سهم واحد في مصفوفات متجاورة"""
+
+    def __init__(self, symbol: str, timestamps: np.ndarray, columns: List[str],
+                 block: np.ndarray, tz=None, index_name: str = None):
+        """
+        :param timestamps: أوقات الشموع (int64 نانو ثانية بتوقيت UTC)
+        :param columns: أسماء صفوف الكتلة (أعمدة الشموع ثم المؤشرات)
+        :param block: مصفوفة (عدد الأعمدة × عدد الشموع)
+        :param tz: المنطقة الزمنية لعرض الفهرس
+        """
+        if block.shape != (len(columns), len(timestamps)):
+            raise ValueError("أبعاد الكتلة لا تطابق الأعمدة والأوقات")
+
+        self.symbol = symbol
+        self.timestamps = timestamps
+        self.columns = list(columns)
+        self.block = block
+        self.tz = tz
+        self.index_name = index_name
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+
+    @classmethod
+    def from_frame(cls, symbol: str, data: pd.DataFrame,
+                   indicators: Dict[str, pd.Series] = None,
+                   dtype=np.float32) -> 'CompactBars':
+        """
+        بناء التخزين المضغوط من DataFrame الشموع وقاموس المؤشرات
+        :param dtype: نوع القيم (float32 افتراضياً - float64 للدقة الكاملة)
+        """
+        index = pd.DatetimeIndex(data.index)
+        columns = [c for c in OHLCV_COLUMNS if c in data.columns]
+        arrays = [data[c] for c in columns]
+
+        for name, series in (indicators or {}).items():
+            if not isinstance(series, pd.Series):
+                continue
+            if len(series) != len(index):
+                series = series.reindex(index)
+            columns.append(name)
+            arrays.append(series)
+
+        block = np.empty((len(columns), len(index)), dtype=dtype)
+        for row, values in enumerate(arrays):
+            block[row] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+        utc = index.tz_convert('UTC') if index.tz is not None else index
+        timestamps = np.array(utc.as_unit('ns').asi8, dtype=np.int64)
+        return cls(symbol, timestamps, columns, block, tz=index.tz, index_name=index.name)
+
+    @classmethod
+    def from_analyzer(cls, analyzer, dtype=np.float32) -> 'CompactBars':
+        """بناء التخزين المضغوط من محلل فني (المؤشرات المحسوبة فقط)"""
+        return cls.from_frame(analyzer.symbol, analyzer.data, analyzer.indicators, dtype=dtype)
+
+    # ==================== القراءة ====================
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._positions
+
+    @property
+    def indicator_names(self) -> List[str]:
+        return [c for c in self.columns if c not in OHLCV_COLUMNS]
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        """فهرس الأوقات - يبنى عند كل طلب ولا يحفظ"""
+        index = pd.DatetimeIndex(self.timestamps.view('M8[ns]'), name=self.index_name)
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return index
+
+    def column(self, name: str) -> np.ndarray:
+        """قيم عمود كمصفوفة numpy (عرض على الكتلة بدون نسخ)"""
+        return self.block[self._positions[name]]
+
+    def series(self, name: str, index: pd.DatetimeIndex = None) -> pd.Series:
+        """عمود كـ pandas Series بدون نسخ القيم"""
+        if index is None:
+            index = self.index
+        return pd.Series(self.column(name), index=index, name=name, copy=False)
+
+    def indicators(self, names: List[str] = None) -> Dict[str, pd.Series]:
+        """المؤشرات كقاموس Series (بنفس شكل TechnicalAnalyzer.indicators) بفهرس مشترك"""
+        index = self.index
+        names = self.indicator_names if names is None else [n for n in names if n in self]
+        return {name: self.series(name, index) for name in names}
+
+    def to_frame(self, columns: List[str] = None) -> pd.DataFrame:
+        """DataFrame للشموع (أو لأعمدة محددة)"""
+        index = self.index
+        columns = [c for c in OHLCV_COLUMNS if c in self] if columns is None else columns
+        return pd.DataFrame({c: self.series(c, index) for c in columns}, index=index, copy=False)
+
+    def latest(self, names: List[str] = None) -> Dict:
+        """أحدث القيم بنفس شكل TechnicalAnalyzer.get_latest_values"""
+        if not len(self):
+            return {}
+
+        last = self.block[:, -1]
+        latest = {
+            'Symbol': self.symbol,
+            'Timestamp': self.index[-1],
+            'Close': float(last[self._positions['Close']]),
+            'Volume': float(last[self._positions['Volume']]),
+        }
+        for name in (self.indicator_names if names is None else names):
+            position = self._positions.get(name)
+            if position is None:
+                continue
+            value = float(last[position])
+            latest[name] = value if not np.isnan(value) else None
+        return latest
+
+    # ==================== الذاكرة ====================
+
+    @property
+    def nbytes(self) -> int:
+        """حجم البيانات المخزنة بالبايت"""
+        return int(self.block.nbytes + self.timestamps.nbytes)
+
+    def memory_usage(self) -> Dict:
+        """تفاصيل استهلاك الذاكرة لهذا السهم"""
+        return {
+            'symbol': self.symbol,
+            'bars': len(self),
+            'columns': len(self.columns),
+            'dtype': str(self.block.dtype),
+            'values_bytes': int(self.block.nbytes),
+            'timestamps_bytes': int(self.timestamps.nbytes),
+            'total_bytes': self.nbytes,
+        }
+
+
+class SharedBars:
+    """
+    كتل عدة أسهم في مقطع ذاكرة مشتركة واحد
+    العملية الرئيسية تنشئه بـ create والعمليات العاملة تفتحه بـ attach(name, layout)
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, layout: Dict[str, Dict], owner: bool):
+        self._shm = shm
+        self.layout = layout
+        self.owner = owner
+
+    @classmethod
+    def create(cls, items: Dict[str, CompactBars]) -> 'SharedBars':
+        """نسخ الكتل إلى ذاكرة مشتركة جديدة (مرة واحدة)"""
+        size = sum(bars.block.nbytes + bars.timestamps.nbytes for bars in items.values())
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+        layout = {}
+        offset = 0
+        for symbol, bars in items.items():
+            block = np.ndarray(bars.block.shape, bars.block.dtype, buffer=shm.buf, offset=offset)
+            block[:] = bars.block
+            timestamps_offset = offset + bars.block.nbytes
+            timestamps = np.ndarray(bars.timestamps.shape, np.int64, buffer=shm.buf, offset=timestamps_offset)
+            timestamps[:] = bars.timestamps
+
+            layout[symbol] = {
+                'columns': bars.columns,
+                'shape': bars.block.shape,
+                'dtype': bars.block.dtype.str,
+                'offset': offset,
+                'timestamps_offset': timestamps_offset,
+                'tz': bars.tz,
+                'index_name': bars.index_name,
+            }
+            offset = timestamps_offset + bars.timestamps.nbytes
+            del block, timestamps
+
+        return cls(shm, layout, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, layout: Dict[str, Dict]) -> 'SharedBars':
+        """فتح ذاكرة مشتركة أنشأتها عملية أخرى"""
+        return cls(shared_memory.SharedMemory(name=name), layout, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self.layout)
+
+    def get(self, symbol: str) -> CompactBars:
+        """كتلة سهم كعرض على الذاكرة المشتركة (للقراءة فقط)"""
+        entry = self.layout[symbol]
+        block = np.ndarray(entry['shape'], np.dtype(entry['dtype']), buffer=self._shm.buf,
+                           offset=entry['offset'])
+        timestamps = np.ndarray((entry['shape'][1],), np.int64, buffer=self._shm.buf,
+                                offset=entry['timestamps_offset'])
+        block.flags.writeable = False
+        timestamps.flags.writeable = False
+        return CompactBars(symbol, timestamps, entry['columns'], block,
+                           tz=entry['tz'], index_name=entry['index_name'])
+
+    def close(self):
+        """إغلاق الذاكرة (والمالك يحذفها)"""
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # ما زالت هناك عروض مفتوحة - تغلق مع انتهاء العملية
+        if self.owner:
+            self._shm.unlink()
+
+
+def pandas_memory(data: pd.DataFrame, indicators: Dict[str, pd.Series] = None) -> int:
+    """حجم الشموع والمؤشرات بتمثيل pandas بالبايت (كل فهرس مختلف يحسب مرة واحدة)"""
+    total = int(data.memory_usage(index=True, deep=True).sum())
+    seen = {id(data.index)}
+    for series in (indicators or {}).values():
+        if not isinstance(series, pd.Series):
+            continue
+        total += int(series.memory_usage(index=False, deep=True))
+        if id(series.index) not in seen:
+            seen.add(id(series.index))
+            total += int(series.index.memory_usage(deep=True))
+    return total
+
+
+def memory_report(items: Dict[str, object]) -> Dict:
+    """
+    تقرير الذاكرة لعدة أسهم (لتقدير حجم العمليات العاملة)
+    :param items: {symbol: CompactBars أو (DataFrame, indicators)}
+    """
+    symbols = {}
+    for symbol, item in items.items():
+        if item is None:
+            continue
+        if isinstance(item, CompactBars):
+            symbols[symbol] = item.memory_usage()
+        else:
+            data, indicators = item
+            symbols[symbol] = {
+                'symbol': symbol,
+                'bars': len(data),
+                'total_bytes': pandas_memory(data, indicators),
+            }
+
+    total = sum(usage['total_bytes'] for usage in symbols.values())
+    return {
+        'symbols': symbols,
+        'count': len(symbols),
+        'total_bytes': total,
+        'avg_bytes': total / len(symbols) if symbols else 0,
+    }
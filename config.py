@@ -157,6 +157,78 @@ MACD_SIGNAL = 9
 BB_PERIOD = 20
 BB_STD = 2
 
+# ═══════════════════════════════════════════════════════════════
+# إعدادات البيانات
+# ═══════════════════════════════════════════════════════════════
+
+# مخزن الشموع على القرص (يجلب الشموع الجديدة فقط بعد آخر شمعة محفوظة)
+DATA_CACHE_ENABLED = True
+DATA_CACHE_DIR = ".cache/bars"
+
+# عدد الأسهم في كل طلب تحميل جماعي
+BULK_DOWNLOAD_CHUNK_SIZE = 50
+
+# حد معدل الطلبات لمزود البيانات (Token Bucket)
+API_RATE_LIMIT = 10  # طلب في الثانية
+API_BURST = 20  # أقصى دفعة طلبات بدون انتظار
+
+# المسح المتوازي لقائمة الأسهم
+SCAN_MAX_WORKERS = 8  # عدد الخيوط
+SCAN_CHUNK_SIZE = 10  # عدد الأسهم في كل دفعة جلب
+
+# مزود بيانات السوق: "yfinance" للبيانات الحية أو "replay" لإعادة تشغيل بيانات مسجلة بدون شبكة
+MARKET_DATA_PROVIDER = "yfinance"
+REPLAY_DATA_DIR = "fixtures"  # الملفات: fixtures/<interval>/<SYMBOL>.csv أو .parquet
+REPLAY_SPEED = None  # None = كل البيانات متاحة مباشرة، 60 = دقيقة افتراضية لكل ثانية
+
+# مدة صلاحية السعر الحالي في الذاكرة المشتركة (بالثواني)
+QUOTE_CACHE_TTL = 15
+
+# الاحتفاظ بسجل الشموع والمؤشرات لكل سهم في البوت بين عمليات المسح
+# "none" = أحدث القيم فقط، "compact" = float32 بفهرس أوقات واحد، "full" = كائنات pandas كاملة
+ANALYSIS_HISTORY = "none"
+
+# البحث عن أفضل معاملات الاستراتيجيات (عدد العمليات - None = كل الأنوية)
+SWEEP_MAX_WORKERS = None
+
+# نتائج نوافذ التحسين المتدحرج على القرص (النوافذ المحسوبة لا يعاد حسابها)
+WALK_FORWARD_CACHE_DIR = ".cache/walk_forward"
+
+# نتائج الاختبار الخلفي على القرص حسب بصمة الشموع والاستراتيجية (الأقدم استخداماً يحذف عند تجاوز الحجم)
+BACKTEST_CACHE_DIR = ".cache/backtests"
+BACKTEST_CACHE_MAX_MB = 64
+
+# قياس الأداء (benchmarks.py): خط الأساس وأقصى زيادة مسموحة في الزمن قبل فشل التشغيل
+BENCHMARK_BASELINE = ".benchmarks/baseline.json"
+BENCHMARK_THRESHOLD = 0.25
+
+# قياس زمن مراحل المسح (metrics.py): مسار /metrics في web_app وملخص بعد كل مسح
+METRICS_ENABLED = True
+METRICS_PER_SYMBOL = True  # False = المرحلة فقط (عدد أقل من السلاسل مع قوائم الأسهم الكبيرة)
+
+# لقطة تحليل قائمة المراقبة في الخلفية لمسار /analyze (بالثواني)
+ANALYSIS_SNAPSHOT_INTERVAL = 300  # الفاصل بين التحديثات
+ANALYSIS_SNAPSHOT_WAIT = 30  # أقصى انتظار لأول لقطة عند أول طلب بعد تشغيل الخادم
+
+# بث تغييرات المحفظة للمتصفحات (/api/portfolio/stream) بالثواني
+PORTFOLIO_STREAM_INTERVAL = 2  # الفاصل بين فحوصات التغيير (منتج واحد لكل المتصفحات)
+PORTFOLIO_STREAM_HEARTBEAT = 15  # رسالة فارغة لإبقاء الاتصال مفتوحاً
+# كل اتصال بث يشغل خيطاً من خيوط gunicorn (--threads في render.yaml) طوال فتح الصفحة
+# الحد أقل من عدد الخيوط حتى تبقى خيوط لباقي المسارات - المتصفحات الزائدة تستعلم كل 5 ثوان
+PORTFOLIO_STREAM_MAX_SUBSCRIBERS = 8
+
+# نتائج التحليل والإشارات في الذاكرة (result_cache.py): اليومية صالحة حتى افتتاح الجلسة القادمة
+# بعد انتهاء الصلاحية تعاد النتيجة القديمة فوراً ويعاد حسابها في الخلفية
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_INTRADAY_TTL = 60  # صلاحية النتائج اللحظية (وأثناء جلسة التداول للشموع اليومية) بالثواني
+RESULT_CACHE_MAX_STALE = 3600  # أقصى قدم للنتيجة المعادة أثناء إعادة الحساب بالثواني
+RESULT_CACHE_MAX_ENTRIES = 5000
+RESULT_CACHE_REFRESH_WORKERS = 2
+
+# واجهة نتائج التحليل (/api/analysis): عدد الأسهم في الصفحة وحده الأقصى
+ANALYSIS_PAGE_SIZE = 50
+ANALYSIS_PAGE_MAX = 200
+
 # ═══════════════════════════════════════════════════════════════
 # إعدادات البوت
 # ═══════════════════════════════════════════════════════════════
@@ -0,0 +1,310 @@
+"""
+ذاكرة تخزين دائمة لبيانات الأسعار (OHLCV)
+تحفظ الشموع لكل (سهم، فاصل زمني) على القرص بتنسيق عمودي مضغوط
+وتجلب فقط الشموع الجديدة بعد آخر طابع زمني محفوظ
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import config
+
+
+# أعمدة الشموع المحفوظة (أعمدة أخرى مثل Dividends من Ticker.history لا تحفظ)
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# إزاحة بداية كل فترة يدعمها yfinance (max = كل التاريخ المتاح)
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=5),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+
+def period_start(period: str, now: pd.Timestamp = None) -> Optional[pd.Timestamp]:
+    """
+    حساب بداية الفترة المطلوبة بتوقيت UTC
+    :param period: الفترة (1mo, 6mo, 1y, ytd, max ...)
+    :return: الطابع الزمني للبداية أو None للفترة max
+    """
+    now = now if now is not None else pd.Timestamp.now(tz='UTC')
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return pd.Timestamp(year=now.year, month=1, day=1, tz='UTC')
+    if period not in PERIOD_OFFSETS:
+        raise ValueError(f"فترة غير مدعومة: {period}")
+    return now - PERIOD_OFFSETS[period]
+
+
+class BarCache:
+    """مخزن الشموع على القرص - ملف npz واحد لكل (سهم، فاصل زمني)"""
+
+    def __init__(self, cache_dir: str = ".cache/bars"):
+        self.cache_dir = cache_dir
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        # إحصائيات
+        self.full_downloads = 0
+        self.incremental_downloads = 0
+        self.bars_downloaded = 0
+
+    def _path(self, symbol: str, interval: str) -> str:
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return os.path.join(self.cache_dir, interval, f"{safe_symbol}.npz")
+
+    def _lock(self, path: str) -> threading.Lock:
+        with self._locks_guard:
+            if path not in self._locks:
+                self._locks[path] = threading.Lock()
+            return self._locks[path]
+
+    def load(self, symbol: str, interval: str):
+        """
+        قراءة الشموع المحفوظة
+        :return: (DataFrame, بداية التغطية) أو (None, None) إذا لم تكن محفوظة
+        """
+        path = self._path(symbol, interval)
+        if not os.path.exists(path):
+            return None, None
+
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                columns = [str(c) for c in archive['columns']]
+                tz = str(archive['tz'])
+                index = pd.to_datetime(archive['index'], utc=True)
+                if tz:
+                    index = index.tz_convert(tz)
+                else:
+                    index = index.tz_localize(None)
+                data = pd.DataFrame(
+                    {col: archive[f"col_{i}"] for i, col in enumerate(columns)},
+                    index=index
+                )
+                data.index.name = str(archive['index_name']) or None
+                covered_from = int(archive['covered_from'])
+        except Exception:
+            # ملف تالف - يعاد تحميله بالكامل
+            return None, None
+
+        covered = None if covered_from < 0 else pd.Timestamp(covered_from, tz='UTC')
+        return data, covered
+
+    def save(self, symbol: str, interval: str, data: pd.DataFrame,
+             covered_from: Optional[pd.Timestamp]):
+        """حفظ الشموع على القرص (كتابة ذرية عبر ملف مؤقت)"""
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        index = data.index
+        tz = str(index.tz) if index.tz is not None else ''
+        index_utc = index.tz_convert('UTC') if index.tz is not None else index.tz_localize('UTC')
+
+        arrays = {
+            'index': index_utc.as_unit('ns').asi8,
+            'index_name': np.array(index.name or ''),
+            'tz': np.array(tz),
+            'columns': np.array(list(data.columns), dtype=str),
+            'covered_from': np.array(-1 if covered_from is None else covered_from.value),
+        }
+        for i, col in enumerate(data.columns):
+            arrays[f"col_{i}"] = data[col].to_numpy(dtype=np.float64)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _normalize(data: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """أعمدة OHLCV فقط (Ticker.history يضيف Dividends و Stock Splits و yf.download لا يضيفها)"""
+        if data is None:
+            return None
+        return data[[name for name in OHLCV_COLUMNS if name in data.columns]]
+
+    @staticmethod
+    def _align_tz(data: pd.DataFrame, tz) -> pd.DataFrame:
+        """تحويل فهرس الشموع لمنطقة زمنية أخرى (الفهرس بدون منطقة يعامل كـ UTC)"""
+        index = data.index
+        if index.tz is None and tz is None:
+            return data
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        index = index.tz_convert(tz) if tz is not None else index.tz_convert('UTC').tz_localize(None)
+        return data.set_axis(index.rename(data.index.name))
+
+    @classmethod
+    def merge(cls, cached: Optional[pd.DataFrame], fresh: pd.DataFrame) -> pd.DataFrame:
+        """دمج الشموع الجديدة مع المحفوظة - الشمعة الأحدث تستبدل القديمة"""
+        cached, fresh = cls._normalize(cached), cls._normalize(fresh)
+        if cached is None or cached.empty:
+            return fresh.sort_index() if fresh is not None else None
+        if fresh is None or fresh.empty:
+            return cached
+
+        fresh = cls._align_tz(fresh, cached.index.tz)
+
+        merged = pd.concat([cached, fresh])
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        return merged
+
+    def _covers(self, cached: Optional[pd.DataFrame], covered_from: Optional[pd.Timestamp],
+                start: Optional[pd.Timestamp]) -> bool:
+        """هل تغطي الشموع المحفوظة بداية الفترة المطلوبة؟"""
+        return cached is not None and not cached.empty and (
+            covered_from is None or (start is not None and covered_from <= start)
+        )
+
+    def _store(self, symbol: str, interval: str, fresh: Optional[pd.DataFrame],
+               covered_from: Optional[pd.Timestamp]) -> Optional[pd.DataFrame]:
+        """دمج الشموع الجديدة مع الملف الحالي وحفظها"""
+        path = self._path(symbol, interval)
+        with self._lock(path):
+            # إعادة القراءة تحت القفل لتجنب فقدان ما كتبه خيط آخر
+            current, current_covered = self.load(symbol, interval)
+            merged = self.merge(current, fresh)
+
+            if merged is None or merged.empty:
+                return None
+
+            # التغطية الناتجة هي الأقدم بين الملف الحالي والتحميل الجديد (None = كل التاريخ)
+            if current is not None:
+                if current_covered is None or covered_from is None:
+                    covered_from = None
+                else:
+                    covered_from = min(current_covered, covered_from)
+
+            if fresh is not None and not fresh.empty:
+                self.save(symbol, interval, merged, covered_from)
+
+        return merged
+
+    def get_bars(self, symbol: str, period: str, interval: str,
+                 download: Callable[..., pd.DataFrame], start: pd.Timestamp = None) -> pd.DataFrame:
+        """
+        جلب الشموع مع الاستفادة من المخزن
+        :param download: دالة التحميل وتقبل period= أو start=
+        :param start: بداية ثابتة بدلاً من بداية period
+        :return: الشموع التي تغطي الفترة المطلوبة
+        """
+        frames = self.get_bars_many(
+            [symbol], period, interval,
+            lambda symbols, **kwargs: {symbol: download(**kwargs)},
+            start=start
+        )
+        return frames.get(symbol, pd.DataFrame())
+
+    def get_bars_many(self, symbols: List[str], period: str, interval: str,
+                      download_many: Callable[..., Dict[str, pd.DataFrame]],
+                      start: pd.Timestamp = None) -> Dict[str, pd.DataFrame]:
+        """
+        جلب شموع عدة أسهم بأقل عدد من طلبات التحميل الجماعية
+        :param download_many: دالة تحميل جماعي تقبل (symbols, period=) أو (symbols, start=)
+                              وتعيد قاموس {السهم: DataFrame}
+        :param start: بداية ثابتة بدلاً من بداية period (مثل anchored_start)
+        :return: قاموس {السهم: الشموع التي تغطي الفترة المطلوبة}
+        """
+        fixed_start = start is not None
+        if fixed_start:
+            start = pd.Timestamp(start)
+            start = start.tz_localize('UTC') if start.tz is None else start.tz_convert('UTC')
+        else:
+            start = period_start(period)
+
+        cached_frames = {}
+        covered = {}
+        full_symbols = []
+        for symbol in symbols:
+            cached, covered_from = self.load(symbol, interval)
+            if self._covers(cached, covered_from, start):
+                cached_frames[symbol] = cached
+                covered[symbol] = covered_from
+            else:
+                full_symbols.append(symbol)
+
+        fresh_frames = {}
+
+        # الأسهم غير المحفوظة - تحميل كامل للفترة في طلب جماعي واحد
+        if full_symbols:
+            if fixed_start:
+                fresh_frames.update(download_many(full_symbols, start=start))
+            else:
+                fresh_frames.update(download_many(full_symbols, period=period))
+            self.full_downloads += 1
+            for symbol in full_symbols:
+                covered[symbol] = start
+
+        # الأسهم المحفوظة - تحميل الشموع بعد "آخر شمعة" فقط (مع إعادتها لأنها قد تكون غير مكتملة)
+        # طلب جماعي لكل يوم آخر شمعة: سهم متأخر لا يوسع التحميل لباقي الأسهم
+        groups: Dict[pd.Timestamp, List[str]] = {}
+        for symbol, frame in cached_frames.items():
+            last = self._align_tz(frame.iloc[-1:], 'UTC').index[0]
+            groups.setdefault(last.floor('D'), []).append(symbol)
+        for group in groups.values():
+            since = min(cached_frames[symbol].index[-1] for symbol in group)
+            fresh_frames.update(download_many(group, start=since))
+            self.incremental_downloads += 1
+
+        results = {}
+        for symbol in symbols:
+            fresh = fresh_frames.get(symbol)
+            self.bars_downloaded += 0 if fresh is None else len(fresh)
+
+            merged = self._store(symbol, interval, fresh, covered.get(symbol))
+            if merged is None:
+                continue
+
+            if start is not None:
+                # start بتوقيت UTC - الفهرس بدون منطقة زمنية يقارن كـ UTC
+                since = start if merged.index.tz is not None else start.tz_convert('UTC').tz_localize(None)
+                merged = merged[merged.index >= since]
+            results[symbol] = merged
+
+        return results
+
+    def clear(self, symbol: str = None, interval: str = None):
+        """حذف الملفات المحفوظة (لسهم معين أو للكل)"""
+        if symbol and interval:
+            path = self._path(symbol, interval)
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        if not os.path.isdir(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.npz'):
+                    os.remove(os.path.join(root, name))
+
+    def get_stats(self) -> Dict:
+        """إحصائيات المخزن"""
+        return {
+            'full_downloads': self.full_downloads,
+            'incremental_downloads': self.incremental_downloads,
+            'bars_downloaded': self.bars_downloaded,
+        }
+
+
+_bar_cache = None
+_bar_cache_lock = threading.Lock()
+
+
+def get_bar_cache() -> BarCache:
+    """المخزن المشترك على مستوى العملية"""
+    global _bar_cache
+    with _bar_cache_lock:
+        if _bar_cache is None:
+            _bar_cache = BarCache(config.DATA_CACHE_DIR)
+        return _bar_cache
@@ -2,9 +2,9 @@
 نسخة تجريبية سريعة للبوت
 """
 
-import yfinance as yf
 from datetime import datetime
 from colorama import init, Fore, Style
+from market_data import get_provider
 
 init(autoreset=True)
 
@@ -20,8 +20,7 @@ print(f"{Fore.YELLOW}📊 جارٍ تحليل الأسهم...{Style.RESET_ALL}\n
 for symbol in stocks:
     try:
         # جلب البيانات
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period="5d")
+        hist = get_provider().get_history(symbol, "1d", period="5d")
         
         if not hist.empty:
             current_price = hist['Close'].iloc[-1]
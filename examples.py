@@ -4,6 +4,7 @@
 
 from technical_analysis import TechnicalAnalyzer, analyze_stock
 from trading_strategy import CompositeStrategy, backtest_strategy, MomentumStrategy
+from backtest_cache import anchored_start, get_backtest_cache
 from risk_management import RiskManager
 import pandas as pd
 
@@ -119,15 +120,23 @@ def example_5_backtest():
     print("=" * 70)
     
     strategy = MomentumStrategy()
-    result = backtest_strategy("AAPL", strategy, period="1y", initial_capital=10000)
-    
-    print(f"\nالاستراتيجية: {result['strategy']}")
+    # النتيجة تحفظ على القرص: التشغيل التالي على نفس الشموع فوري
+    # والبداية الثابتة (سنة مقربة لأول الشهر) تجعل الأيام الجديدة تكمل محاكاة الصفقات من آخر حالة
+    cache = get_backtest_cache()
+    start = anchored_start("1y")
+    result = backtest_strategy("AAPL", strategy, start=start, initial_capital=10000, cache=cache)
+    
+    print(f"\nالفترة: منذ {start:%Y-%m-%d} (سنة من أول الشهر)")
+    print(f"الاستراتيجية: {result['strategy']}")
     print(f"السهم: {result['symbol']}")
     print(f"رأس المال الأولي: ${result['initial_capital']:,.2f}")
     print(f"رأس المال النهائي: ${result['final_capital']:,.2f}")
     print(f"العائد الإجمالي: {result['total_return']:.2f}%")
     print(f"عدد الصفقات: {result['num_trades']}")
     
+    stats = cache.get_stats()
+    print(f"ذاكرة النتائج: {stats['hits']} من القرص | {stats['resumed']} إكمال | {stats['misses']} حساب كامل")
+    
     if result['trades']:
         print(f"\nآخر 3 صفقات:")
         for trade in result['trades'][-3:]:
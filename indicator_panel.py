@@ -0,0 +1,285 @@
+"""
+محرك مؤشرات متجه لعدة أسهم دفعة واحدة
+يصف شموع أسهم كل سوق في مصفوفات (الأسهم × الشموع) ويحسب كل عائلة مؤشرات
+لكل الأسهم في خطوة واحدة بدلاً من سلسلة pandas/ta منفصلة لكل سهم
+النتائج لكل سهم مطابقة لما يعيده TechnicalAnalyzer.calculate_all_indicators
+الصفوف محاذاة بعدد الشموع لا بالوقت: نفس العمود قد يكون يوماً مختلفاً لكل سهم (عطل، أسهم حديثة)
+فالقراءة الصحيحة لكل سهم على حدة (indicators) أو لآخر شمعة لكل سهم (latest) لا عمود بعينه عبر الأسهم
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from technical_analysis import INDICATOR_GROUPS, resolve_indicator_groups
+from markets import get_market, group_by_market
+from market_data import OHLCV_COLUMNS
+
+
+# ==================== دوال متجهة على محور الزمن ====================
+
+def _shift(x: np.ndarray) -> np.ndarray:
+    """القيمة السابقة لكل شمعة"""
+    out = np.full_like(x, np.nan)
+    out[:, 1:] = x[:, :-1]
+    return out
+
+
+def _rolling(x: np.ndarray, window: int, func) -> np.ndarray:
+    """دالة على نافذة متحركة - النافذة التي تحتوي قيمة فارغة تعطي قيمة فارغة"""
+    out = np.full_like(x, np.nan)
+    if x.shape[1] >= window:
+        out[:, window - 1:] = func(sliding_window_view(x, window, axis=1), axis=-1)
+    return out
+
+
+def _ema(x: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    """متوسط أسي (ewm بدون adjust) - يبدأ من أول قيمة غير فارغة لكل سهم"""
+    out = np.full_like(x, np.nan)
+    value = np.full(x.shape[0], np.nan)
+    count = np.zeros(x.shape[0])
+
+    for t in range(x.shape[1]):
+        xt = x[:, t]
+        valid = ~np.isnan(xt)
+        value = np.where(valid, np.where(np.isnan(value), xt, (1 - alpha) * value + alpha * xt), value)
+        count += valid
+        out[:, t] = np.where(count >= min_periods, value, np.nan)
+
+    return out
+
+
+def _wilder(x: np.ndarray, window: int, mode: str = "average") -> np.ndarray:
+    """
+    تنعيم وايلدر لكل سهم بدءاً من أول قيمة غير فارغة
+    :param mode: average = متوسط أول window قيمة ثم (السابق*(n-1)+الجديد)/n
+                 sum = مجموع أول window قيمة ثم السابق - السابق/n + الجديد
+    """
+    out = np.full_like(x, np.nan)
+    value = np.full(x.shape[0], np.nan)
+    seed = np.zeros(x.shape[0])
+    count = np.zeros(x.shape[0])
+
+    for t in range(x.shape[1]):
+        xt = x[:, t]
+        valid = ~np.isnan(xt)
+        count += valid
+        seed += np.where(valid & (count <= window), xt, 0.0)
+
+        seeded = valid & (count == window)
+        value = np.where(seeded, seed / window if mode == "average" else seed, value)
+
+        recur = valid & (count > window)
+        if mode == "average":
+            value = np.where(recur, (value * (window - 1) + xt) / float(window), value)
+        else:
+            value = np.where(recur, value - (value / float(window)) + xt, value)
+
+        out[:, t] = value
+
+    return out
+
+
+class IndicatorPanel:
+    """
+    لوحة شموع أسهم سوق واحد
+    كل سهم في صف، وشموعه محاذاة لليمين بعدد الشموع (آخر شمعة في آخر عمود) مع قيم فارغة قبل بدايته
+    الأعمدة ليست تقويماً مشتركاً: المؤشرات تحسب على شموع كل سهم المتتالية كما في TechnicalAnalyzer
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], market: str = None):
+        """
+        :param frames: قاموس {السهم: DataFrame} بالأعمدة Open/High/Low/Close/Volume
+        :param market: رمز السوق (الافتراضي من أول سهم)
+        """
+        self.frames = {symbol: data for symbol, data in frames.items()
+                       if data is not None and not data.empty}
+        self.symbols: List[str] = list(self.frames)
+        self.market = market or (get_market(self.symbols[0]) if self.symbols else None)
+        self._rows = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        lengths = np.array([len(data) for data in self.frames.values()], dtype=int)
+        self.length = int(lengths.max()) if len(lengths) else 0
+        self.starts = self.length - lengths
+
+        self.bars: Dict[str, np.ndarray] = {}
+        for col in OHLCV_COLUMNS:
+            panel = np.full((len(self.symbols), self.length), np.nan)
+            for i, data in enumerate(self.frames.values()):
+                panel[i, self.starts[i]:] = data[col].to_numpy(dtype=float)
+            self.bars[col] = panel
+
+        self.values: Dict[str, np.ndarray] = {}
+        self._shifted: Dict[str, np.ndarray] = {}
+
+    def compute(self, names: List[str] = None) -> Dict[str, np.ndarray]:
+        """
+        حساب المؤشرات لكل الأسهم - مصفوفة (الأسهم × الشموع) لكل مؤشر
+        :param names: المؤشرات المطلوبة (مجموعات أو مفاتيح) - None = الكل
+        المجموعات المحسوبة مسبقاً لا يعاد حسابها
+        """
+        groups = resolve_indicator_groups(names)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for group in groups:
+                if any(key not in self.values for key in INDICATOR_GROUPS[group]):
+                    self.values.update(getattr(self, f'_compute_{group.lower()}')())
+
+        return {key: self.values[key] for group in groups for key in INDICATOR_GROUPS[group]}
+
+    def _prev(self, col: str) -> np.ndarray:
+        """قيم الشمعة السابقة لعمود (تحسب مرة واحدة)"""
+        if col not in self._shifted:
+            self._shifted[col] = _shift(self.bars[col])
+        return self._shifted[col]
+
+    @property
+    def position(self) -> np.ndarray:
+        """رقم الشمعة داخل تاريخ كل سهم (سالب في الحشو)"""
+        return np.arange(self.length)[None, :] - self.starts[:, None]
+
+    def _compute_sma(self) -> Dict[str, np.ndarray]:
+        close = self.bars['Close']
+        return {f'SMA_{w}': _rolling(close, w, np.mean) for w in (20, 50, 200)}
+
+    def _compute_ema(self) -> Dict[str, np.ndarray]:
+        close = self.bars['Close']
+        return {f'EMA_{w}': _ema(close, 2 / (w + 1), w) for w in (12, 26, 50)}
+
+    def _compute_rsi(self) -> Dict[str, np.ndarray]:
+        # الفرق الأول لكل سهم يعامل كصفر
+        in_range = self.position >= 0
+        diff = self.bars['Close'] - self._prev('Close')
+        up = np.where(in_range, np.where(diff > 0, diff, 0.0), np.nan)
+        down = np.where(in_range, np.where(diff < 0, -diff, 0.0), np.nan)
+        ema_up = _ema(up, 1 / 14, 14)
+        ema_down = _ema(down, 1 / 14, 14)
+        return {'RSI': np.where(ema_down == 0, 100, 100 - (100 / (1 + ema_up / ema_down)))}
+
+    def _compute_macd(self) -> Dict[str, np.ndarray]:
+        close = self.bars['Close']
+        ema_fast = self.values.get('EMA_12')
+        ema_slow = self.values.get('EMA_26')
+        if ema_fast is None or ema_slow is None:
+            ema_fast = _ema(close, 2 / (12 + 1), 12)
+            ema_slow = _ema(close, 2 / (26 + 1), 26)
+
+        macd = ema_fast - ema_slow
+        signal = _ema(macd, 2 / (9 + 1), 9)
+        return {'MACD': macd, 'MACD_Signal': signal, 'MACD_Diff': macd - signal}
+
+    def _compute_bollinger(self) -> Dict[str, np.ndarray]:
+        close = self.bars['Close']
+        mid = _rolling(close, 20, np.mean)
+        std = _rolling(close, 20, np.std)
+        high = mid + 2 * std
+        low = mid - 2 * std
+        return {
+            'BB_High': high,
+            'BB_Mid': mid,
+            'BB_Low': low,
+            'BB_Width': ((high - low) / mid) * 100,
+        }
+
+    def _compute_stochastic(self) -> Dict[str, np.ndarray]:
+        smin = _rolling(self.bars['Low'], 14, np.min)
+        smax = _rolling(self.bars['High'], 14, np.max)
+        stoch_k = 100 * (self.bars['Close'] - smin) / (smax - smin)
+        return {'Stoch_K': stoch_k, 'Stoch_D': _rolling(stoch_k, 3, np.mean)}
+
+    def _compute_atr(self) -> Dict[str, np.ndarray]:
+        # المدى الحقيقي لأول شمعة = أعلى - أدنى
+        high, low, prev_close = self.bars['High'], self.bars['Low'], self._prev('Close')
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        atr = _wilder(true_range, 14)
+        return {'ATR': np.where((self.position >= 0) & np.isnan(atr), 0.0, atr)}
+
+    def _compute_adx(self, window: int = 14) -> Dict[str, np.ndarray]:
+        """ADX بنفس ترتيب حساب ta: القيم قبل اكتمال النوافذ تساوي صفر"""
+        high, low = self.bars['High'], self.bars['Low']
+        prev_close = self._prev('Close')
+        position = self.position
+        in_range = position >= 0
+
+        movement = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+        diff_up = high - self._prev('High')
+        diff_down = self._prev('Low') - low
+        first = np.isnan(diff_up)
+        pos = np.where(first, np.nan, np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0))
+        neg = np.where(first, np.nan, np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0))
+
+        trs = _wilder(movement, window, "sum")
+        dip = _wilder(pos, window, "sum")
+        din = _wilder(neg, window, "sum")
+
+        di_pos = np.where(trs != 0, 100 * (dip / trs), 0.0)
+        di_neg = np.where(trs != 0, 100 * (din / trs), 0.0)
+        seeded = ~np.isnan(trs)
+
+        directional_index = np.where(
+            di_pos + di_neg != 0,
+            100 * np.abs((di_pos - di_neg) / (di_pos + di_neg)),
+            0.0
+        )
+        adx = _wilder(np.where(seeded, directional_index, np.nan), window)
+
+        # أول شمعة بعد النافذة لا تظهر في +DI/-DI لكنها تدخل في ADX
+        shown = seeded & (position > window)
+        return {
+            'ADX': np.where(in_range & np.isnan(adx), 0.0, adx),
+            'ADX_Pos': np.where(shown, di_pos, np.where(in_range, 0.0, np.nan)),
+            'ADX_Neg': np.where(shown, di_neg, np.where(in_range, 0.0, np.nan)),
+        }
+
+    def _compute_volume(self) -> Dict[str, np.ndarray]:
+        close, volume = self.bars['Close'], self.bars['Volume']
+        in_range = self.position >= 0
+        volume_sma = _rolling(volume, 20, np.mean)
+        signed = np.where(close < self._prev('Close'), -volume, volume)
+        obv = np.cumsum(np.where(in_range, signed, 0.0), axis=1)
+        return {
+            'Volume_SMA': volume_sma,
+            'OBV': np.where(in_range, obv, np.nan),
+            'Volume_Ratio': volume / volume_sma,
+        }
+
+    def indicators(self, symbol: str, names: List[str] = None) -> Dict[str, pd.Series]:
+        """مؤشرات سهم واحد بنفس شكل TechnicalAnalyzer.indicators (عروض على مصفوفات اللوحة)"""
+        values = self.compute(names)
+        row = self._rows[symbol]
+        start = self.starts[row]
+        index = self.frames[symbol].index
+        return {key: pd.Series(array[row, start:], index=index, copy=False)
+                for key, array in values.items()}
+
+    def latest(self, names: List[str] = None) -> pd.DataFrame:
+        """جدول أحدث قيم المؤشرات لكل الأسهم (سهم في كل صف - آخر شمعة لكل سهم وقد تختلف أوقاتها)"""
+        values = self.compute(names)
+        table = pd.DataFrame({key: array[:, -1] for key, array in values.items()}, index=self.symbols)
+        table.insert(0, 'Close', self.bars['Close'][:, -1])
+        table.insert(1, 'Volume', self.bars['Volume'][:, -1])
+        return table
+
+
+def build_panels(frames: Dict[str, pd.DataFrame]) -> Dict[str, IndicatorPanel]:
+    """لوحة لكل سوق (أسهم السوق الواحد تتشابه في عدد الشموع فيقل الحشو بين الصفوف)"""
+    return {
+        market: IndicatorPanel({symbol: frames[symbol] for symbol in symbols}, market)
+        for market, symbols in group_by_market(list(frames)).items()
+    }
+
+
+def compute_indicators_many(frames: Dict[str, pd.DataFrame],
+                            names: List[str] = None) -> Dict[str, Dict[str, pd.Series]]:
+    """
+    حساب مؤشرات عدة أسهم في خطوة متجهة واحدة لكل سوق
+    :param names: المؤشرات المطلوبة (مجموعات أو مفاتيح) - None = الكل
+    :return: قاموس {السهم: المؤشرات} - الأسهم بدون بيانات لا تظهر فيه
+    """
+    results = {}
+    for panel in build_panels(frames).values():
+        for symbol in panel.symbols:
+            results[symbol] = panel.indicators(symbol, names)
+    return results
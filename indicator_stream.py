@@ -0,0 +1,404 @@
+"""
+حساب المؤشرات الفنية بشكل تزايدي (شمعة بشمعة)
+كل مؤشر يحتفظ بحالته (متوسطات أسية، تنعيم وايلدر، مجاميع النوافذ المتحركة، رصيد OBV)
+ويتقدم بخطوة O(1) لكل شمعة جديدة بنفس نتائج الحساب الدفعي في مكتبة ta
+ويحفظ ما تغير في آخر خطوة فقط ليمكن التراجع عنها (undo) عند استبدال شمعة لم تكتمل
+"""
+
+import math
+from collections import deque
+from typing import Dict
+
+NAN = float('nan')
+
+
+class RollingWindow:
+    """نافذة متحركة بمجموع ومجموع مربعات جاريين (للمتوسط والانحراف المعياري)"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self._shift = 0.0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._pushes = 0
+        self._undo = None
+
+    def push(self, x: float):
+        evicted = self.values[0] if len(self.values) == self.window else None
+        self._undo = (evicted, self._shift, self._sum, self._sumsq, self._pushes)
+        if evicted is not None:
+            old = evicted - self._shift
+            self._sum -= old
+            self._sumsq -= old * old
+
+        self.values.append(x)
+        d = x - self._shift
+        self._sum += d
+        self._sumsq += d * d
+
+        # إعادة حساب المجاميع كل نافذة كاملة لمنع تراكم أخطاء التقريب
+        self._pushes += 1
+        if self._pushes >= self.window:
+            self._resync()
+
+    def _resync(self):
+        self._pushes = 0
+        self._shift = sum(self.values) / len(self.values)
+        self._sum = 0.0
+        self._sumsq = 0.0
+        for x in self.values:
+            d = x - self._shift
+            self._sum += d
+            self._sumsq += d * d
+
+    def undo(self):
+        """التراجع عن آخر push"""
+        if self._undo is None:
+            return
+        evicted, self._shift, self._sum, self._sumsq, self._pushes = self._undo
+        self._undo = None
+        self.values.pop()
+        if evicted is not None:
+            self.values.appendleft(evicted)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    def mean(self) -> float:
+        if not self.full:
+            return NAN
+        return self._shift + self._sum / self.window
+
+    def std(self) -> float:
+        """الانحراف المعياري للمجتمع (ddof=0) كما في نطاقات بولينجر"""
+        if not self.full:
+            return NAN
+        mean = self._sum / self.window
+        return math.sqrt(max(self._sumsq / self.window - mean * mean, 0.0))
+
+
+class RollingExtreme:
+    """أعلى/أدنى قيمة في نافذة متحركة (طابور رتيب - O(1) في المتوسط)"""
+
+    def __init__(self, window: int, mode: str = "max"):
+        self.window = window
+        self.mode = mode
+        self._items = deque()  # (رقم الشمعة، القيمة)
+        self._count = 0
+        self._undo = None
+
+    def push(self, x: float) -> float:
+        dropped, expired = [], []
+        if self.mode == "max":
+            while self._items and self._items[-1][1] <= x:
+                dropped.append(self._items.pop())
+        else:
+            while self._items and self._items[-1][1] >= x:
+                dropped.append(self._items.pop())
+
+        self._items.append((self._count, x))
+        self._count += 1
+        while self._items[0][0] <= self._count - 1 - self.window:
+            expired.append(self._items.popleft())
+        self._undo = (dropped, expired)
+
+        if self._count < self.window:
+            return NAN
+        return self._items[0][1]
+
+    def undo(self):
+        """التراجع عن آخر push بإعادة العناصر التي أخرجها"""
+        if self._undo is None:
+            return
+        dropped, expired = self._undo
+        self._undo = None
+        self._items.pop()
+        self._count -= 1
+        self._items.extend(reversed(dropped))
+        self._items.extendleft(reversed(expired))
+
+
+class Ema:
+    """متوسط أسي (ewm بدون adjust) - القيم الفارغة في البداية لا تحسب"""
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = NAN
+        self.count = 0
+        self._undo = None
+
+    def push(self, x: float) -> float:
+        self._undo = (self.value, self.count)
+        if math.isnan(x):
+            return self.value if self.count >= self.min_periods else NAN
+
+        if self.count == 0:
+            self.value = x
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * x
+        self.count += 1
+        return self.value if self.count >= self.min_periods else NAN
+
+    def undo(self):
+        if self._undo is not None:
+            self.value, self.count = self._undo
+            self._undo = None
+
+
+class WilderAverage:
+    """تنعيم وايلدر: متوسط أول window قيمة ثم (السابق * (n-1) + الجديد) / n"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.value = None
+        self._seed_sum = 0.0
+        self._seed_count = 0
+        self._undo = None
+
+    def push(self, x: float):
+        self._undo = (self.value, self._seed_sum, self._seed_count)
+        if self.value is None:
+            self._seed_sum += x
+            self._seed_count += 1
+            if self._seed_count == self.window:
+                self.value = self._seed_sum / self.window
+            return self.value
+
+        self.value = (self.value * (self.window - 1) + x) / float(self.window)
+        return self.value
+
+    def undo(self):
+        if self._undo is not None:
+            self.value, self._seed_sum, self._seed_count = self._undo
+            self._undo = None
+
+
+class WilderSum:
+    """مجموع وايلدر: مجموع أول window قيمة ثم السابق - السابق / n + الجديد"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.value = None
+        self._seed_sum = 0.0
+        self._seed_count = 0
+        self._undo = None
+
+    def push(self, x: float):
+        self._undo = (self.value, self._seed_sum, self._seed_count)
+        if self.value is None:
+            self._seed_sum += x
+            self._seed_count += 1
+            if self._seed_count == self.window:
+                self.value = self._seed_sum
+            return self.value
+
+        self.value = self.value - (self.value / float(self.window)) + x
+        return self.value
+
+    def undo(self):
+        if self._undo is not None:
+            self.value, self._seed_sum, self._seed_count = self._undo
+            self._undo = None
+
+
+class IndicatorStream:
+    """
+    حالة جميع مؤشرات TechnicalAnalyzer.calculate_all_indicators
+    update() تستقبل شمعة وتعيد قيم كل المؤشرات عند هذه الشمعة
+    undo() تعيد الحالة إلى ما قبل آخر update() (لاستبدال شمعة لم تكتمل)
+    """
+
+    KEYS = [
+        'SMA_20', 'SMA_50', 'SMA_200', 'EMA_12', 'EMA_26', 'EMA_50',
+        'RSI',
+        'MACD', 'MACD_Signal', 'MACD_Diff',
+        'BB_High', 'BB_Mid', 'BB_Low', 'BB_Width',
+        'Stoch_K', 'Stoch_D',
+        'ATR',
+        'ADX', 'ADX_Pos', 'ADX_Neg',
+        'Volume_SMA', 'OBV', 'Volume_Ratio',
+    ]
+
+    def __init__(self, rsi_period: int = 14, bb_period: int = 20, bb_std: int = 2,
+                 atr_period: int = 14, adx_period: int = 14, stoch_period: int = 14,
+                 stoch_smooth: int = 3):
+        self.bars = 0
+        self._prev = None  # (high, low, close) للشمعة السابقة
+
+        # المتوسطات المتحركة
+        self.sma = {w: RollingWindow(w) for w in (20, 50, 200)}
+        self.ema = {w: Ema(2 / (w + 1), w) for w in (12, 26, 50)}
+
+        # RSI
+        self.rsi_up = Ema(1 / rsi_period, rsi_period)
+        self.rsi_down = Ema(1 / rsi_period, rsi_period)
+
+        # MACD (12/26 من self.ema)
+        self.macd_signal = Ema(2 / (9 + 1), 9)
+
+        # بولينجر
+        self.bb = RollingWindow(bb_period)
+        self.bb_std = bb_std
+
+        # الاستوكاستك
+        self.stoch_low = RollingExtreme(stoch_period, "min")
+        self.stoch_high = RollingExtreme(stoch_period, "max")
+        self.stoch_k = deque(maxlen=stoch_smooth)
+
+        # ATR
+        self.atr = WilderAverage(atr_period)
+
+        # ADX
+        self.adx_period = adx_period
+        self.trs = WilderSum(adx_period)
+        self.dip = WilderSum(adx_period)
+        self.din = WilderSum(adx_period)
+        self.adx = WilderAverage(adx_period)
+
+        # الحجم
+        self.volume_sma = RollingWindow(20)
+        self.obv = 0.0
+
+        self._parts = (list(self.sma.values()) + list(self.ema.values()) + [
+            self.rsi_up, self.rsi_down, self.macd_signal, self.bb,
+            self.stoch_low, self.stoch_high, self.atr,
+            self.trs, self.dip, self.din, self.adx, self.volume_sma,
+        ])
+        self._undo = None
+
+    def update(self, open_: float, high: float, low: float, close: float,
+               volume: float) -> Dict[str, float]:
+        """تقديم كل المؤشرات بشمعة جديدة"""
+        values = {}
+        prev = self._prev
+
+        # بعض المؤشرات لا تتقدم في كل شمعة (ADX قبل اكتمال نافذته) فتمسح حالة تراجعها القديمة
+        for part in self._parts:
+            part._undo = None
+        stoch_evicted = self.stoch_k[0] if len(self.stoch_k) == self.stoch_k.maxlen else None
+        self._undo = (prev, self.obv, self.bars, stoch_evicted)
+
+        # المتوسطات المتحركة
+        for w, window in self.sma.items():
+            window.push(close)
+            values[f'SMA_{w}'] = window.mean()
+        for w, ema in self.ema.items():
+            values[f'EMA_{w}'] = ema.push(close)
+
+        # RSI (الفرق الأول فارغ ويعامل كصفر)
+        diff = close - prev[2] if prev else NAN
+        up = self.rsi_up.push(diff if diff > 0 else 0.0)
+        down = self.rsi_down.push(-diff if diff < 0 else 0.0)
+        if math.isnan(down):
+            values['RSI'] = NAN
+        elif down == 0:
+            values['RSI'] = 100.0
+        else:
+            values['RSI'] = 100 - (100 / (1 + up / down))
+
+        # MACD
+        macd = values['EMA_12'] - values['EMA_26']
+        signal = self.macd_signal.push(macd)
+        values['MACD'] = macd
+        values['MACD_Signal'] = signal
+        values['MACD_Diff'] = macd - signal
+
+        # بولينجر
+        self.bb.push(close)
+        mid = self.bb.mean()
+        std = self.bb.std()
+        values['BB_High'] = mid + self.bb_std * std
+        values['BB_Mid'] = mid
+        values['BB_Low'] = mid - self.bb_std * std
+        values['BB_Width'] = ((values['BB_High'] - values['BB_Low']) / mid) * 100 if mid else NAN
+
+        # الاستوكاستك
+        smin = self.stoch_low.push(low)
+        smax = self.stoch_high.push(high)
+        if math.isnan(smin) or smax == smin:
+            stoch_k = NAN
+        else:
+            stoch_k = 100 * (close - smin) / (smax - smin)
+        self.stoch_k.append(stoch_k)
+        values['Stoch_K'] = stoch_k
+        if len(self.stoch_k) == self.stoch_k.maxlen:
+            values['Stoch_D'] = sum(self.stoch_k) / len(self.stoch_k)
+        else:
+            values['Stoch_D'] = NAN
+
+        # ATR (المدى الحقيقي لأول شمعة = أعلى - أدنى)
+        if prev:
+            true_range = max(high - low, abs(high - prev[2]), abs(low - prev[2]))
+        else:
+            true_range = high - low
+        atr = self.atr.push(true_range)
+        values['ATR'] = atr if atr is not None else 0.0
+
+        values.update(self._update_adx(high, low, prev))
+
+        # الحجم
+        self.volume_sma.push(volume)
+        volume_sma = self.volume_sma.mean()
+        values['Volume_SMA'] = volume_sma
+        if prev and close < prev[2]:
+            self.obv -= volume
+        else:
+            self.obv += volume
+        values['OBV'] = self.obv
+        values['Volume_Ratio'] = volume / volume_sma if volume_sma else NAN
+
+        self._prev = (high, low, close)
+        self.bars += 1
+        return values
+
+    def undo(self):
+        """التراجع عن آخر update() - مرة واحدة فقط"""
+        if self._undo is None:
+            return
+        self._prev, self.obv, self.bars, stoch_evicted = self._undo
+        self._undo = None
+        for part in self._parts:
+            part.undo()
+        self.stoch_k.pop()
+        if stoch_evicted is not None:
+            self.stoch_k.appendleft(stoch_evicted)
+
+    def _update_adx(self, high: float, low: float, prev) -> Dict[str, float]:
+        """ADX بنفس ترتيب حساب ta: القيم قبل اكتمال النوافذ تساوي صفر"""
+        result = {'ADX': 0.0, 'ADX_Pos': 0.0, 'ADX_Neg': 0.0}
+        if not prev:
+            return result
+
+        prev_high, prev_low, prev_close = prev
+        movement = max(high, prev_close) - min(low, prev_close)
+        diff_up = high - prev_high
+        diff_down = prev_low - low
+        pos = diff_up if diff_up > diff_down and diff_up > 0 else 0.0
+        neg = diff_down if diff_down > diff_up and diff_down > 0 else 0.0
+
+        trs = self.trs.push(movement)
+        dip = self.dip.push(pos)
+        din = self.din.push(neg)
+        if trs is None:
+            return result
+
+        di_pos = 100 * (dip / trs) if trs != 0 else 0.0
+        di_neg = 100 * (din / trs) if trs != 0 else 0.0
+
+        # أول شمعة بعد النافذة لا تظهر في +DI/-DI لكنها تدخل في ADX
+        if self.bars > self.adx_period:
+            result['ADX_Pos'] = di_pos
+            result['ADX_Neg'] = di_neg
+
+        if di_pos + di_neg != 0:
+            directional_index = 100 * abs((di_pos - di_neg) / (di_pos + di_neg))
+        else:
+            directional_index = 0.0
+        adx = self.adx.push(directional_index)
+        if adx is not None:
+            result['ADX'] = adx
+
+        return result
@@ -0,0 +1,331 @@
+"""
+مزودو بيانات السوق
+واجهة موحدة لجلب الشموع والأسعار الحالية مع تطبيقين:
+- YFinanceProvider: البيانات الحية من Yahoo Finance
+- ReplayProvider: إعادة تشغيل بيانات مسجلة (CSV/Parquet) بدون شبكة وبسرعة قابلة للتعديل
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+import yfinance as yf
+import config
+from data_cache import OHLCV_COLUMNS, period_start
+from markets import get_timezone
+from rate_limiter import TokenBucket, get_rate_limiter
+
+
+# ترتيب الفواصل الزمنية من الأدق للأكبر (لاختيار أدق بيانات متاحة للسعر الحالي)
+INTERVAL_ORDER = ['1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h', '1d', '5d', '1wk', '1mo', '3mo']
+
+
+class MarketDataProvider:
+    """واجهة مزود بيانات السوق الأساسية"""
+
+    name = "base"
+    cacheable = False  # هل يستفيد من مخزن الشموع على القرص
+    clock = None  # ساعة المزود (None = الوقت الحقيقي)
+
+    def get_history(self, symbol: str, interval: str = "1d", period: str = None,
+                    start: pd.Timestamp = None) -> pd.DataFrame:
+        """
+        جلب شموع سهم
+        :param period: الفترة (6mo, 1y ...) - أو start لجلب الشموع بعد وقت معين
+        """
+        raise NotImplementedError("يجب تطبيق هذه الدالة في الفئة المشتقة")
+
+    def get_history_many(self, symbols: List[str], interval: str = "1d", period: str = None,
+                         start: pd.Timestamp = None) -> Dict[str, pd.DataFrame]:
+        """جلب شموع عدة أسهم - الأسهم التي لا تتوفر بياناتها لا تظهر في النتيجة"""
+        results = {}
+        for symbol in symbols:
+            try:
+                data = self.get_history(symbol, interval, period=period, start=start)
+                if data is not None and not data.empty:
+                    results[symbol] = data
+            except Exception:
+                continue
+        return results
+
+    def get_quote(self, symbol: str) -> Optional[float]:
+        """السعر الحالي للسهم (None إذا لم يتوفر)"""
+        raise NotImplementedError("يجب تطبيق هذه الدالة في الفئة المشتقة")
+
+
+class YFinanceProvider(MarketDataProvider):
+    """مزود البيانات الحية من Yahoo Finance"""
+
+    name = "yfinance"
+    cacheable = True
+
+    def __init__(self, chunk_size: int = None, limiter: TokenBucket = None):
+        """
+        :param chunk_size: عدد الأسهم في كل طلب تحميل جماعي
+        :param limiter: محدد معدل الطلبات (الافتراضي: المحدد المشترك)
+        """
+        self.chunk_size = chunk_size or config.BULK_DOWNLOAD_CHUNK_SIZE
+        self.limiter = limiter or get_rate_limiter()
+
+    def get_history(self, symbol: str, interval: str = "1d", period: str = None,
+                    start: pd.Timestamp = None) -> pd.DataFrame:
+        self.limiter.acquire()
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period or "1y", interval=interval)
+
+    def get_history_many(self, symbols: List[str], interval: str = "1d", period: str = None,
+                         start: pd.Timestamp = None) -> Dict[str, pd.DataFrame]:
+        """تحميل جماعي وتقسيم النتيجة إلى DataFrame لكل سهم"""
+        results = {}
+        kwargs = {'start': start} if start is not None else {'period': period or "1y"}
+
+        for i in range(0, len(symbols), self.chunk_size):
+            chunk = symbols[i:i + self.chunk_size]
+            # yfinance يرسل طلباً لكل سهم داخل التحميل الجماعي
+            self.limiter.acquire(len(chunk))
+            raw = yf.download(
+                chunk,
+                interval=interval,
+                group_by='ticker',
+                auto_adjust=True,
+                ignore_tz=False,
+                threads=True,
+                progress=False,
+                **kwargs
+            )
+
+            if raw is None or raw.empty:
+                continue
+
+            for symbol in chunk:
+                if isinstance(raw.columns, pd.MultiIndex):
+                    if symbol not in raw.columns.get_level_values(0):
+                        continue
+                    frame = raw[symbol]
+                else:
+                    frame = raw
+
+                frame = frame.dropna(how='all')
+                if frame.empty:
+                    continue
+
+                # توحيد المنطقة الزمنية مع ما يعيده Ticker.history
+                if frame.index.tz is None:
+                    frame = frame.tz_localize('UTC')
+                frame = frame.tz_convert(get_timezone(symbol))
+                frame.columns.name = None
+                results[symbol] = frame
+
+        return results
+
+    def get_quote(self, symbol: str) -> Optional[float]:
+        self.limiter.acquire()
+        ticker = yf.Ticker(symbol)
+        data = ticker.history(period="1d", interval="1m")
+        if data.empty:
+            return None
+        return float(data['Close'].iloc[-1])
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    مزود بيانات مسجلة لإعادة التشغيل بدون شبكة
+    الملفات: <data_dir>/<interval>/<SYMBOL>.csv أو .parquet
+    الساعة الافتراضية تبدأ من start وتتقدم بمعدل speed ضعف الوقت الحقيقي
+    (speed=None يعني عرض كل البيانات المسجلة مباشرة)
+    أو تتبع ساعة خارجية (SimulatedClock) يقدمها البوت نفسه عند الانتظار
+    """
+
+    name = "replay"
+    cacheable = False
+
+    def __init__(self, data_dir: str = None, frames: Dict[str, Dict[str, pd.DataFrame]] = None,
+                 speed: float = None, start: pd.Timestamp = None, clock=None):
+        """
+        :param data_dir: مجلد الملفات المسجلة
+        :param frames: بيانات جاهزة في الذاكرة {interval: {symbol: DataFrame}}
+        :param speed: سرعة إعادة التشغيل (60 = دقيقة افتراضية لكل ثانية حقيقية)
+        :param start: وقت بداية الساعة الافتراضية (الافتراضي: أقدم شمعة متاحة)
+        :param clock: ساعة خارجية تحدد الوقت الحالي بدلاً من speed (تضبط على start إن وجد)
+        """
+        self.data_dir = data_dir
+        self.speed = speed
+        self.clock = clock
+        self._frames: Dict[str, Dict[str, pd.DataFrame]] = {}
+        self._lock = threading.Lock()
+
+        for interval, symbols in (frames or {}).items():
+            for symbol, data in symbols.items():
+                self._frames.setdefault(interval, {})[symbol] = data.sort_index()
+
+        self._start = pd.Timestamp(start) if start is not None else None
+        if self._start is not None and self._start.tz is None:
+            self._start = self._start.tz_localize('UTC')
+        if self.clock is not None and self._start is not None:
+            self.clock.set(self._start)
+
+        # الساعة الافتراضية تحتاج أقدم شمعة - تحميل الملفات مسبقاً
+        if self.speed is not None and self._start is None:
+            self.preload()
+        self._started_at = time.monotonic()
+
+    # ==================== الملفات ====================
+
+    @staticmethod
+    def fixture_path(data_dir: str, symbol: str, interval: str, fmt: str = "csv") -> str:
+        """مسار ملف البيانات المسجلة"""
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return os.path.join(data_dir, interval, f"{safe_symbol}.{fmt}")
+
+    @staticmethod
+    def read_fixture(path: str) -> pd.DataFrame:
+        """قراءة ملف CSV أو Parquet"""
+        if path.endswith('.parquet'):
+            data = pd.read_parquet(path)
+        else:
+            data = pd.read_csv(path, index_col=0)
+        data.index = pd.to_datetime(data.index, utc=True)
+        return data.sort_index()
+
+    def preload(self):
+        """تحميل جميع الملفات المسجلة في الذاكرة"""
+        if not self.data_dir or not os.path.isdir(self.data_dir):
+            return
+        for interval in os.listdir(self.data_dir):
+            folder = os.path.join(self.data_dir, interval)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                symbol, ext = os.path.splitext(name)
+                if ext in ('.csv', '.parquet'):
+                    self._load(symbol, interval)
+
+    def _load(self, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            cached = self._frames.get(interval, {}).get(symbol)
+            if cached is not None or not self.data_dir:
+                return cached
+
+            for fmt in ('parquet', 'csv'):
+                path = self.fixture_path(self.data_dir, symbol, interval, fmt)
+                if os.path.exists(path):
+                    data = self.read_fixture(path).tz_convert(get_timezone(symbol))
+                    self._frames.setdefault(interval, {})[symbol] = data
+                    return data
+        return None
+
+    def _available_intervals(self, symbol: str) -> List[str]:
+        intervals = set(self._frames)
+        if self.data_dir and os.path.isdir(self.data_dir):
+            intervals.update(os.listdir(self.data_dir))
+        ordered = [i for i in INTERVAL_ORDER if i in intervals]
+        return [i for i in ordered if self._load(symbol, i) is not None]
+
+    # ==================== الساعة الافتراضية ====================
+
+    def now(self) -> Optional[pd.Timestamp]:
+        """الوقت الافتراضي الحالي (None = بدون قيود زمنية)"""
+        if self.clock is not None:
+            now = pd.Timestamp(self.clock.now())
+            return now.tz_localize('UTC') if now.tz is None else now
+
+        if self.speed is None:
+            return None
+
+        if self._start is None:
+            starts = [data.index[0] for symbols in self._frames.values()
+                      for data in symbols.values() if not data.empty]
+            if not starts:
+                return None
+            self._start = min(starts)
+            self._started_at = time.monotonic()
+
+        elapsed = time.monotonic() - self._started_at
+        return self._start + pd.Timedelta(seconds=elapsed * self.speed)
+
+    def reset(self, start: pd.Timestamp = None):
+        """إعادة الساعة الافتراضية للبداية"""
+        if start is not None:
+            self._start = pd.Timestamp(start)
+            if self.clock is not None:
+                self.clock.set(self._start)
+        self._started_at = time.monotonic()
+
+    # ==================== الواجهة ====================
+
+    def get_history(self, symbol: str, interval: str = "1d", period: str = None,
+                    start: pd.Timestamp = None) -> pd.DataFrame:
+        data = self._load(symbol, interval)
+        if data is None:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        now = self.now()
+        if now is not None:
+            data = data[data.index <= now]
+
+        if start is not None:
+            data = data[data.index >= start]
+        elif period and not data.empty:
+            begin = period_start(period, now=now if now is not None else data.index[-1])
+            if begin is not None:
+                data = data[data.index >= begin]
+
+        return data
+
+    def get_quote(self, symbol: str) -> Optional[float]:
+        for interval in self._available_intervals(symbol):
+            data = self.get_history(symbol, interval)
+            if not data.empty:
+                return float(data['Close'].iloc[-1])
+        return None
+
+
+def record_fixtures(symbols: List[str], data_dir: str, period: str = "1y", interval: str = "1d",
+                    provider: MarketDataProvider = None, fmt: str = "csv") -> List[str]:
+    """
+    تسجيل بيانات من مزود (الافتراضي yfinance) لاستخدامها لاحقاً مع ReplayProvider
+    :return: قائمة الملفات المكتوبة
+    """
+    provider = provider or YFinanceProvider()
+    frames = provider.get_history_many(symbols, interval, period=period)
+
+    written = []
+    for symbol, data in frames.items():
+        path = ReplayProvider.fixture_path(data_dir, symbol, interval, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = data[[c for c in OHLCV_COLUMNS if c in data.columns]]
+        if fmt == 'parquet':
+            data.to_parquet(path)
+        else:
+            data.to_csv(path)
+        written.append(path)
+
+    return written
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> MarketDataProvider:
+    """المزود المشترك على مستوى العملية (حسب config.MARKET_DATA_PROVIDER)"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if config.MARKET_DATA_PROVIDER == "replay":
+                _provider = ReplayProvider(config.REPLAY_DATA_DIR, speed=config.REPLAY_SPEED)
+            else:
+                _provider = YFinanceProvider()
+        return _provider
+
+
+def set_provider(provider: MarketDataProvider):
+    """استبدال المزود المشترك (للاختبارات وقياس الأداء بدون شبكة)"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
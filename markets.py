@@ -0,0 +1,84 @@
+"""
+معلومات الأسواق المدعومة
+السوق السعودي (تداول) والأسواق الأمريكية
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+MARKETS = {
+    'SA': {
+        'name': 'السوق السعودي (تداول)',
+        'timezone': 'Asia/Riyadh',
+        'suffix': '.SR',
+        'weekmask': 'Sun Mon Tue Wed Thu',  # أيام التداول (بدون العطل الرسمية)
+        'open': '10:00',
+        'close': '15:00',
+    },
+    'US': {
+        'name': 'الأسواق الأمريكية',
+        'timezone': 'America/New_York',
+        'suffix': '',
+        'weekmask': 'Mon Tue Wed Thu Fri',
+        'open': '09:30',
+        'close': '16:00',
+    },
+}
+
+
+def get_market(symbol: str) -> str:
+    """تحديد سوق السهم من رمزه"""
+    return 'SA' if symbol.upper().endswith('.SR') else 'US'
+
+
+def get_timezone(symbol: str) -> str:
+    """المنطقة الزمنية لسوق السهم"""
+    return MARKETS[get_market(symbol)]['timezone']
+
+
+def group_by_market(symbols: List[str]) -> Dict[str, List[str]]:
+    """تقسيم قائمة الأسهم حسب السوق"""
+    groups: Dict[str, List[str]] = {}
+    for symbol in symbols:
+        groups.setdefault(get_market(symbol), []).append(symbol)
+    return groups
+
+
+def _local_time(market: str, now=None) -> pd.Timestamp:
+    """الوقت بتوقيت السوق (الوقت بدون منطقة زمنية يعتبر بتوقيت الجهاز)"""
+    if now is None:
+        now = datetime.now()
+    now = pd.Timestamp(now)
+    if now.tz is None:
+        now = pd.Timestamp(now.to_pydatetime().astimezone())
+    return now.tz_convert(MARKETS[market]['timezone'])
+
+
+def _is_trading_day(market: str, day: pd.Timestamp) -> bool:
+    return bool(np.is_busday(np.datetime64(day.date(), 'D'), weekmask=MARKETS[market]['weekmask']))
+
+
+def is_market_open(market: str, now=None) -> bool:
+    """هل السوق في جلسة تداول الآن"""
+    local = _local_time(market, now)
+    if not _is_trading_day(market, local):
+        return False
+    day = local.normalize()
+    info = MARKETS[market]
+    return day + pd.Timedelta(f"{info['open']}:00") <= local < day + pd.Timedelta(f"{info['close']}:00")
+
+
+def next_market_open(market: str, now=None) -> pd.Timestamp:
+    """بداية جلسة التداول القادمة بعد now (بتوقيت السوق)"""
+    local = _local_time(market, now)
+    open_at = pd.Timedelta(f"{MARKETS[market]['open']}:00")
+    day = local.normalize()
+    if _is_trading_day(market, day) and local < day + open_at:
+        return day + open_at
+    following = np.busday_offset(np.datetime64(day.date(), 'D') + 1, 0, roll='forward',
+                                 weekmask=MARKETS[market]['weekmask'])
+    return pd.Timestamp(following).tz_localize(local.tz) + open_at
@@ -0,0 +1,205 @@
+"""
+قياس زمن مراحل المسح والتداول
+- لكل مرحلة (جلب البيانات، المؤشرات، الاستراتيجية، المخاطر، الطباعة) ولكل سهم:
+  عداد استدعاءات وعداد أخطاء ومدرج تكراري للزمن
+- نص Prometheus لمسار /metrics وملخص يطبع في نهاية كل مسح
+- عند التعطيل يعيد timer سياقاً فارغاً مشتركاً (بدون قياس وقت أو قفل)
+
+الاستخدام:
+    with stage("strategy", symbol):
+        signal = strategy.generate_signal(analyzer)
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import config
+
+# حدود المدرج التكراري بالثواني (مثل الافتراضية في مكتبات Prometheus)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_DISABLED = contextlib.nullcontext()
+
+
+class _Histogram:
+    """عدادات الحدود والمجموع والعدد لمفتاح واحد (مرحلة، سهم)"""
+
+    __slots__ = ('buckets', 'sum', 'count', 'errors')
+
+    def __init__(self, size: int):
+        self.buckets = [0] * (size + 1)  # الأخير = أكبر من كل الحدود (+Inf)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+
+class _Timer:
+    """سياق يقيس زمن مرحلة ويسجله عند الخروج (ويعد الخطأ إذا خرج باستثناء)"""
+
+    __slots__ = ('metrics', 'stage', 'symbol', 'started')
+
+    def __init__(self, metrics: 'Metrics', stage: str, symbol: str):
+        self.metrics = metrics
+        self.stage = stage
+        self.symbol = symbol
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started, self.symbol,
+                             error=exc_type is not None)
+        return False
+
+
+class Metrics:
+    """سجل أزمنة المراحل على مستوى العملية - آمن للاستخدام من خيوط الماسح"""
+
+    def __init__(self, enabled: bool = None, buckets: Tuple[float, ...] = None,
+                 per_symbol: bool = None):
+        """
+        :param enabled: تفعيل القياس (الافتراضي من config)
+        :param buckets: حدود المدرج التكراري بالثواني
+        :param per_symbol: تسجيل كل سهم منفصلاً (False = المرحلة فقط لتقليل عدد السلاسل)
+        """
+        self.enabled = config.METRICS_ENABLED if enabled is None else enabled
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+        self.per_symbol = config.METRICS_PER_SYMBOL if per_symbol is None else per_symbol
+        self._series: Dict[Tuple[str, str], _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage: str, symbol: str = None):
+        """سياق لقياس زمن مرحلة (سياق فارغ عند التعطيل)"""
+        if not self.enabled:
+            return _DISABLED
+        return _Timer(self, stage, symbol)
+
+    def observe(self, stage: str, seconds: float, symbol: str = None, error: bool = False):
+        """تسجيل زمن تنفيذ مرحلة"""
+        if not self.enabled:
+            return
+        key = (stage, (symbol or "") if self.per_symbol else "")
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Histogram(len(self.buckets))
+            series.buckets[index] += 1
+            series.sum += seconds
+            series.count += 1
+            if error:
+                series.errors += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    # ==================== القراءة ====================
+
+    def snapshot(self) -> Dict[str, Tuple[int, float, int]]:
+        """(العدد، مجموع الزمن، الأخطاء) لكل مرحلة - لحساب الفرق بين نقطتين"""
+        stages = {}
+        with self._lock:
+            for (stage, _), series in self._series.items():
+                count, total, errors = stages.get(stage, (0, 0.0, 0))
+                stages[stage] = (count + series.count, total + series.sum, errors + series.errors)
+        return stages
+
+    def summary(self, since: Dict = None) -> List[Dict]:
+        """
+        ملخص المراحل منذ snapshot سابق (أو منذ البداية)
+        :return: صف لكل مرحلة مرتب حسب الزمن الكلي
+        """
+        since = since or {}
+        rows = []
+        for stage, (count, total, errors) in self.snapshot().items():
+            before = since.get(stage, (0, 0.0, 0))
+            calls = count - before[0]
+            if calls <= 0:
+                continue
+            seconds = total - before[1]
+            rows.append({
+                'stage': stage,
+                'calls': calls,
+                'errors': errors - before[2],
+                'total_ms': seconds * 1000,
+                'mean_ms': seconds * 1000 / calls,
+            })
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+
+    def print_summary(self, since: Dict = None, title: str = "⏱️  زمن مراحل المسح"):
+        """طباعة ملخص المراحل (لا شيء عند التعطيل)"""
+        rows = self.summary(since)
+        if not rows:
+            return
+        total = sum(row['total_ms'] for row in rows) or 1.0
+        print(f"\n{title}")
+        print(f"   {'المرحلة':<14}{'مرات':>7}{'أخطاء':>7}{'الكلي ms':>12}{'المتوسط ms':>12}{'النسبة':>8}")
+        for row in rows:
+            print(f"   {row['stage']:<14}{row['calls']:>7}{row['errors']:>7}{row['total_ms']:>12.1f}"
+                  f"{row['mean_ms']:>12.2f}{row['total_ms'] / total * 100:>7.0f}%")
+
+    def render_prometheus(self, prefix: str = "trading") -> str:
+        """نص Prometheus (text exposition format 0.0.4)"""
+        with self._lock:
+            items = sorted(
+                (key, list(series.buckets), series.sum, series.count, series.errors)
+                for key, series in self._series.items()
+            )
+
+        name = f"{prefix}_stage_seconds"
+        lines = [
+            f"# HELP {name} زمن تنفيذ المرحلة بالثواني",
+            f"# TYPE {name} histogram",
+        ]
+        for (stage, symbol), buckets, total, count, _ in items:
+            labels = _labels(stage, symbol)
+            cumulative = 0
+            for bound, hits in zip(self.buckets, buckets):
+                cumulative += hits
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {total!r}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+
+        for metric, help_text, column in (
+            ("calls_total", "عدد مرات تنفيذ المرحلة", 3),
+            ("errors_total", "عدد مرات انتهاء المرحلة بخطأ", 4),
+        ):
+            metric_name = f"{prefix}_stage_{metric}"
+            lines.append(f"# HELP {metric_name} {help_text}")
+            lines.append(f"# TYPE {metric_name} counter")
+            for item in items:
+                lines.append(f"{metric_name}{{{_labels(*item[0])}}} {item[column]}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(stage: str, symbol: str) -> str:
+    def escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'stage="{escape(stage)}",symbol="{escape(symbol)}"'
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """السجل المشترك على مستوى العملية"""
+    global _metrics
+    if _metrics is None:  # بدون قفل بعد الإنشاء - يستدعى في كل مرحلة
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+def stage(name: str, symbol: str = None):
+    """اختصار get_metrics().timer"""
+    return get_metrics().timer(name, symbol)
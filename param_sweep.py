@@ -0,0 +1,266 @@
+"""
+البحث عن أفضل معاملات الاستراتيجيات
+- شبكة كاملة أو عينات عشوائية من فضاء المعاملات لكل استراتيجية
+- المؤشرات تحسب مرة واحدة لكل سهم وتوضع في ذاكرة مشتركة تقرأها كل العمليات بدون نسخ
+- كل مجموعة معاملات تختبر على كل الأسهم في عملية منفصلة (كل الأنوية)
+- النتيجة جدول مرتب بالعائد والتراجع وعدد الصفقات
+"""
+
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+import config
+from backtester import WARMUP_BARS, MIN_CONFIDENCE, simulate_trades, equity_curve, max_drawdown
+from compact_storage import CompactBars, SharedBars
+from technical_analysis import TechnicalAnalyzer, fetch_bulk_data
+from trading_strategy import (
+    MomentumStrategy, TrendFollowingStrategy, BreakoutStrategy,
+    MeanReversionStrategy, CompositeStrategy
+)
+
+STRATEGIES = {
+    'momentum': MomentumStrategy,
+    'trend': TrendFollowingStrategy,
+    'breakout': BreakoutStrategy,
+    'mean_reversion': MeanReversionStrategy,
+    'composite': CompositeStrategy,
+}
+
+# فضاء البحث الافتراضي: قائمة = قيم محددة، (أدنى، أعلى) = مدى للبحث العشوائي
+# min_confidence هو حد الثقة لتنفيذ الإشارة في الاختبار الخلفي وليس معاملاً للاستراتيجية
+DEFAULT_SPACES = {
+    'momentum': {
+        'rsi_oversold': [20, 25, 30, 35],
+        'rsi_overbought': [65, 70, 75, 80],
+        'min_confidence': [50, 60, 75],
+    },
+    'trend': {
+        'min_score': [3, 4, 5],
+        'min_confidence': [50, 60, 70, 80],
+    },
+    'breakout': {
+        'volume_ratio': [1.2, 1.5, 2.0, 2.5],
+        'min_confidence': [50, 60, 70],
+    },
+    'mean_reversion': {
+        'rsi_oversold': [20, 25, 30, 35],
+        'rsi_overbought': [65, 70, 75, 80],
+        'mid_band': [0.005, 0.01, 0.02],
+    },
+    'composite': {
+        'min_confidence': [50, 60, 70, 80],
+    },
+}
+
+
+def grid_space(space: Dict[str, List]) -> List[Dict]:
+    """كل التوافيق الممكنة من قيم المعاملات"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_space(space: Dict[str, object], samples: int, seed: int = None) -> List[Dict]:
+    """
+    عينات عشوائية من فضاء المعاملات (بدون تكرار)
+    :param space: لكل معامل قائمة قيم أو (أدنى، أعلى) - الأعداد الصحيحة تبقى صحيحة
+    """
+    rng = random.Random(seed)
+
+    def sample(values):
+        if isinstance(values, tuple):
+            low, high = values
+            if isinstance(low, int) and isinstance(high, int):
+                return rng.randint(low, high)
+            return rng.uniform(low, high)
+        return rng.choice(values)
+
+    results = []
+    seen = set()
+    for _ in range(samples * 10):
+        if len(results) >= samples:
+            break
+        params = {name: sample(values) for name, values in space.items()}
+        key = tuple(sorted(params.items()))
+        if key not in seen:
+            seen.add(key)
+            results.append(params)
+    return results
+
+
+def prepare_bars(frames: Dict[str, pd.DataFrame], names: List[str] = None) -> Dict[str, CompactBars]:
+    """
+    حساب المؤشرات مرة واحدة لكل سهم (float64 لنتائج مطابقة لـ backtest_strategy)
+    :param names: المؤشرات المطلوبة - None = كل المؤشرات
+    """
+    bars = {}
+    for symbol, data in frames.items():
+        analyzer = TechnicalAnalyzer(symbol)
+        analyzer.set_data(data)
+        analyzer.ensure_indicators(names)
+        bars[symbol] = analyzer.to_compact(dtype=np.float64)
+    return bars
+
+
+def evaluate_bars(bars: CompactBars, strategy, min_confidence: float = MIN_CONFIDENCE,
+                  warmup: int = WARMUP_BARS, initial_capital: float = 10000) -> Dict:
+    """اختبار خلفي لسهم واحد من الكتلة المضغوطة (بدون بناء كائنات pandas للقيم)"""
+    values = {name: bars.column(name) for name in bars.columns}
+    actions, confidence, _ = strategy.evaluate(values)
+
+    index = bars.index
+    close = values['Close']
+    capital, trades = simulate_trades(index, close, actions, confidence, initial_capital,
+                                      start=warmup, min_confidence=min_confidence)
+    equity = equity_curve(index, close, trades, initial_capital)
+
+    return {
+        'symbol': bars.symbol,
+        'total_return': ((capital - initial_capital) / initial_capital) * 100,
+        'max_drawdown': max_drawdown(equity),
+        'num_trades': len([t for t in trades if t['action'] == 'BUY']),
+    }
+
+
+def evaluate_params(items: Dict[str, CompactBars], strategy_name: str, params: Dict,
+                    warmup: int = WARMUP_BARS, initial_capital: float = 10000) -> List[Dict]:
+    """اختبار مجموعة معاملات على كل الأسهم"""
+    params = dict(params)
+    min_confidence = params.pop('min_confidence', MIN_CONFIDENCE)
+    strategy = STRATEGIES[strategy_name](**params)
+    return [evaluate_bars(bars, strategy, min_confidence, warmup, initial_capital)
+            for bars in items.values()]
+
+
+# ==================== العمليات العاملة ====================
+
+_shared = None
+_shared_bars = None
+
+
+def _init_worker(name: str, layout: Dict[str, Dict]):
+    """فتح الذاكرة المشتركة مرة واحدة لكل عملية"""
+    global _shared, _shared_bars
+    _shared = SharedBars.attach(name, layout)
+    _shared_bars = {symbol: _shared.get(symbol) for symbol in _shared.symbols}
+
+
+def _run_task(task) -> List[Dict]:
+    strategy_name, params, warmup, initial_capital = task
+    return evaluate_params(_shared_bars, strategy_name, params, warmup, initial_capital)
+
+
+class ParameterSweep:
+    """البحث عن أفضل معاملات استراتيجية على مجموعة أسهم"""
+
+    def __init__(self, strategy: str, space: Dict = None, search: str = "grid",
+                 samples: int = 50, seed: int = None, max_workers: int = None,
+                 warmup: int = WARMUP_BARS, initial_capital: float = 10000):
+        """
+        :param strategy: اسم الاستراتيجية (momentum, trend, breakout, mean_reversion, composite)
+        :param space: فضاء المعاملات (الافتراضي DEFAULT_SPACES)
+        :param search: "grid" لكل التوافيق أو "random" لعينات عشوائية
+        :param samples: عدد العينات في البحث العشوائي
+        :param max_workers: عدد العمليات (1 = في نفس العملية، None = من config أو كل الأنوية)
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"استراتيجية غير معروفة: {strategy}")
+        if search not in ("grid", "random"):
+            raise ValueError(f"نوع بحث غير معروف: {search}")
+
+        self.strategy = strategy
+        self.space = space or DEFAULT_SPACES[strategy]
+        self.search = search
+        self.samples = samples
+        self.seed = seed
+        self.max_workers = max_workers or config.SWEEP_MAX_WORKERS or os.cpu_count() or 1
+        self.warmup = warmup
+        self.initial_capital = initial_capital
+
+    def parameter_sets(self) -> List[Dict]:
+        """مجموعات المعاملات التي ستختبر"""
+        if self.search == "random":
+            return random_space(self.space, self.samples, self.seed)
+        return grid_space(self.space)
+
+    def run(self, symbols: List[str] = None, frames: Dict[str, pd.DataFrame] = None,
+            period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        """
+        تشغيل البحث
+        :param frames: بيانات جاهزة {symbol: DataFrame} بدلاً من جلبها
+        :return: جدول مرتب (الأفضل أولاً)
+        """
+        if frames is None:
+            frames = fetch_bulk_data(symbols or config.WATCHLIST, period, interval)
+        if not frames:
+            raise ValueError("لا توجد بيانات للبحث")
+
+        names = STRATEGIES[self.strategy]().required_indicators
+        items = prepare_bars(frames, names)
+        parameter_sets = self.parameter_sets()
+
+        if self.max_workers <= 1 or len(parameter_sets) <= 1:
+            results = [evaluate_params(items, self.strategy, params, self.warmup, self.initial_capital)
+                       for params in parameter_sets]
+        else:
+            results = self._run_parallel(items, parameter_sets)
+
+        return self.rank(parameter_sets, results)
+
+    def _run_parallel(self, items: Dict[str, CompactBars], parameter_sets: List[Dict]) -> List[List[Dict]]:
+        """توزيع مجموعات المعاملات على العمليات - البيانات في ذاكرة مشتركة تنشأ مرة واحدة"""
+        shared = SharedBars.create(items)
+        try:
+            tasks = [(self.strategy, params, self.warmup, self.initial_capital) for params in parameter_sets]
+            workers = min(self.max_workers, len(tasks))
+            chunksize = max(1, len(tasks) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shared.name, shared.layout)) as pool:
+                return list(pool.map(_run_task, tasks, chunksize=chunksize))
+        finally:
+            shared.close()
+
+    @staticmethod
+    def rank(parameter_sets: List[Dict], results: List[List[Dict]]) -> pd.DataFrame:
+        """
+        جدول النتائج لكل مجموعة معاملات مرتب بمتوسط العائد ثم بأقل تراجع
+        max_drawdown = أسوأ تراجع بين الأسهم
+        """
+        rows = []
+        for params, symbols in zip(parameter_sets, results):
+            returns = [r['total_return'] for r in symbols]
+            rows.append({
+                **params,
+                'total_return': float(np.mean(returns)) if returns else 0.0,
+                'max_drawdown': max((r['max_drawdown'] for r in symbols), default=0.0),
+                'num_trades': sum(r['num_trades'] for r in symbols),
+                'symbols': len(symbols),
+            })
+
+        table = pd.DataFrame(rows)
+        if table.empty:
+            return table
+        table = table.sort_values(['total_return', 'max_drawdown'], ascending=[False, True],
+                                  kind='stable').reset_index(drop=True)
+        table.index = table.index + 1
+        table.index.name = 'rank'
+        return table
+
+
+if __name__ == "__main__":
+    # مثال: ضبط استراتيجية الزخم على أسهم السوق السعودي
+    from markets import group_by_market
+
+    symbols = group_by_market(config.WATCHLIST).get('SA', [])
+    sweep = ParameterSweep('momentum')
+    table = sweep.run(symbols, period="5y")
+
+    print("=" * 70)
+    print(f"أفضل معاملات {sweep.strategy} على {len(symbols)} سهم ({sweep.max_workers} عملية)")
+    print("=" * 70)
+    print(table.head(10).to_string())
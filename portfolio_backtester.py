@@ -0,0 +1,197 @@
+"""
+الاختبار الخلفي للمحفظة
+- كل أسهم قائمة المراقبة تمر بترتيب الوقت عبر RiskManager حقيقي (نفس حدود البوت)
+- شموع نفس الوقت لكل الأسهم تعالج كدفعة واحدة: بيع ثم شراء حسب الثقة ثم وقف الخسارة وجني الأرباح
+- ساعة افتراضية تتبع الشموع فتسجل الصفقات والعدادات اليومية بوقت البيانات لا بوقت التشغيل
+- الإشارات تحسب مرة واحدة لكل سهم على كامل التاريخ (signal_series)
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+import config
+from backtester import WARMUP_BARS, strategy_signals, max_drawdown
+from clock import SimulatedClock
+from risk_management import RiskManager
+from technical_analysis import TechnicalAnalyzer, fetch_bulk_data
+from trading_strategy import CompositeStrategy
+
+
+def _local_index(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """الوقت المحلي لكل سوق بدون منطقة زمنية (شموع نفس اليوم في كل الأسواق تتجمع معاً)"""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index
+
+
+class PortfolioBacktester:
+    """اختبار خلفي لعدة أسهم تتشارك رأس المال وحدود المخاطر"""
+
+    def __init__(self, strategy=None, initial_capital: float = 10000,
+                 warmup: int = WARMUP_BARS, min_confidence: float = None,
+                 close_at_end: bool = True):
+        """
+        :param strategy: الاستراتيجية (الافتراضي CompositeStrategy كما في AutoTradingBot)
+        :param warmup: عدد الشموع الأولى لكل سهم بدون تداول
+        :param min_confidence: أقل ثقة لتنفيذ الإشارة (الافتراضي config.MIN_CONFIDENCE)
+        :param close_at_end: إغلاق المراكز المفتوحة عند آخر شمعة
+        """
+        self.strategy = strategy or CompositeStrategy()
+        self.initial_capital = initial_capital
+        self.warmup = warmup
+        self.min_confidence = config.MIN_CONFIDENCE if min_confidence is None else min_confidence
+        self.close_at_end = close_at_end
+        self.required_indicators = (
+            self.strategy.required_indicators + ['ATR']
+            if self.strategy.required_indicators is not None else None
+        )
+        self.clock = None
+        self.risk_manager = None
+
+    def _new_risk_manager(self, start: pd.Timestamp) -> RiskManager:
+        """
+        :param start: وقت أول دفعة (العدادات اليومية تبدأ من يوم البيانات لا من يوم التشغيل)
+        """
+        self.clock = SimulatedClock(start)
+        return RiskManager(
+            initial_capital=self.initial_capital,
+            max_risk_per_trade=config.MAX_POSITION_SIZE,
+            max_portfolio_risk=config.MAX_DAILY_LOSS,
+            max_positions=config.MAX_OPEN_POSITIONS,
+            clock=self.clock,
+            verbose=False
+        )
+
+    def prepare(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict]:
+        """الإشارات والأسعار و ATR لكل سهم كمصفوفات"""
+        prepared = {}
+        for symbol, data in frames.items():
+            if data is None or data.empty:
+                continue
+            analyzer = TechnicalAnalyzer(symbol)
+            analyzer.set_data(data)
+            analyzer.ensure_indicators(self.required_indicators)
+            actions, confidence = strategy_signals(self.strategy, analyzer, start=self.warmup)
+            atr = analyzer.indicators.get('ATR')
+            prepared[symbol] = {
+                'index': _local_index(analyzer.data.index),
+                'close': analyzer.data['Close'].to_numpy(dtype=float),
+                'atr': atr.to_numpy(dtype=float) if atr is not None else np.full(len(data), np.nan),
+                'actions': actions,
+                'confidence': confidence,
+            }
+        return prepared
+
+    @staticmethod
+    def schedule(prepared: Dict[str, Dict]):
+        """
+        جدول الأحداث لكل الأسهم مرتباً بالوقت
+        :return: (أوقات الدفعات, حدود كل دفعة, رقم السهم, رقم الشمعة) لكل حدث
+        """
+        keys = np.concatenate([item['index'].as_unit('ns').asi8 for item in prepared.values()])
+        owners = np.concatenate([np.full(len(item['index']), n) for n, item in enumerate(prepared.values())])
+        rows = np.concatenate([np.arange(len(item['index'])) for item in prepared.values()])
+
+        order = np.argsort(keys, kind='stable')
+        keys, owners, rows = keys[order], owners[order], rows[order]
+        times, starts = np.unique(keys, return_index=True)
+        bounds = np.append(starts, len(keys))
+        return times, bounds, owners, rows
+
+    def run(self, symbols: List[str] = None, frames: Dict[str, pd.DataFrame] = None,
+            period: str = "5y", interval: str = "1d") -> Dict:
+        """
+        تشغيل الاختبار
+        :param frames: بيانات جاهزة {symbol: DataFrame} بدلاً من جلبها
+        :return: ملخص المحفظة ومنحنى القيمة وسجل الصفقات
+        """
+        if frames is None:
+            frames = fetch_bulk_data(symbols or config.WATCHLIST, period, interval)
+        prepared = self.prepare(frames)
+        if not prepared:
+            raise ValueError("لا توجد بيانات للاختبار")
+
+        names = list(prepared)
+        items = [prepared[symbol] for symbol in names]
+        times, bounds, owners, rows = self.schedule(prepared)
+
+        rm = self._new_risk_manager(pd.Timestamp(times[0]))
+        equity = np.empty(len(times))
+
+        for batch, key in enumerate(times):
+            self.clock.set(pd.Timestamp(key))
+            events = range(bounds[batch], bounds[batch + 1])
+
+            prices = {}
+            buys = []
+            for e in events:
+                item, row = items[owners[e]], rows[e]
+                symbol = names[owners[e]]
+                price = item['close'][row]
+                if np.isnan(price):
+                    continue
+                prices[symbol] = price
+
+                confidence = item['confidence'][row]
+                if confidence < self.min_confidence:
+                    continue
+                action = item['actions'][row]
+                if action == 'SELL' and config.AUTO_CLOSE_ON_SIGNAL and symbol in rm.positions:
+                    rm.close_position(symbol, price, f"إشارة بيع تلقائية (ثقة: {confidence:.0f}%)")
+                elif action == 'BUY':
+                    buys.append((confidence, symbol, price, item['atr'][row]))
+
+            # الشراء حسب الثقة (الأعلى أولاً) حتى حدود المخاطر
+            buys.sort(key=lambda buy: buy[0], reverse=True)
+            for confidence, symbol, price, atr in buys:
+                if not rm.can_trade():
+                    break
+                if symbol in rm.positions:
+                    continue
+                plan = rm.plan_entry(
+                    symbol,
+                    price,
+                    atr=None if np.isnan(atr) else atr,
+                    stop_loss_percent=config.STOP_LOSS_PERCENT,
+                    risk_reward_ratio=config.TAKE_PROFIT_PERCENT / config.STOP_LOSS_PERCENT
+                )
+                if plan['quantity'] > 0:
+                    rm.open_position(symbol, plan['quantity'], price, plan['stop_loss'], plan['take_profit'])
+
+            rm.update_positions(prices)
+            equity[batch] = rm.current_capital + sum(
+                pos.current_price * pos.quantity for pos in rm.positions.values()
+            )
+
+        if self.close_at_end:
+            for symbol in list(rm.positions):
+                rm.close_position(symbol, rm.positions[symbol].current_price, "نهاية الاختبار")
+
+        self.risk_manager = rm
+        equity = pd.Series(equity, index=pd.DatetimeIndex(times), name='equity')
+        return {
+            'summary': rm.get_portfolio_summary(),
+            'equity': equity,
+            'trades': pd.DataFrame(rm.trade_history),
+            'max_drawdown': max_drawdown(equity.to_numpy()),
+            'symbols': len(names),
+            'batches': len(times),
+        }
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    backtester = PortfolioBacktester(initial_capital=100000)
+    result = backtester.run(period="5y")
+    summary = result['summary']
+
+    print("=" * 70)
+    print(f"اختبار المحفظة: {result['symbols']} سهم | {result['batches']} دفعة | "
+          f"{time.perf_counter() - start:.1f} ثانية")
+    print("=" * 70)
+    print(f"العائد: {summary['total_return']:.2f}% | الصفقات: {summary['total_trades']} | "
+          f"معدل النجاح: {summary['win_rate']:.1f}% | أقصى تراجع: {result['max_drawdown']:.2f}%")
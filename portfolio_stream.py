@@ -0,0 +1,234 @@
+"""
+بث تغييرات المحفظة للمتصفحات (Server-Sent Events)
+- منتج واحد يبني حالة المحفظة كل فترة ما دام هناك مشتركون
+- يرسل الفرق فقط (الحقول والمراكز التي تغيرت) وعند عدم التغيير لا يرسل شيئاً
+- الرسالة تجهز مرة واحدة وتوزع على كل المشتركين
+- المشترك الجديد (أو المتأخر الذي امتلأت قائمته) يستلم الحالة كاملة
+- عدد المشتركين محدود (كل اتصال يشغل خيطاً في الخادم): الزائد يرفض بـ StreamFullError
+  ويعود المتصفح للاستعلام الدوري من /api/portfolio
+"""
+
+import json
+import queue
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
+
+import config
+
+
+def portfolio_delta(old: Dict, new: Dict, key: str = 'symbol') -> Optional[Dict]:
+    """
+    الفرق بين حالتين للمحفظة
+    :return: {'set': الحقول المتغيرة, 'upsert': المراكز الجديدة أو المتغيرة, 'remove': رموز المراكز المغلقة}
+             أو None إذا لم يتغير شيء
+    """
+    changed = {name: value for name, value in new.items()
+               if name != 'positions' and old.get(name) != value}
+    removed_fields = [name for name in old if name not in new]
+    for name in removed_fields:
+        changed[name] = None
+
+    old_positions = {item[key]: item for item in old.get('positions', [])}
+    new_positions = {item[key]: item for item in new.get('positions', [])}
+    upsert = [item for symbol, item in new_positions.items() if old_positions.get(symbol) != item]
+    remove = [symbol for symbol in old_positions if symbol not in new_positions]
+
+    if not changed and not upsert and not remove:
+        return None
+    return {'set': changed, 'upsert': upsert, 'remove': remove}
+
+
+def format_event(event: str, data: Dict, event_id: int = None) -> str:
+    """رسالة SSE واحدة"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class StreamFullError(RuntimeError):
+    """وصل عدد المشتركين للحد الأقصى"""
+
+
+class _Subscriber:
+    """قائمة رسائل متصفح واحد"""
+
+    def __init__(self, size: int):
+        self.queue = queue.Queue(maxsize=size)
+
+
+class PortfolioStream:
+    """منتج مشترك لحالة المحفظة يوزع التغييرات على كل المشتركين"""
+
+    def __init__(self, build: Callable[[], Dict], interval: float = None,
+                 heartbeat: float = None, queue_size: int = 64, max_subscribers: int = None):
+        """
+        :param build: دالة تعيد حالة المحفظة الحالية (نفس استجابة /api/portfolio)
+        :param interval: الفاصل بين فحوصات التغيير بالثواني (الافتراضي من config)
+        :param heartbeat: إرسال تعليق فارغ بعد هذه المدة بدون رسائل (لإبقاء الاتصال مفتوحاً)
+        :param queue_size: أقصى رسائل معلقة لكل مشترك قبل إعادة إرسال الحالة كاملة
+        :param max_subscribers: أقصى عدد اتصالات مفتوحة (الافتراضي من config)
+        """
+        self.build = build
+        self.interval = config.PORTFOLIO_STREAM_INTERVAL if interval is None else interval
+        self.heartbeat = config.PORTFOLIO_STREAM_HEARTBEAT if heartbeat is None else heartbeat
+        self.queue_size = queue_size
+        self.max_subscribers = (config.PORTFOLIO_STREAM_MAX_SUBSCRIBERS
+                                if max_subscribers is None else max_subscribers)
+
+        self._state: Optional[Dict] = None
+        self._version = 0
+        self._subscribers: List[_Subscriber] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # إحصائيات
+        self.builds = 0
+        self.published = 0
+        self.resyncs = 0
+        self.rejected = 0
+
+    # ==================== المشتركون ====================
+
+    def _snapshot_message(self) -> str:
+        return format_event('snapshot', self._state, self._version)
+
+    def subscribe(self) -> _Subscriber:
+        """
+        مشترك جديد - يستلم الحالة الحالية فوراً إن وجدت
+        :raises StreamFullError: عند الوصول للحد الأقصى للمشتركين
+        """
+        subscriber = _Subscriber(self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self.rejected += 1
+                raise StreamFullError(f"الحد الأقصى لاتصالات البث: {self.max_subscribers}")
+            if self._state is not None:
+                subscriber.queue.put_nowait(self._snapshot_message())
+            self._subscribers.append(subscriber)
+        self.start()
+        self._wake.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def events(self, subscriber: _Subscriber = None) -> Iterator[str]:
+        """رسائل SSE لمشترك واحد حتى يغلق الاتصال أو يتوقف البث"""
+        subscriber = subscriber or self.subscribe()
+        try:
+            while True:
+                try:
+                    message = subscriber.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    # ==================== المنتج ====================
+
+    def poll(self) -> Optional[str]:
+        """
+        خطوة واحدة: بناء الحالة ونشر الفرق إن وجد
+        :return: الرسالة المنشورة أو None إذا لم يتغير شيء
+        """
+        state = self.build()
+        self.builds += 1
+
+        with self._lock:
+            if self._state is None:
+                event = 'snapshot'
+                payload = state
+            else:
+                event = 'delta'
+                payload = portfolio_delta(self._state, state)
+                if payload is None:
+                    return None
+
+            self._version += 1
+            self._state = state
+            message = format_event(event, payload, self._version)
+            snapshot = None
+
+            for subscriber in self._subscribers:
+                try:
+                    subscriber.queue.put_nowait(message)
+                except queue.Full:
+                    # متصفح متأخر: إفراغ رسائله وإرسال الحالة كاملة بدلاً منها
+                    while not subscriber.queue.empty():
+                        try:
+                            subscriber.queue.get_nowait()
+                        except queue.Empty:
+                            break
+                    snapshot = snapshot or self._snapshot_message()
+                    subscriber.queue.put_nowait(snapshot)
+                    self.resyncs += 1
+
+            self.published += 1
+            return message
+
+    def notify(self):
+        """فحص التغيير فوراً (مثلاً بعد تشغيل أو إيقاف التداول)"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # المسح قبل قراءة الحالة: أي notify أثناء البناء أو الانتظار يوقظ الدورة التالية
+            self._wake.clear()
+            if self._subscribers:
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"❌ خطأ في بث المحفظة: {e}")
+                self._wake.wait(self.interval)
+            else:
+                # بدون مشتركين لا يبنى شيء حتى يشترك أحد
+                self._wake.wait()
+
+    def start(self) -> 'PortfolioStream':
+        """تشغيل المنتج (لا شيء إذا كان يعمل)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="portfolio-stream", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        """إيقاف المنتج وإنهاء اتصالات كل المشتركين"""
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            for subscriber in self._subscribers:
+                try:
+                    subscriber.queue.put_nowait(None)
+                except queue.Full:
+                    subscriber.queue.get_nowait()
+                    subscriber.queue.put_nowait(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get_stats(self) -> Dict:
+        """إحصائيات البث"""
+        return {
+            'subscribers': self.subscribers,
+            'version': self._version,
+            'builds': self.builds,
+            'published': self.published,
+            'resyncs': self.resyncs,
+            'rejected': self.rejected,
+        }
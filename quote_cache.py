@@ -0,0 +1,133 @@
+"""
+ذاكرة مؤقتة مشتركة للأسعار الحالية
+- كل سعر صالح لمدة محددة (TTL) ثم يعاد جلبه
+- الطلبات المتزامنة لنفس السهم تنتظر طلباً واحداً بدلاً من تكراره
+- عدادات للإصابات والإخفاقات لمتابعة الفعالية
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+import config
+from clock import wall_clock
+from market_data import get_provider
+from single_flight import SingleFlight
+
+
+class QuoteCache:
+    """ذاكرة الأسعار الحالية على مستوى العملية"""
+
+    def __init__(self, ttl: float = None):
+        """
+        :param ttl: مدة صلاحية السعر بالثواني (الافتراضي من config)
+        """
+        self.ttl = config.QUOTE_CACHE_TTL if ttl is None else ttl
+        self._entries: Dict[str, tuple] = {}  # symbol -> (price, expires_at)
+        self._flight = SingleFlight()  # الطلبات المتزامنة لنفس السهم تنتظر طلباً واحداً
+        self._lock = threading.Lock()
+        self._provider = None
+
+        # إحصائيات
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def get(self, symbol: str, ttl: float = None) -> Optional[float]:
+        """
+        السعر الحالي للسهم من الذاكرة أو من مزود البيانات
+        :param ttl: مدة صلاحية خاصة لهذا السعر (بدلاً من الافتراضية)
+        """
+        with self._lock:
+            # تغيير المزود (مثلاً إلى بيانات مسجلة) يبطل الأسعار المحفوظة
+            provider = get_provider()
+            if provider is not self._provider:
+                self._entries.clear()
+                self._provider = provider
+
+            # الصلاحية تحسب بساعة المزود (إعادة التشغيل بساعة افتراضية تنتهي صلاحيتها بالوقت الافتراضي)
+            clock = getattr(provider, 'clock', None) or wall_clock
+
+            entry = self._entries.get(symbol)
+            if entry and entry[1] > clock.monotonic():
+                self.hits += 1
+                return entry[0]
+
+        (price, cached), shared = self._flight.do_shared(
+            ('quote', symbol), lambda: self._fetch(provider, clock, symbol, ttl))
+
+        with self._lock:
+            if shared:
+                self.coalesced += 1
+            elif cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return price
+
+    def _fetch(self, provider, clock, symbol: str, ttl: float = None):
+        """
+        جلب السعر وحفظه (ينفذه أول طلب فقط - الطلبات المتزامنة تنتظره)
+        :return: (السعر، True إذا حفظه طلب انتهى للتو فلم يجلب من جديد)
+        """
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry and entry[1] > clock.monotonic():
+                return entry[0], True
+
+        try:
+            price = provider.get_quote(symbol)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+
+        if price is not None:
+            with self._lock:
+                expires_at = clock.monotonic() + (self.ttl if ttl is None else ttl)
+                self._entries[symbol] = (price, expires_at)
+        return price, False
+
+    def get_many(self, symbols: List[str]) -> Dict[str, float]:
+        """أسعار عدة أسهم - الأسهم بدون سعر لا تظهر في النتيجة"""
+        prices = {}
+        for symbol in symbols:
+            try:
+                price = self.get(symbol)
+                if price is not None:
+                    prices[symbol] = price
+            except Exception:
+                continue
+        return prices
+
+    def invalidate(self, symbol: str = None):
+        """حذف سعر سهم (أو كل الأسعار) من الذاكرة"""
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
+
+    def get_flight_stats(self) -> Dict:
+        """إحصائيات دمج الطلبات المتزامنة (عملية 'quote')"""
+        return self._flight.get_stats()
+
+    def get_stats(self) -> Dict:
+        """إحصائيات الذاكرة"""
+        total = self.hits + self.misses + self.coalesced
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'hit_rate': ((self.hits + self.coalesced) / total * 100) if total > 0 else 0,
+        }
+
+
+quote_cache = QuoteCache()
+
+
+def get_quote(symbol: str) -> Optional[float]:
+    """السعر الحالي للسهم عبر الذاكرة المشتركة"""
+    return quote_cache.get(symbol)
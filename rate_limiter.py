@@ -0,0 +1,90 @@
+"""
+محدد معدل الطلبات (Token Bucket)
+يوزع الطلبات على مزود البيانات بمعدل ثابت مع السماح بدفعة أولية
+"""
+
+import threading
+import time
+from typing import Dict
+
+import config
+
+
+class TokenBucket:
+    """دلو الرموز - آمن للاستخدام من عدة خيوط"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: عدد الطلبات المسموح بها في الثانية (0 أو None = بدون حد)
+        :param burst: أقصى عدد من الطلبات المتتالية بدون انتظار
+        """
+        self.rate = rate
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        # إحصائيات
+        self.acquired = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """أخذ رموز بدون انتظار - False إذا لم تتوفر"""
+        if not self.rate:
+            return True
+
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.acquired += tokens
+                return True
+        return False
+
+    def acquire(self, tokens: int = 1):
+        """أخذ رموز مع الانتظار حتى تتوفر (الطلبات الأكبر من السعة تؤخذ على دفعات)"""
+        if not self.rate:
+            return
+
+        remaining = tokens
+        while remaining > 0:
+            batch = min(remaining, self.capacity)
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= batch:
+                    self._tokens -= batch
+                    self.acquired += batch
+                    remaining -= batch
+                    continue
+                wait = (batch - self._tokens) / self.rate
+                self.total_wait += wait
+
+            time.sleep(wait)
+
+    def get_stats(self) -> Dict:
+        """إحصائيات المحدد"""
+        return {
+            'rate': self.rate,
+            'burst': self.capacity,
+            'acquired': self.acquired,
+            'total_wait': self.total_wait,
+        }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> TokenBucket:
+    """المحدد المشترك لطلبات مزود البيانات (حسب config.API_RATE_LIMIT و config.API_BURST)"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = TokenBucket(config.API_RATE_LIMIT, config.API_BURST)
+        return _limiter
@@ -0,0 +1,194 @@
+"""
+ذاكرة نتائج التحليل والإشارات (Stale-While-Revalidate)
+- صلاحية النتيجة حسب الفاصل الزمني وسوق السهم:
+  الشموع اليومية: حتى افتتاح الجلسة القادمة (أثناء الجلسة الشمعة تتغير فتعامل كاللحظية)
+  الشموع اللحظية: مدة ثابتة من config
+- النتيجة المنتهية تعاد فوراً ويعاد حسابها في الخلفية (حساب واحد لكل مفتاح)
+- النتيجة الأقدم من حد القدم المسموح أو غير الموجودة تحسب مباشرة (الطلبات المتزامنة تنتظر حساباً واحداً)
+- تغيير مزود البيانات يبطل كل النتائج
+- كل طلب يأخذ نسخة مستقلة من النتيجة (تعديلها لا يصل للنسخة المحفوظة أو لطلبات أخرى)
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable
+
+import pandas as pd
+
+import config
+from clock import wall_clock
+from market_data import get_provider
+from markets import get_market, is_market_open, next_market_open
+from single_flight import get_single_flight
+
+# فواصل شموعها لا تتغير بين الجلسات
+SESSION_INTERVALS = {'1d', '5d', '1wk', '1mo', '3mo'}
+
+
+def _aware(now) -> pd.Timestamp:
+    now = pd.Timestamp(now)
+    if now.tz is None:
+        now = pd.Timestamp(now.to_pydatetime().astimezone())
+    return now
+
+
+def fresh_until(symbol: str, interval: str, now, intraday_ttl: float = None) -> pd.Timestamp:
+    """
+    آخر وقت تبقى فيه نتيجة محسوبة الآن صالحة
+    :param intraday_ttl: صلاحية النتائج اللحظية بالثواني (الافتراضي من config)
+    """
+    now = _aware(now)
+    ttl = pd.Timedelta(seconds=config.RESULT_CACHE_INTRADAY_TTL if intraday_ttl is None else intraday_ttl)
+    market = get_market(symbol)
+    if interval in SESSION_INTERVALS and not is_market_open(market, now):
+        return next_market_open(market, now)
+    return now + ttl
+
+
+class ResultCache:
+    """نتائج محسوبة في الذاكرة مع إعادة الحساب في الخلفية - آمنة للاستخدام من عدة خيوط"""
+
+    def __init__(self, max_entries: int = None, max_stale: float = None,
+                 intraday_ttl: float = None, workers: int = None, enabled: bool = None):
+        """
+        :param max_entries: أقصى عدد نتائج (الأقدم استخداماً يحذف أولاً)
+        :param max_stale: أقصى مدة بالثواني بعد انتهاء الصلاحية تعاد فيها النتيجة القديمة
+        :param intraday_ttl: صلاحية النتائج اللحظية بالثواني
+        :param workers: عدد خيوط إعادة الحساب في الخلفية
+        :param enabled: False = الحساب في كل طلب (مع دمج الطلبات المتزامنة فقط)
+        """
+        self.max_entries = max_entries or config.RESULT_CACHE_MAX_ENTRIES
+        self.max_stale = pd.Timedelta(seconds=config.RESULT_CACHE_MAX_STALE if max_stale is None else max_stale)
+        self.intraday_ttl = config.RESULT_CACHE_INTRADAY_TTL if intraday_ttl is None else intraday_ttl
+        self.workers = workers or config.RESULT_CACHE_REFRESH_WORKERS
+        self.enabled = config.RESULT_CACHE_ENABLED if enabled is None else enabled
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, fresh_until)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._provider = None
+        self._executor = None
+
+        # إحصائيات
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get(self, key: Hashable, symbol: str, interval: str, compute: Callable[[], Any]) -> Any:
+        """
+        نسخة من النتيجة من الذاكرة أو بحسابها
+        :param key: مفتاح النتيجة (أول عنصر = اسم العملية)
+        :param compute: دالة الحساب (تعمل في خيط الطلب أو في الخلفية)
+        """
+        return copy.deepcopy(self._get(key, symbol, interval, compute))
+
+    def _get(self, key: Hashable, symbol: str, interval: str, compute: Callable[[], Any]) -> Any:
+        """النتيجة المشتركة (المحفوظة أو الناتجة عن الحساب) - للقراءة فقط"""
+        flight = get_single_flight()
+        if not self.enabled:
+            return flight.do(key, compute)
+
+        with self._lock:
+            provider = get_provider()
+            if provider is not self._provider:
+                self._entries.clear()
+                self._provider = provider
+            clock = getattr(provider, 'clock', None) or wall_clock
+            now = _aware(clock.now())
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if now < expires_at + self.max_stale:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    self._schedule_refresh(key, symbol, interval, compute, clock)
+                    return value
+            self.misses += 1
+
+        return flight.do(key, lambda: self._compute(key, symbol, interval, compute, clock))
+
+    def _compute(self, key, symbol: str, interval: str, compute: Callable[[], Any], clock) -> Any:
+        """الحساب وحفظ النتيجة بصلاحيتها"""
+        value = compute()
+        expires_at = fresh_until(symbol, interval, clock.now(), self.intraday_ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def _schedule_refresh(self, key, symbol: str, interval: str, compute: Callable[[], Any], clock):
+        """إعادة الحساب في الخلفية مرة واحدة لكل مفتاح (يستدعى والقفل محجوز)"""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="result-refresh")
+
+        def refresh():
+            try:
+                get_single_flight().do(key, lambda: self._compute(key, symbol, interval, compute, clock))
+                with self._lock:
+                    self.refreshes += 1
+            except Exception:
+                # النتيجة القديمة تبقى حتى تتجاوز حد القدم
+                with self._lock:
+                    self.refresh_errors += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(refresh)
+
+    def wait_refreshes(self):
+        """انتظار انتهاء إعادة الحساب الجارية في الخلفية"""
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def invalidate(self, key: Hashable = None):
+        """حذف نتيجة (أو كل النتائج)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        """إحصائيات الذاكرة"""
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'hit_rate': ((self.hits + self.stale_hits) / total * 100) if total > 0 else 0,
+        }
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """الذاكرة المشتركة على مستوى العملية"""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
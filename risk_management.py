@@ -7,6 +7,7 @@ from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import pandas as pd
 from dataclasses import dataclass
+from clock import wall_clock
 
 
 @dataclass
@@ -53,7 +54,8 @@ class RiskManager:
     """مدير المخاطر الشامل"""
     
     def __init__(self, initial_capital: float, max_risk_per_trade: float = 0.02,
-                 max_portfolio_risk: float = 0.1, max_positions: int = 5):
+                 max_portfolio_risk: float = 0.1, max_positions: int = 5,
+                 clock=None, verbose: bool = True):
         """
         تهيئة مدير المخاطر
         
@@ -61,7 +63,11 @@ class RiskManager:
         :param max_risk_per_trade: أقصى مخاطرة لكل صفقة (نسبة مئوية)
         :param max_portfolio_risk: أقصى مخاطرة للمحفظة (نسبة مئوية)
         :param max_positions: أقصى عدد للمراكز المفتوحة
+        :param clock: الساعة (الافتراضي: الوقت الحقيقي - SimulatedClock للاختبار الخلفي)
+        :param verbose: طباعة رسائل فتح وإغلاق المراكز
         """
+        self.clock = clock or wall_clock
+        self.verbose = verbose
         self.initial_capital = initial_capital
         self.current_capital = initial_capital
         self.max_risk_per_trade = max_risk_per_trade
@@ -84,11 +90,15 @@ class RiskManager:
         # حماية من الخسائر الكبيرة
         self.daily_loss = 0
         self.max_daily_loss = max_portfolio_risk
-        self.last_reset_date = datetime.now().date()
+        self.last_reset_date = self.clock.now().date()
+    
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
     
     def reset_daily_counters(self):
         """إعادة تعيين العدادات اليومية"""
-        current_date = datetime.now().date()
+        current_date = self.clock.now().date()
         if current_date > self.last_reset_date:
             self.daily_loss = 0
             self.last_reset_date = current_date
@@ -171,6 +181,21 @@ class RiskManager:
         take_profit = entry_price + (risk * risk_reward_ratio)
         return take_profit
     
+    def plan_entry(self, symbol: str, entry_price: float, atr: float = None,
+                   stop_loss_percent: float = 0.02, risk_reward_ratio: float = 2.0) -> Dict:
+        """
+        وقف الخسارة وجني الأرباح وحجم المركز لصفقة شراء (نفس الحساب في البوتات والاختبار الخلفي)
+        
+        :param atr: متوسط المدى الحقيقي (None = وقف خسارة بنسبة ثابتة)
+        :param stop_loss_percent: نسبة وقف الخسارة بدون ATR
+        :param risk_reward_ratio: نسبة العائد إلى المخاطرة
+        :return: {'quantity', 'stop_loss', 'take_profit'} - الكمية 0 إذا لا يمكن التداول
+        """
+        stop_loss = self.calculate_stop_loss(entry_price, atr=atr, percent=stop_loss_percent)
+        take_profit = self.calculate_take_profit(entry_price, stop_loss, risk_reward_ratio=risk_reward_ratio)
+        quantity = self.calculate_position_size(symbol, entry_price, stop_loss)
+        return {'quantity': quantity, 'stop_loss': stop_loss, 'take_profit': take_profit}
+    
     def open_position(self, symbol: str, quantity: float, entry_price: float,
                      stop_loss: float = None, take_profit: float = None) -> bool:
         """
@@ -184,18 +209,18 @@ class RiskManager:
         :return: True إذا تم فتح المركز بنجاح
         """
         if not self.can_trade():
-            print(f"❌ لا يمكن فتح مركز جديد: تجاوز الحدود المسموح بها")
+            self._log(f"❌ لا يمكن فتح مركز جديد: تجاوز الحدود المسموح بها")
             return False
         
         if symbol in self.positions:
-            print(f"❌ يوجد مركز مفتوح بالفعل لـ {symbol}")
+            self._log(f"❌ يوجد مركز مفتوح بالفعل لـ {symbol}")
             return False
         
         # حساب التكلفة
         cost = quantity * entry_price
         
         if cost > self.current_capital * 0.9:
-            print(f"❌ رأس المال غير كافٍ لفتح المركز")
+            self._log(f"❌ رأس المال غير كافٍ لفتح المركز")
             return False
         
         # إنشاء المركز
@@ -203,7 +228,7 @@ class RiskManager:
             symbol=symbol,
             quantity=quantity,
             entry_price=entry_price,
-            entry_time=datetime.now(),
+            entry_time=self.clock.now(),
             stop_loss=stop_loss,
             take_profit=take_profit,
             current_price=entry_price
@@ -214,7 +239,7 @@ class RiskManager:
         
         # تسجيل الصفقة
         self.trade_history.append({
-            'timestamp': datetime.now(),
+            'timestamp': self.clock.now(),
             'action': 'OPEN',
             'symbol': symbol,
             'quantity': quantity,
@@ -224,7 +249,7 @@ class RiskManager:
             'take_profit': take_profit
         })
         
-        print(f"✅ تم فتح مركز {symbol}: {quantity} سهم @ ${entry_price:.2f}")
+        self._log(f"✅ تم فتح مركز {symbol}: {quantity} سهم @ ${entry_price:.2f}")
         return True
     
     def close_position(self, symbol: str, exit_price: float, reason: str = "") -> bool:
@@ -237,7 +262,7 @@ class RiskManager:
         :return: True إذا تم إغلاق المركز بنجاح
         """
         if symbol not in self.positions:
-            print(f"❌ لا يوجد مركز مفتوح لـ {symbol}")
+            self._log(f"❌ لا يوجد مركز مفتوح لـ {symbol}")
             return False
         
         position = self.positions[symbol]
@@ -270,7 +295,7 @@ class RiskManager:
         
         # تسجيل الصفقة
         self.trade_history.append({
-            'timestamp': datetime.now(),
+            'timestamp': self.clock.now(),
             'action': 'CLOSE',
             'symbol': symbol,
             'quantity': position.quantity,
@@ -279,7 +304,7 @@ class RiskManager:
             'profit_loss': profit_loss,
             'profit_loss_percent': profit_loss_percent,
             'reason': reason,
-            'holding_time': (datetime.now() - position.entry_time).total_seconds() / 3600
+            'holding_time': (self.clock.now() - position.entry_time).total_seconds() / 3600
         })
         
         # نقل المركز للمراكز المغلقة
@@ -287,7 +312,7 @@ class RiskManager:
         del self.positions[symbol]
         
         emoji = "🟢" if profit_loss > 0 else "🔴"
-        print(f"{emoji} تم إغلاق مركز {symbol}: ربح/خسارة ${profit_loss:.2f} ({profit_loss_percent:.2f}%) - {reason}")
+        self._log(f"{emoji} تم إغلاق مركز {symbol}: ربح/خسارة ${profit_loss:.2f} ({profit_loss_percent:.2f}%) - {reason}")
         
         return True
     
@@ -0,0 +1,21 @@
+"""
+شموع صناعية بسيطة مشتركة بين ملفات الاختبار
+مسار عشوائي يومي بمدى متغير - نفس البذرة = نفس الشموع دائماً
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def make_bars(count: int, seed: int = 3) -> pd.DataFrame:
+    """شموع يومية صناعية بمدى متغير (أيام العمل من 2024-01-01 بتوقيت نيويورك)"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2024-01-01', periods=count, freq='B', tz='America/New_York', name='Date')
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.5, count),
+        'High': close + rng.uniform(0, 2, count),
+        'Low': close - rng.uniform(0, 2, count),
+        'Close': close,
+        'Volume': rng.uniform(1e5, 1e6, count)
+    }, index=index)
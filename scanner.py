@@ -0,0 +1,101 @@
+"""
+ماسح قائمة الأسهم المتوازي
+يجلب البيانات على دفعات ويحلل كل سهم فور وصول بياناته
+بحيث تتداخل طلبات الشبكة مع حساب المؤشرات بدلاً من الانتظار المتسلسل
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import config
+from indicator_panel import compute_indicators_many
+from metrics import stage
+from technical_analysis import fetch_bulk_data
+
+
+class WatchlistScanner:
+    """ماسح متوازي - وتيرة الطلبات يحددها محدد المعدل المشترك في مزود البيانات"""
+
+    def __init__(self, max_workers: int = None, chunk_size: int = None):
+        """
+        :param max_workers: عدد الخيوط
+        :param chunk_size: عدد الأسهم في كل طلب جلب
+        """
+        self.max_workers = max_workers or config.SCAN_MAX_WORKERS
+        self.chunk_size = chunk_size or config.SCAN_CHUNK_SIZE
+
+    def scan(self, symbols: List[str], analyze: Callable[[str, pd.DataFrame], Any],
+             period: str = "1y", interval: str = "1d",
+             batch_indicators: bool = False,
+             indicator_names: List[str] = None) -> Iterator[Tuple[str, Any, Optional[Exception]]]:
+        """
+        مسح الأسهم وإرجاع النتائج فور جاهزيتها
+        :param analyze: دالة (symbol, data) تعيد نتيجة التحليل - تعمل في خيوط متعددة
+        :param batch_indicators: حساب مؤشرات كل دفعة في خطوة متجهة واحدة
+                                 وتمريرها إلى analyze كـ indicators=
+        :param indicator_names: المؤشرات التي تحسبها الخطوة المتجهة (None = الكل)
+        :return: (السهم، النتيجة، الخطأ) لكل سهم بترتيب الانتهاء
+        """
+        symbols = list(symbols)
+        chunks = [symbols[i:i + self.chunk_size] for i in range(0, len(symbols), self.chunk_size)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {
+                pool.submit(self._fetch, chunk, period, interval): ('fetch', chunk)
+                for chunk in chunks
+            }
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    kind, payload = pending.pop(future)
+
+                    if kind == 'fetch':
+                        try:
+                            frames = future.result()
+                        except Exception as e:
+                            for symbol in payload:
+                                yield symbol, None, e
+                            continue
+
+                        if batch_indicators:
+                            pending[pool.submit(self._compute_panel, frames, indicator_names)] = ('panel', payload)
+                            continue
+
+                        # تحليل كل سهم فور وصول دفعته
+                        for symbol in payload:
+                            pending[pool.submit(analyze, symbol, frames.get(symbol))] = ('analyze', symbol)
+                        continue
+
+                    if kind == 'panel':
+                        try:
+                            frames, indicators = future.result()
+                        except Exception as e:
+                            for symbol in payload:
+                                yield symbol, None, e
+                            continue
+
+                        for symbol in payload:
+                            task = pool.submit(analyze, symbol, frames.get(symbol),
+                                               indicators=indicators.get(symbol))
+                            pending[task] = ('analyze', symbol)
+                        continue
+
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        yield payload, None, e
+                    else:
+                        yield payload, result, None
+
+    @staticmethod
+    def _fetch(chunk, period, interval):
+        with stage("fetch"):
+            return fetch_bulk_data(chunk, period, interval)
+
+    @staticmethod
+    def _compute_panel(frames, names):
+        with stage("indicators"):
+            return frames, compute_indicators_many(frames, names)
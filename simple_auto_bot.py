@@ -3,28 +3,36 @@
 """
 
 import sys
-import time
-from datetime import datetime
-from technical_analysis import analyze_stock
+from clock import wall_clock
+from technical_analysis import TechnicalAnalyzer
 from trading_strategy import CompositeStrategy
 from risk_management import RiskManager
+from scanner import WatchlistScanner
+from metrics import get_metrics, stage
 import config
 
 # تجنب مشاكل الترميز
 sys.stdout.reconfigure(encoding='utf-8')
 
 class SimpleTradingBot:
-    def __init__(self):
-        self.rm = RiskManager(10000, max_risk_per_trade=0.02, max_positions=5)
+    def __init__(self, clock=None):
+        """
+        :param clock: الساعة (الافتراضي: الوقت الحقيقي - SimulatedClock لإعادة التشغيل السريع)
+        """
+        self.clock = clock or wall_clock
+        self.rm = RiskManager(10000, max_risk_per_trade=0.02, max_positions=5, clock=self.clock)
         self.strategy = CompositeStrategy()
+        self.scanner = WatchlistScanner()
         self.watchlist = config.WATCHLIST
         
     def run_once(self):
         """فحص واحد وتداول"""
+        metrics = get_metrics()
+        before = metrics.snapshot()
         print("\n" + "="*70)
         print("بوت التداول التلقائي - يشتري ويبيع تلقائيا")
         print("="*70)
-        print(f"الوقت: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"الوقت: {self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"راس المال: ${self.rm.current_capital:,.2f}")
         print("="*70 + "\n")
         
@@ -32,12 +40,21 @@ class SimpleTradingBot:
         
         opportunities = []
         
+        results = self.scanner.scan(
+            self.watchlist,
+            self.analyze_symbol,
+            period="3mo",
+            batch_indicators=True,
+            indicator_names=TechnicalAnalyzer.SIGNAL_INDICATORS
+        )
+        
         # تحليل كل سهم
-        for symbol in self.watchlist[:8]:  # أول 8 أسهم فقط
+        for symbol, result, error in results:
             try:
                 print(f"  تحليل {symbol}...", end=" ")
                 
-                result = analyze_stock(symbol, period="3mo")
+                if error:
+                    raise error
                 
                 if "شراء" in result['recommendation'] and result['score'] >= 2:
                     print(f"فرصة شراء! (نقاط: {result['score']})")
@@ -50,8 +67,6 @@ class SimpleTradingBot:
                 else:
                     print("محايد")
                 
-                time.sleep(0.3)
-                
             except Exception as e:
                 print(f"خطأ: {str(e)[:30]}")
         
@@ -61,32 +76,60 @@ class SimpleTradingBot:
             print(f"تم اكتشاف {len(opportunities)} فرصة!")
             print("="*70 + "\n")
             
+            opportunities.sort(key=lambda opp: opp['score'], reverse=True)
             for opp in opportunities[:3]:  # أفضل 3 فرص
-                if self.rm.can_trade():
-                    symbol = opp['symbol']
-                    price = opp['price']
-                    stop_loss = price * 0.98
-                    take_profit = price * 1.05
-                    
-                    size = self.rm.calculate_position_size(symbol, price, stop_loss)
-                    
-                    if size > 0:
-                        print(f"\nشراء {symbol}:")
-                        print(f"  السعر: ${price:.2f}")
-                        print(f"  الكمية: {size} سهم")
-                        print(f"  وقف الخسارة: ${stop_loss:.2f}")
-                        print(f"  جني الارباح: ${take_profit:.2f}")
-                        
-                        success = self.rm.open_position(
-                            symbol, size, price, stop_loss, take_profit
-                        )
-                        
-                        if success:
-                            print(f"  تم فتح المركز!")
+                with stage("risk", opp['symbol']):
+                    self.open_opportunity(opp)
         else:
             print("\nلا توجد فرص شراء حاليا")
         
         # ملخص
+        with stage("print"):
+            self.print_summary()
+        
+        # أين ذهب وقت المسح
+        metrics.print_summary(before)
+    
+    def analyze_symbol(self, symbol: str, data, indicators=None):
+        """تحليل سهم واحد (يعمل داخل خيوط الماسح)"""
+        analyzer = TechnicalAnalyzer(symbol, period="3mo")
+        analyzer.set_data(data, indicators)
+        
+        # المؤشرات الناقصة من الحساب الجماعي تحسب هنا حتى لا يحسب زمنها على الاستراتيجية
+        with stage("indicators", symbol):
+            analyzer.ensure_indicators(TechnicalAnalyzer.SIGNAL_INDICATORS)
+        
+        with stage("strategy", symbol):
+            return analyzer.generate_signals()
+    
+    def open_opportunity(self, opp):
+        """فتح مركز لفرصة شراء إذا سمحت إدارة المخاطر"""
+        if not self.rm.can_trade():
+            return
+        
+        symbol = opp['symbol']
+        price = opp['price']
+        stop_loss = price * 0.98
+        take_profit = price * 1.05
+        
+        size = self.rm.calculate_position_size(symbol, price, stop_loss)
+        
+        if size > 0:
+            print(f"\nشراء {symbol}:")
+            print(f"  السعر: ${price:.2f}")
+            print(f"  الكمية: {size} سهم")
+            print(f"  وقف الخسارة: ${stop_loss:.2f}")
+            print(f"  جني الارباح: ${take_profit:.2f}")
+            
+            success = self.rm.open_position(
+                symbol, size, price, stop_loss, take_profit
+            )
+            
+            if success:
+                print(f"  تم فتح المركز!")
+    
+    def print_summary(self):
+        """طباعة ملخص المحفظة"""
         print("\n" + "="*70)
         print("ملخص المحفظة")
         print("="*70)
@@ -0,0 +1,122 @@
+"""
+دمج الطلبات المتزامنة المتطابقة (Single Flight)
+- أول من يطلب مفتاحاً ينفذ العملية والباقون ينتظرونه ويأخذون نفس النتيجة (أو نفس الخطأ)
+- المفتاح يحدد العملية: مثلاً ('history', symbol, period, interval)
+- لا يحفظ النتائج بعد انتهاء العملية - الطلب التالي ينفذ من جديد (الحفظ مسؤولية من يستدعيه)
+- عدادات لكل عملية: مرات التنفيذ والطلبات المدمجة والأخطاء
+
+الاستخدام:
+    data = get_single_flight().do(('history', symbol, period, interval), download)
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """عملية جارية - ينتظرها كل من يطلب نفس المفتاح في نفس الوقت"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """مجموعة عمليات جارية حسب المفتاح - آمنة للاستخدام من عدة خيوط"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _operation(key: Hashable) -> str:
+        """اسم العملية للإحصائيات (أول عنصر في المفتاح)"""
+        return str(key[0]) if isinstance(key, tuple) and key else str(key)
+
+    def _count(self, key: Hashable, name: str):
+        stats = self._stats.setdefault(self._operation(key),
+                                       {'executed': 0, 'coalesced': 0, 'errors': 0})
+        stats[name] += 1
+
+    def do_shared(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        تنفيذ func مرة واحدة لكل مجموعة طلبات متزامنة بنفس المفتاح
+        :return: (النتيجة، True إذا أخذت من عملية طلب آخر)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._count(key, 'coalesced')
+                leader = False
+            else:
+                self._count(key, 'executed')
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._count(key, 'errors')
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result, False
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """النتيجة فقط (انظر do_shared)"""
+        return self.do_shared(key, func)[0]
+
+    def in_flight(self) -> int:
+        """عدد العمليات الجارية الآن"""
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """الإحصائيات لكل عملية مع نسبة الطلبات المدمجة"""
+        with self._lock:
+            stats = {operation: dict(values) for operation, values in self._stats.items()}
+        for values in stats.values():
+            total = values['executed'] + values['coalesced']
+            values['coalesced_rate'] = values['coalesced'] / total * 100 if total > 0 else 0
+        return stats
+
+
+def render_prometheus(stats: Dict[str, Dict], prefix: str = "trading") -> str:
+    """عدادات get_stats (من مجموعة أو أكثر) بتنسيق Prometheus"""
+    lines = []
+    for metric, help_text in (
+        ("executed", "عدد مرات تنفيذ العملية فعلياً"),
+        ("coalesced", "عدد الطلبات التي انتظرت عملية جارية بنفس المفتاح"),
+        ("errors", "عدد مرات انتهاء العملية بخطأ"),
+    ):
+        name = f"{prefix}_single_flight_{metric}_total"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for operation, values in sorted(stats.items()):
+            lines.append(f'{name}{{operation="{operation}"}} {values[metric]}')
+    return "\n".join(lines) + "\n"
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """المجموعة المشتركة على مستوى العملية"""
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
@@ -34,6 +34,7 @@ def show_menu():
     print("4. اختبار إدارة المخاطر")
     print("5. تشغيل الأمثلة المتقدمة")
     print("6. عرض التعليمات")
+    print("7. اختبار خلفي للاستراتيجيات")
     print("0. خروج")
     print("\n" + "=" * 70)
 
@@ -63,6 +64,34 @@ def run_examples():
     os.system("python examples.py")
 
 
+def run_backtests():
+    """اختبار خلفي لكل الاستراتيجيات (النتائج المحفوظة لا يعاد حسابها)"""
+    from backtest_cache import anchored_start, get_backtest_cache
+    from trading_strategy import (
+        MomentumStrategy, TrendFollowingStrategy, BreakoutStrategy,
+        MeanReversionStrategy, CompositeStrategy, backtest_strategy
+    )
+    
+    symbol = input("رمز السهم (AAPL): ").strip().upper() or "AAPL"
+    cache = get_backtest_cache()
+    strategies = [MomentumStrategy(), TrendFollowingStrategy(), BreakoutStrategy(),
+                  MeanReversionStrategy(), CompositeStrategy()]
+    
+    # سنة مقربة لأول الشهر: خلال الشهر تكمل الأيام الجديدة محاكاة الصفقات المحفوظة بدلاً من حسابها كاملة
+    start = anchored_start("1y")
+    print(f"\n📊 اختبار خلفي لـ {symbol} - سنة من أول الشهر (منذ {start:%Y-%m-%d}):\n")
+    for strategy in strategies:
+        try:
+            result = backtest_strategy(symbol, strategy, start=start, cache=cache)
+            print(f"  {result['strategy']:<28} العائد: {result['total_return']:>7.2f}% | "
+                  f"الصفقات: {result['num_trades']}")
+        except Exception as e:
+            print(f"  {strategy.name:<28} خطأ: {str(e)}")
+    
+    stats = cache.get_stats()
+    print(f"\n💾 من القرص: {stats['hits']} | إكمال: {stats['resumed']} | حساب كامل: {stats['misses']}")
+
+
 def show_help():
     """عرض التعليمات"""
     print("\n" + "=" * 70)
@@ -109,7 +138,7 @@ def main():
     
     while True:
         show_menu()
-        choice = input("\nاختر رقماً (0-6): ").strip()
+        choice = input("\nاختر رقماً (0-7): ").strip()
         
         if choice == "1":
             run_bot()
@@ -123,6 +152,8 @@ def main():
             run_examples()
         elif choice == "6":
             show_help()
+        elif choice == "7":
+            run_backtests()
         elif choice == "0":
             print("\n👋 شكراً لاستخدام البوت!")
             break
@@ -239,6 +239,11 @@ class SubscriptionManager:
             'features': self.PLANS['free']['features']
         }
     
+    def get_allowed_indicators(self, user_id):
+        """المؤشرات الفنية المسموحة في باقة المستخدم (None = جميع المؤشرات)"""
+        indicators = self.get_user_subscription(user_id)['features'].get('technical_indicators', 'all')
+        return None if indicators == 'all' else list(indicators)
+    
     def expire_subscription(self, user_id):
         """إنهاء اشتراك منتهي"""
         conn = sqlite3.connect(self.db_path)
@@ -0,0 +1,282 @@
+"""
+مولد بيانات سوق صناعية لاختبارات الحمل والأداء
+- شموع OHLCV بانحراف وتذبذب قابلين للضبط مع أنظمة تذبذب متغيرة (هادئ / عادي / مضطرب)
+- فجوات عند الافتتاح وحجم تداول بشكل يومي (مرتفع عند الافتتاح والإغلاق) ويرتفع مع الحركة
+- تقويم تداول السوق الأمريكي (الإثنين - الجمعة) وتداول السعودي (الأحد - الخميس)
+- نفس السهم ونفس البذرة = نفس البيانات دائماً (مستقل عن ترتيب الأسهم)
+- الكتابة بتنسيق ReplayProvider على دفعات بدون تحميل كل البيانات في الذاكرة
+"""
+
+import os
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from markets import MARKETS, get_market
+from market_data import ReplayProvider, OHLCV_COLUMNS
+
+# أيام وساعات التداول لكل سوق (بدون العطل الرسمية)
+CALENDARS = {market: {key: info[key] for key in ('weekmask', 'open', 'close')}
+             for market, info in MARKETS.items()}
+
+# طول الشمعة بالدقائق (1d = شمعة واحدة لكل جلسة)
+INTERVAL_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '1h': 60, '1d': None}
+
+TRADING_DAYS = 252
+
+
+@dataclass
+class MarketProfile:
+    """خصائص السلسلة الصناعية (القيم السنوية كنسب)"""
+    start_price: float = 100.0
+    drift: float = 0.08  # العائد السنوي المتوقع
+    volatility: float = 0.25  # التذبذب السنوي في النظام العادي
+    regimes: Tuple[float, ...] = (0.6, 1.0, 2.2)  # مضاعف التذبذب لكل نظام
+    regime_persistence: float = 0.97  # احتمال بقاء النظام من جلسة لأخرى
+    gap_probability: float = 0.08  # احتمال فجوة عند الافتتاح
+    gap_size: float = 0.02  # متوسط حجم الفجوة
+    base_volume: float = 2e6  # متوسط حجم التداول اليومي
+    volume_profile: str = "u_shape"  # "u_shape" أو "flat"
+
+
+def trading_sessions(market: str, start=None, end=None, count: int = None) -> pd.DatetimeIndex:
+    """
+    أيام التداول للسوق (منتصف الليل بالتوقيت المحلي - كما في شموع yfinance اليومية)
+    :param count: عدد الجلسات (مع start أو end)
+    """
+    timezone = MARKETS[market]['timezone']
+
+    def local_date(value):
+        if value is None:
+            return None
+        value = pd.Timestamp(value)
+        if value.tz is not None:
+            value = value.tz_convert(timezone).tz_localize(None)
+        return value.normalize()
+
+    start, end = local_date(start), local_date(end)
+    if start is not None and end is not None:
+        first, last = start, end
+    elif start is not None:
+        first, last = start, start + pd.Timedelta(days=count * 7 // 5 + 7)
+    else:
+        first, last = end - pd.Timedelta(days=count * 7 // 5 + 7), end
+
+    days = np.arange(first.to_datetime64().astype('datetime64[D]'),
+                     last.to_datetime64().astype('datetime64[D]') + 1)
+    days = days[np.is_busday(days, weekmask=CALENDARS[market]['weekmask'])]
+    if count is not None:
+        days = days[:count] if start is not None else days[-count:]
+    return pd.DatetimeIndex(days.astype('datetime64[ns]')).tz_localize(timezone)
+
+
+def bar_offsets(market: str, interval: str) -> pd.TimedeltaIndex:
+    """إزاحة كل شمعة من بداية اليوم داخل جلسة واحدة"""
+    minutes = INTERVAL_MINUTES.get(interval, -1)
+    if minutes == -1:
+        raise ValueError(f"فاصل زمني غير مدعوم: {interval}")
+    if minutes is None:
+        return pd.to_timedelta([0], unit='min')
+
+    calendar = CALENDARS[market]
+    open_at = pd.Timedelta(f"{calendar['open']}:00")
+    close_at = pd.Timedelta(f"{calendar['close']}:00")
+    count = int((close_at - open_at) / pd.Timedelta(minutes=minutes))
+    return open_at + pd.to_timedelta(np.arange(count) * minutes, unit='min')
+
+
+def _volume_shape(bars: int, profile: str) -> np.ndarray:
+    """توزيع حجم الجلسة على شموعها (مجموعه 1)"""
+    if bars == 1 or profile == "flat":
+        shape = np.ones(bars)
+    else:
+        position = np.linspace(-1, 1, bars)
+        shape = 1 + 1.5 * position ** 2
+    return shape / shape.sum()
+
+
+class _SessionDraws:
+    """
+    الأرقام العشوائية لكل جلسة - تسحب في كتل ثابتة الحجم
+    فلا تتغير السلسلة بتغير حجم الدفعة المطلوبة
+    """
+
+    BLOCK = 256
+
+    def __init__(self, rng: np.random.Generator, per_session: int):
+        self.rng = rng
+        self.per_session = per_session
+        self.uniforms = np.empty((0, 4))
+        self.normals = np.empty((0, 5, per_session))
+
+    def take(self, sessions: int) -> Tuple[np.ndarray, np.ndarray]:
+        """:return: (منتظمة [جلسات×4], طبيعية [جلسات×5×شموع الجلسة])"""
+        while len(self.uniforms) < sessions:
+            self.uniforms = np.concatenate((self.uniforms, self.rng.random((self.BLOCK, 4))))
+            self.normals = np.concatenate((self.normals, self.rng.standard_normal(
+                (self.BLOCK, 5, self.per_session))))
+        uniforms, self.uniforms = self.uniforms[:sessions], self.uniforms[sessions:]
+        normals, self.normals = self.normals[:sessions], self.normals[sessions:]
+        return uniforms, normals
+
+
+class SyntheticMarket:
+    """سلسلة شموع صناعية لسهم واحد"""
+
+    def __init__(self, symbol: str, profile: MarketProfile = None, seed: int = 0):
+        """
+        :param symbol: رمز السهم (اللاحقة .SR = تقويم تداول السعودي)
+        :param profile: خصائص السلسلة
+        :param seed: البذرة (تجمع مع الرمز فيكون لكل سهم سلسلة مستقلة)
+        """
+        self.symbol = symbol
+        self.market = get_market(symbol)
+        self.profile = profile or MarketProfile()
+        self.seed = seed
+
+    def chunks(self, start=None, end=None, interval: str = "1d", sessions: int = None,
+               sessions_per_chunk: int = 20) -> Iterator[pd.DataFrame]:
+        """
+        توليد الشموع على دفعات (كل دفعة عدة جلسات) - الحالة تنتقل بين الدفعات
+        :param sessions: عدد الجلسات (مع start أو end - الافتراضي سنة حتى اليوم)
+        """
+        if start is None and end is None:
+            end = pd.Timestamp.now(tz='UTC')
+        if start is None and sessions is None:
+            sessions = TRADING_DAYS
+        days = trading_sessions(self.market, start, end, sessions)
+        local_days = days.tz_localize(None)
+        offsets = bar_offsets(self.market, interval)
+        per_session = len(offsets)
+
+        profile = self.profile
+        rng = np.random.default_rng([self.seed, zlib.crc32(self.symbol.encode())])
+        # سعر البداية يختلف بين الأسهم
+        log_price = np.log(profile.start_price * rng.uniform(0.2, 5.0))
+        draws = _SessionDraws(rng, per_session)
+        regime = 1
+        regimes = np.asarray(profile.regimes, dtype=float)
+        mu = profile.drift / (TRADING_DAYS * per_session)
+        sigma = profile.volatility / np.sqrt(TRADING_DAYS * per_session)
+        shape = _volume_shape(per_session, profile.volume_profile)
+        first = True
+
+        for begin in range(0, len(days), sessions_per_chunk):
+            chunk_days = local_days[begin:begin + sessions_per_chunk]
+            n_days = len(chunk_days)
+
+            uniforms, normals = draws.take(n_days)
+
+            # نظام التذبذب لكل جلسة (سلسلة ماركوف)
+            levels = np.empty(n_days, dtype=int)
+            for d in range(n_days):
+                if uniforms[d, 0] > profile.regime_persistence:
+                    regime = int(uniforms[d, 1] * len(regimes))
+                levels[d] = regime
+            scale = np.repeat(regimes[levels], per_session)
+
+            # العوائد داخل الجلسات + فجوة عند افتتاح كل جلسة
+            returns = (mu + sigma * normals[:, 0].ravel()) * scale
+            gaps = np.zeros(n_days * per_session)
+            has_gap = uniforms[:, 2] < profile.gap_probability
+            if first:
+                has_gap[0] = False
+                first = False
+            gaps[::per_session] = np.where(
+                has_gap, normals[:, 4, 0] * profile.gap_size * regimes[levels], 0.0
+            )
+
+            path = log_price + np.cumsum(gaps + returns)
+            previous = np.concatenate(([log_price], path[:-1]))
+            log_price = path[-1]
+
+            open_ = np.exp(previous + gaps)
+            close = np.exp(path)
+            high = np.maximum(open_, close) * (1 + np.abs(normals[:, 1].ravel()) * sigma * scale)
+            low = np.minimum(open_, close) * (1 - np.abs(normals[:, 2].ravel()) * sigma * scale)
+
+            # الحجم: شكل الجلسة × النظام × حجم الحركة × ضوضاء
+            activity = 1 + np.abs(returns) / sigma * 0.3
+            volume = (profile.base_volume * np.tile(shape, n_days) * scale * activity
+                      * np.exp(0.25 * normals[:, 3].ravel()))
+
+            # الأوقات بالتوقيت المحلي ثم المنطقة الزمنية (ساعات الجلسة لا تقع في تغيير التوقيت الصيفي)
+            index = (chunk_days.repeat(per_session) + np.tile(offsets, n_days)).tz_localize(days.tz)
+            index.name = 'Date' if interval == '1d' else 'Datetime'
+            yield pd.DataFrame({
+                'Open': open_,
+                'High': high,
+                'Low': low,
+                'Close': close,
+                'Volume': np.round(volume),
+            }, index=index)
+
+    def generate(self, start=None, end=None, interval: str = "1d", sessions: int = None) -> pd.DataFrame:
+        """كل الشموع في DataFrame واحد"""
+        parts = list(self.chunks(start, end, interval, sessions, sessions_per_chunk=250))
+        return pd.concat(parts) if parts else pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    def bars(self, count: int, interval: str = "1d", end=None) -> pd.DataFrame:
+        """آخر count شمعة حتى end (الافتراضي اليوم)"""
+        per_session = len(bar_offsets(self.market, interval))
+        sessions = -(-count // per_session)
+        if end is None:
+            end = pd.Timestamp.now(tz='UTC')
+        return self.generate(end=end, interval=interval, sessions=sessions).iloc[-count:]
+
+
+def synthetic_symbols(count: int, markets: Tuple[str, ...] = ('US', 'SA')) -> List[str]:
+    """رموز صناعية موزعة على الأسواق (SYN0000 للأمريكي و SYN0001.SR للسعودي)"""
+    symbols = []
+    for n in range(count):
+        market = markets[n % len(markets)]
+        symbols.append(f"SYN{n:04d}{MARKETS[market]['suffix']}")
+    return symbols
+
+
+def generate_universe(symbols: List[str], count: int = 500, interval: str = "1d", end=None,
+                      seed: int = 0, profile: MarketProfile = None) -> Dict[str, pd.DataFrame]:
+    """شموع عدة أسهم في الذاكرة {symbol: DataFrame}"""
+    return {symbol: SyntheticMarket(symbol, profile, seed).bars(count, interval, end)
+            for symbol in symbols}
+
+
+def write_fixtures(symbols: List[str], data_dir: str, start=None, end=None, interval: str = "1d",
+                   sessions: int = None, seed: int = 0, profile: MarketProfile = None,
+                   fmt: str = "csv", sessions_per_chunk: int = 20) -> List[str]:
+    """
+    كتابة الشموع بتنسيق ReplayProvider (<data_dir>/<interval>/<SYMBOL>.csv)
+    CSV يكتب دفعة بدفعة (الذاكرة = دفعة واحدة لسهم واحد) - Parquet يحتاج pyarrow ويكتب السهم كاملاً
+    :return: قائمة الملفات المكتوبة
+    """
+    written = []
+    for symbol in symbols:
+        path = ReplayProvider.fixture_path(data_dir, symbol, interval, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        market = SyntheticMarket(symbol, profile, seed)
+
+        if fmt == 'parquet':
+            market.generate(start, end, interval, sessions).to_parquet(path)
+        else:
+            header = True
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                for chunk in market.chunks(start, end, interval, sessions, sessions_per_chunk):
+                    chunk.to_csv(f, header=header)
+                    header = False
+        written.append(path)
+    return written
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # مثال: 1000 سهم × سنتين من شموع 5 دقائق على القرص
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    started = time.perf_counter()
+    paths = write_fixtures(synthetic_symbols(count), "fixtures_synthetic", interval="5m", sessions=504)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"✅ {len(paths)} ملف | {size / 1024 ** 2:.1f} MB | {time.perf_counter() - started:.1f} ثانية")
@@ -5,33 +5,144 @@
 
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from datetime import datetime, timedelta
 import ta
 from typing import Dict, List, Tuple
+import config
+from data_cache import get_bar_cache
+from compact_storage import CompactBars
+from indicator_stream import IndicatorStream
+from market_data import get_provider, OHLCV_COLUMNS
+from single_flight import get_single_flight
+from result_cache import get_result_cache
+
+
+# مجموعات المؤشرات (بنفس أسماء باقات الاشتراك) والمفاتيح التي تحسبها كل مجموعة
+INDICATOR_GROUPS = {
+    'SMA': ['SMA_20', 'SMA_50', 'SMA_200'],
+    'EMA': ['EMA_12', 'EMA_26', 'EMA_50'],
+    'RSI': ['RSI'],
+    'MACD': ['MACD', 'MACD_Signal', 'MACD_Diff'],
+    'Bollinger': ['BB_High', 'BB_Mid', 'BB_Low', 'BB_Width'],
+    'Stochastic': ['Stoch_K', 'Stoch_D'],
+    'ATR': ['ATR'],
+    'ADX': ['ADX', 'ADX_Pos', 'ADX_Neg'],
+    'Volume': ['Volume_SMA', 'OBV', 'Volume_Ratio'],
+}
+
+INDICATOR_KEY_GROUPS = {key: group for group, keys in INDICATOR_GROUPS.items() for key in keys}
+
+
+def resolve_indicator_groups(names=None, allowed=None) -> List[str]:
+    """
+    تحويل أسماء المؤشرات إلى المجموعات اللازمة لحسابها
+    :param names: أسماء مجموعات (RSI, Bollinger ...) أو مفاتيح (BB_High ...) - None أو 'all' = الكل
+    :param allowed: المؤشرات المسموحة بنفس الصيغة (مثلاً من باقة الاشتراك) - None = الكل
+    """
+    if names is None or names == 'all':
+        needed = set(INDICATOR_GROUPS)
+    else:
+        if isinstance(names, str):
+            names = [names]
+        needed = set()
+        for name in names:
+            group = name if name in INDICATOR_GROUPS else INDICATOR_KEY_GROUPS.get(name)
+            if group is None:
+                raise ValueError(f"مؤشر غير معروف: {name}")
+            needed.add(group)
+    
+    if allowed is not None:
+        needed &= set(resolve_indicator_groups(allowed))
+    return [group for group in INDICATOR_GROUPS if group in needed]
 
 
 class TechnicalAnalyzer:
     """محلل تقني شامل للأسهم"""
     
-    def __init__(self, symbol: str, period: str = "1y", interval: str = "1d"):
+    # دالة الحساب لكل مجموعة مؤشرات
+    GROUP_CALCULATORS = {
+        'SMA': 'calculate_sma',
+        'EMA': 'calculate_ema',
+        'RSI': 'calculate_rsi',
+        'MACD': 'calculate_macd',
+        'Bollinger': 'calculate_bollinger_bands',
+        'Stochastic': 'calculate_stochastic',
+        'ATR': 'calculate_atr',
+        'ADX': 'calculate_adx',
+        'Volume': 'calculate_volume_indicators',
+    }
+    
+    # المؤشرات التي تقرأها get_trend_analysis و generate_signals
+    SIGNAL_INDICATORS = ['SMA', 'RSI', 'MACD', 'Bollinger', 'Volume']
+    
+    def __init__(self, symbol: str, period: str = "1y", interval: str = "1d",
+                 use_cache: bool = None, allowed_indicators: List[str] = None):
         """
         تهيئة المحلل
         :param symbol: رمز السهم (مثل: AAPL)
         :param period: الفترة الزمنية (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
         :param interval: الفاصل الزمني (1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo)
+        :param use_cache: استخدام مخزن الشموع على القرص (الافتراضي من config)
+        :param allowed_indicators: المؤشرات المسموح حسابها (مثلاً حسب باقة المستخدم) - None = الكل
         """
         self.symbol = symbol
         self.period = period
         self.interval = interval
+        self.use_cache = config.DATA_CACHE_ENABLED if use_cache is None else use_cache
+        self.allowed_indicators = allowed_indicators
+        self.intermediate_stats = {'computed': 0, 'reused': 0}
         self.data = None
         self.indicators = {}
         
-    def fetch_data(self) -> pd.DataFrame:
-        """جلب بيانات السهم"""
+    # ==================== البيانات ====================
+    
+    @property
+    def data(self) -> pd.DataFrame:
+        """الشموع - تشمل الشموع المضافة عبر update_with_bar"""
+        self._flush_stream()
+        return self._data
+    
+    @data.setter
+    def data(self, value: pd.DataFrame):
+        # بيانات جديدة تلغي حالة التحديث التزايدي
+        self._data = value
+        self._intermediates = {}
+        self._stream = None
+        self._pending_bars = []
+        self._last_timestamp = None
+    
+    @property
+    def indicators(self) -> Dict[str, pd.Series]:
+        """سلاسل المؤشرات - تشمل قيم الشموع المضافة عبر update_with_bar"""
+        self._flush_stream()
+        return self._indicators
+    
+    @indicators.setter
+    def indicators(self, value: Dict[str, pd.Series]):
+        self._indicators = value
+    
+    def fetch_data(self, start: pd.Timestamp = None) -> pd.DataFrame:
+        """
+        جلب بيانات السهم (من المخزن أولاً ثم الشموع الجديدة فقط)
+        :param start: بداية ثابتة بدلاً من بداية self.period (مثل anchored_start)
+        """
         try:
-            ticker = yf.Ticker(self.symbol)
-            self.data = ticker.history(period=self.period, interval=self.interval)
+            provider = get_provider()
+            
+            def download():
+                if self.use_cache and provider.cacheable:
+                    return get_bar_cache().get_bars(
+                        self.symbol, self.period, self.interval,
+                        lambda **kwargs: provider.get_history(self.symbol, self.interval, **kwargs),
+                        start=start
+                    )
+                if start is not None:
+                    return provider.get_history(self.symbol, self.interval, start=start)
+                return provider.get_history(self.symbol, self.interval, period=self.period)
+            
+            # الطلبات المتزامنة لنفس السهم والفترة تنتظر تحميلاً واحداً
+            self.data = get_single_flight().do(
+                ('history', self.symbol, self.period, start, self.interval, self.use_cache), download)
             
             if self.data.empty:
                 raise ValueError(f"لا توجد بيانات للسهم {self.symbol}")
@@ -40,22 +151,49 @@ class TechnicalAnalyzer:
         except Exception as e:
             raise Exception(f"خطأ في جلب البيانات: {str(e)}")
     
+    def set_data(self, data: pd.DataFrame, indicators: Dict[str, pd.Series] = None) -> pd.DataFrame:
+        """
+        تعيين بيانات جاهزة (مثلاً من التحميل الجماعي) بدلاً من جلبها
+        :param indicators: مؤشرات محسوبة مسبقاً لنفس البيانات (مثلاً من IndicatorPanel)
+        """
+        if data is None or data.empty:
+            raise ValueError(f"لا توجد بيانات للسهم {self.symbol}")
+        
+        self.data = data
+        self.indicators = dict(indicators) if indicators else {}
+        return self.data
+    
     def calculate_moving_averages(self) -> Dict[str, pd.Series]:
         """حساب المتوسطات المتحركة"""
+        mas = self.calculate_sma()
+        mas.update(self.calculate_ema())
+        return mas
+    
+    def calculate_sma(self) -> Dict[str, pd.Series]:
+        """حساب المتوسطات المتحركة البسيطة"""
         if self.data is None:
             raise ValueError("يجب جلب البيانات أولاً")
         
-        mas = {
-            'SMA_20': ta.trend.sma_indicator(self.data['Close'], window=20),
-            'SMA_50': ta.trend.sma_indicator(self.data['Close'], window=50),
-            'SMA_200': ta.trend.sma_indicator(self.data['Close'], window=200),
-            'EMA_12': ta.trend.ema_indicator(self.data['Close'], window=12),
-            'EMA_26': ta.trend.ema_indicator(self.data['Close'], window=26),
-            'EMA_50': ta.trend.ema_indicator(self.data['Close'], window=50),
+        smas = {
+            f'SMA_{w}': pd.Series(self._sma('Close', w), name=f"sma_{w}")
+            for w in (20, 50, 200)
         }
         
-        self.indicators.update(mas)
-        return mas
+        self.indicators.update(smas)
+        return smas
+    
+    def calculate_ema(self) -> Dict[str, pd.Series]:
+        """حساب المتوسطات المتحركة الأسية"""
+        if self.data is None:
+            raise ValueError("يجب جلب البيانات أولاً")
+        
+        emas = {
+            f'EMA_{w}': pd.Series(self._ema('Close', w), name=f"ema_{w}")
+            for w in (12, 26, 50)
+        }
+        
+        self.indicators.update(emas)
+        return emas
     
     def calculate_rsi(self, period: int = 14) -> pd.Series:
         """حساب مؤشر القوة النسبية RSI"""
@@ -71,11 +209,13 @@ class TechnicalAnalyzer:
         if self.data is None:
             raise ValueError("يجب جلب البيانات أولاً")
         
-        macd = ta.trend.MACD(self.data['Close'])
+        # نفس حساب ta.trend.MACD مع إعادة استخدام EMA 12/26
+        macd = self._ema('Close', 12) - self._ema('Close', 26)
+        macd_signal = macd.ewm(span=9, min_periods=9, adjust=False).mean()
         macd_dict = {
-            'MACD': macd.macd(),
-            'MACD_Signal': macd.macd_signal(),
-            'MACD_Diff': macd.macd_diff()
+            'MACD': pd.Series(macd, name="MACD_12_26"),
+            'MACD_Signal': pd.Series(macd_signal, name="MACD_sign_12_26"),
+            'MACD_Diff': pd.Series(macd - macd_signal, name="MACD_diff_12_26")
         }
         
         self.indicators.update(macd_dict)
@@ -86,12 +226,16 @@ class TechnicalAnalyzer:
         if self.data is None:
             raise ValueError("يجب جلب البيانات أولاً")
         
-        bb = ta.volatility.BollingerBands(self.data['Close'], window=period, window_dev=std)
+        # نفس حساب ta.volatility.BollingerBands - الخط الأوسط هو SMA لنفس الفترة
+        mavg = self._sma('Close', period)
+        mstd = self._rolling_std('Close', period)
+        hband = mavg + std * mstd
+        lband = mavg - std * mstd
         bb_dict = {
-            'BB_High': bb.bollinger_hband(),
-            'BB_Mid': bb.bollinger_mavg(),
-            'BB_Low': bb.bollinger_lband(),
-            'BB_Width': bb.bollinger_wband()
+            'BB_High': pd.Series(hband, name="hband"),
+            'BB_Mid': pd.Series(mavg, name="mavg"),
+            'BB_Low': pd.Series(lband, name="lband"),
+            'BB_Width': pd.Series(((hband - lband) / mavg) * 100, name="bbiwband")
         }
         
         self.indicators.update(bb_dict)
@@ -121,12 +265,14 @@ class TechnicalAnalyzer:
         if self.data is None:
             raise ValueError("يجب جلب البيانات أولاً")
         
-        atr = ta.volatility.average_true_range(
-            self.data['High'],
-            self.data['Low'],
-            self.data['Close'],
-            window=period
-        )
+        # نفس حساب ta.volatility.AverageTrueRange مع إعادة استخدام المدى الحقيقي
+        true_range = self._true_range()
+        values = true_range.to_numpy()
+        atr = np.zeros(len(true_range))
+        atr[period - 1] = true_range.iloc[0:period].mean()
+        for i in range(period, len(atr)):
+            atr[i] = (atr[i - 1] * (period - 1) + values[i]) / float(period)
+        atr = pd.Series(atr, index=true_range.index, name="atr")
         
         self.indicators['ATR'] = atr
         return atr
@@ -136,18 +282,7 @@ class TechnicalAnalyzer:
         if self.data is None:
             raise ValueError("يجب جلب البيانات أولاً")
         
-        adx = ta.trend.ADXIndicator(
-            self.data['High'],
-            self.data['Low'],
-            self.data['Close'],
-            window=period
-        )
-        
-        adx_dict = {
-            'ADX': adx.adx(),
-            'ADX_Pos': adx.adx_pos(),
-            'ADX_Neg': adx.adx_neg()
-        }
+        adx_dict = self._adx(period)
         
         self.indicators.update(adx_dict)
         return adx_dict
@@ -157,15 +292,135 @@ class TechnicalAnalyzer:
         if self.data is None:
             raise ValueError("يجب جلب البيانات أولاً")
         
+        volume_sma = pd.Series(self._sma('Volume', 20), name="sma_20")
         volume_dict = {
-            'Volume_SMA': ta.trend.sma_indicator(self.data['Volume'], window=20),
+            'Volume_SMA': volume_sma,
             'OBV': ta.volume.on_balance_volume(self.data['Close'], self.data['Volume']),
-            'Volume_Ratio': self.data['Volume'] / ta.trend.sma_indicator(self.data['Volume'], window=20)
+            'Volume_Ratio': self.data['Volume'] / volume_sma
         }
         
         self.indicators.update(volume_dict)
         return volume_dict
     
+    def _adx(self, period: int) -> Dict[str, pd.Series]:
+        """نفس حساب ta.trend.ADXIndicator مع إعادة استخدام المدى الحقيقي"""
+        high = self.data['High']
+        low = self.data['Low']
+        index = self.data.index
+        window = period
+        
+        # max(high, prev_close) - min(low, prev_close) = المدى الحقيقي (والأول فارغ)
+        movement = self._true_range().to_numpy(copy=True)
+        movement[0] = np.nan
+        movement = pd.Series(movement)
+        
+        def smooth(series: pd.Series) -> np.ndarray:
+            smoothed = np.zeros(len(index) - (window - 1))
+            smoothed[0] = series.dropna().iloc[0:window].sum()
+            values = series.reset_index(drop=True)
+            for i in range(1, len(smoothed) - 1):
+                smoothed[i] = smoothed[i - 1] - (smoothed[i - 1] / float(window)) + values[window + i]
+            return smoothed
+        
+        diff_up = high - high.shift(1)
+        diff_down = low.shift(1) - low
+        pos = abs(((diff_up > diff_down) & (diff_up > 0)) * diff_up)
+        neg = abs(((diff_down > diff_up) & (diff_down > 0)) * diff_down)
+        
+        trs = smooth(movement)
+        dip = smooth(pos)
+        din = smooth(neg)
+        
+        # +DI / -DI كما تعرضها ta (تبدأ بعد النافذة بشمعة)
+        adx_pos = np.zeros(len(index))
+        adx_neg = np.zeros(len(index))
+        for i in range(1, len(trs) - 1):
+            if trs[i] != 0:
+                adx_pos[i + window] = 100 * (dip[i] / trs[i])
+                adx_neg[i + window] = 100 * (din[i] / trs[i])
+        
+        di_pos = np.zeros(len(trs))
+        di_neg = np.zeros(len(trs))
+        directional_index = np.zeros(len(trs))
+        for idx, value in enumerate(trs):
+            if value != 0:
+                di_pos[idx] = 100 * (dip[idx] / value)
+                di_neg[idx] = 100 * (din[idx] / value)
+            if di_pos[idx] + di_neg[idx] != 0:
+                directional_index[idx] = 100 * np.abs(
+                    (di_pos[idx] - di_neg[idx]) / (di_pos[idx] + di_neg[idx])
+                )
+        
+        adx = np.zeros(len(trs))
+        adx[window] = directional_index[0:window].mean()
+        for i in range(window + 1, len(adx)):
+            adx[i] = ((adx[i - 1] * (window - 1)) + directional_index[i - 1]) / float(window)
+        adx = np.concatenate((np.zeros(window - 1), adx), axis=0)
+        
+        return {
+            'ADX': pd.Series(adx, index=index, name="adx"),
+            'ADX_Pos': pd.Series(adx_pos, index=index, name="adx_pos"),
+            'ADX_Neg': pd.Series(adx_neg, index=index, name="adx_neg")
+        }
+    
+    # ==================== الحسابات الوسيطة المشتركة ====================
+    
+    def _intermediate(self, key: tuple, compute):
+        """حساب وسيط مرة واحدة لكل (نوع، عمود، فترة) ومشاركته بين المؤشرات"""
+        if key in self._intermediates:
+            self.intermediate_stats['reused'] += 1
+            return self._intermediates[key]
+        
+        self.intermediate_stats['computed'] += 1
+        value = compute()
+        self._intermediates[key] = value
+        return value
+    
+    def _sma(self, column: str, window: int) -> pd.Series:
+        series = self.data[column]
+        return self._intermediate(
+            ('sma', column, window),
+            lambda: series.rolling(window=window, min_periods=window).mean()
+        )
+    
+    def _ema(self, column: str, window: int) -> pd.Series:
+        series = self.data[column]
+        return self._intermediate(
+            ('ema', column, window),
+            lambda: series.ewm(span=window, min_periods=window, adjust=False).mean()
+        )
+    
+    def _rolling_std(self, column: str, window: int) -> pd.Series:
+        series = self.data[column]
+        return self._intermediate(
+            ('std', column, window),
+            lambda: series.rolling(window, min_periods=window).std(ddof=0)
+        )
+    
+    def _true_range(self) -> pd.Series:
+        data = self.data
+        
+        def compute():
+            prev_close = data['Close'].shift(1)
+            return pd.DataFrame(data={
+                'tr1': data['High'] - data['Low'],
+                'tr2': (data['High'] - prev_close).abs(),
+                'tr3': (data['Low'] - prev_close).abs(),
+            }).max(axis=1)
+        
+        return self._intermediate(('true_range',), compute)
+    
+    def get_intermediate_stats(self) -> Dict:
+        """إحصائيات الحسابات الوسيطة (كم مرة أعيد استخدامها بدل حسابها)"""
+        computed = self.intermediate_stats['computed']
+        reused = self.intermediate_stats['reused']
+        total = computed + reused
+        return {
+            'computed': computed,
+            'reused': reused,
+            'reuse_rate': (reused / total * 100) if total > 0 else 0,
+        }
+    
     def calculate_all_indicators(self):
         """حساب جميع المؤشرات دفعة واحدة"""
         if self.data is None:
@@ -182,11 +437,135 @@ class TechnicalAnalyzer:
         
         return self.indicators
     
-    def get_latest_values(self) -> Dict:
-        """الحصول على أحدث قيم المؤشرات"""
-        if not self.indicators:
+    def ensure_indicators(self, names: List[str] = None) -> Dict[str, pd.Series]:
+        """
+        حساب المؤشرات المطلوبة فقط عند أول طلب لها (المحسوبة مسبقاً لا يعاد حسابها)
+        :param names: أسماء مجموعات أو مفاتيح - None = كل المؤشرات المسموحة
+        :return: المؤشرات المطلوبة المتاحة
+        """
+        if self.data is None:
+            self.fetch_data()
+        
+        groups = resolve_indicator_groups(names, self.allowed_indicators)
+        
+        indicators = self.indicators
+        for group in groups:
+            if any(key not in indicators for key in INDICATOR_GROUPS[group]):
+                getattr(self, self.GROUP_CALCULATORS[group])()
+        
+        return {key: indicators[key] for group in groups for key in INDICATOR_GROUPS[group]}
+    
+    # ==================== التحديث التزايدي ====================
+    
+    def update_with_bar(self, bar, timestamp=None) -> Dict:
+        """
+        إضافة شمعة جديدة وتحديث كل المؤشرات في O(1) بدلاً من إعادة حسابها على كل التاريخ
+        الشمعة التي لها نفس وقت آخر شمعة (شمعة لم تكتمل بعد) تستبدلها
+        :param bar: الشمعة (صف من DataFrame أو قاموس) بالأعمدة Open/High/Low/Close/Volume
+        :param timestamp: وقت الشمعة (الافتراضي bar.name)
+        :return: أحدث القيم بنفس شكل get_latest_values
+        """
+        if timestamp is None:
+            timestamp = getattr(bar, 'name', None)
+        if timestamp is None:
+            raise ValueError("يجب تحديد وقت الشمعة")
+        
+        row = {col: float(bar[col]) for col in OHLCV_COLUMNS}
+        
+        if self._stream is None:
+            self._start_stream()
+        
+        timestamp = pd.Timestamp(timestamp)
+        tz = getattr(self._data.index, 'tz', None)
+        if tz is not None and timestamp.tz is None:
+            timestamp = timestamp.tz_localize(tz)
+        
+        replace = self._last_timestamp is not None and timestamp == self._last_timestamp
+        if replace:
+            # التراجع عن الشمعة السابقة (O(1)) ثم تطبيق نسختها المحدثة
+            self._stream.undo()
+        elif self._last_timestamp is not None and timestamp < self._last_timestamp:
+            raise ValueError(f"الشمعة ({timestamp}) أقدم من آخر شمعة ({self._last_timestamp})")
+        
+        values = self._stream.update(row['Open'], row['High'], row['Low'], row['Close'], row['Volume'])
+        
+        if replace and not self._pending_bars:
+            # الشمعة المستبدلة موجودة في البيانات المحفوظة
+            self._data = self._data.iloc[:-1]
+            self._intermediates = {}
+            self._indicators = {key: series.iloc[:-1] for key, series in self._indicators.items()}
+        if replace and self._pending_bars:
+            self._pending_bars[-1] = (timestamp, row, values)
+        else:
+            self._pending_bars.append((timestamp, row, values))
+        self._last_timestamp = timestamp
+        
+        return self._stream_latest()
+    
+    def _start_stream(self):
+        """بناء حالة المؤشرات من البيانات الحالية (مرة واحدة)"""
+        stream = IndicatorStream()
+        data = self._data
+        
+        if data is None or data.empty:
+            self._data = pd.DataFrame(columns=OHLCV_COLUMNS, dtype=float)
+            self._indicators = {key: pd.Series(dtype=float) for key in IndicatorStream.KEYS}
+            self._stream = stream
+            return
+        
+        if any(key not in self._indicators for key in IndicatorStream.KEYS):
             self.calculate_all_indicators()
         
+        # الحالة تحفظ ما يلزم للتراجع عن آخر شمعة إذا استبدلت لأنها لم تكتمل
+        for row in data[OHLCV_COLUMNS].to_numpy(dtype=float):
+            stream.update(*row)
+        
+        self._stream = stream
+        self._last_timestamp = data.index[-1]
+    
+    def _flush_stream(self):
+        """إلحاق الشموع المضافة تزايدياً بالبيانات وسلاسل المؤشرات"""
+        pending = getattr(self, '_pending_bars', None)
+        if not pending:
+            return
+        self._pending_bars = []
+        self._intermediates = {}
+        
+        index = pd.DatetimeIndex([timestamp for timestamp, _, _ in pending], name=self._data.index.name)
+        bars = pd.DataFrame([row for _, row, _ in pending], index=index)
+        self._data = pd.concat([self._data, bars]) if not self._data.empty else bars
+        
+        for key, series in self._indicators.items():
+            if key not in pending[0][2]:
+                continue
+            new = pd.Series([values[key] for _, _, values in pending], index=index, name=series.name)
+            self._indicators[key] = pd.concat([series, new]) if not series.empty else new
+    
+    def _stream_latest(self) -> Dict:
+        """أحدث القيم من حالة التحديث التزايدي بدون إلحاق السلاسل"""
+        timestamp, row, values = self._pending_bars[-1]
+        latest = {
+            'Symbol': self.symbol,
+            'Timestamp': timestamp,
+            'Close': row['Close'],
+            'Volume': row['Volume'],
+        }
+        allowed = self._allowed_keys()
+        for key in self._indicators:
+            if key in values and (allowed is None or key in allowed):
+                latest[key] = values[key] if not pd.isna(values[key]) else None
+        return latest
+    
+    def get_latest_values(self, names: List[str] = None) -> Dict:
+        """
+        الحصول على أحدث قيم المؤشرات
+        :param names: المؤشرات التي يجب حسابها إن لم تكن محسوبة - None = كل المؤشرات المسموحة
+        """
+        if self._pending_bars:
+            return self._stream_latest()
+        
+        self.ensure_indicators(names)
+        
         latest = {
             'Symbol': self.symbol,
             'Timestamp': self.data.index[-1],
@@ -194,15 +573,30 @@ class TechnicalAnalyzer:
             'Volume': self.data['Volume'].iloc[-1],
         }
         
+        allowed = self._allowed_keys()
         for key, value in self.indicators.items():
-            if isinstance(value, pd.Series):
+            if isinstance(value, pd.Series) and (allowed is None or key in allowed):
                 latest[key] = value.iloc[-1] if not pd.isna(value.iloc[-1]) else None
         
         return latest
     
+    def to_compact(self, dtype=np.float32) -> CompactBars:
+        """
+        نسخة مضغوطة من الشموع والمؤشرات المحسوبة (float32 بفهرس أوقات واحد)
+        :param dtype: نوع القيم (float64 للدقة الكاملة)
+        """
+        return CompactBars.from_analyzer(self, dtype=dtype)
+    
+    def _allowed_keys(self):
+        """مفاتيح المؤشرات المسموحة (None = الكل)"""
+        if self.allowed_indicators is None:
+            return None
+        return {key for group in resolve_indicator_groups(self.allowed_indicators)
+                for key in INDICATOR_GROUPS[group]}
+    
     def get_trend_analysis(self) -> Dict:
         """تحليل الاتجاه العام"""
-        latest = self.get_latest_values()
+        latest = self.get_latest_values(self.SIGNAL_INDICATORS)
         
         # تحليل الاتجاه بناءً على المتوسطات المتحركة
         price = latest['Close']
@@ -270,9 +664,33 @@ class TechnicalAnalyzer:
         }
     
     def generate_signals(self) -> Dict:
-        """توليد إشارات تداول"""
+        """
+        توليد إشارات تداول
+        بدون بيانات محملة: النتيجة من ذاكرة النتائج (الجلب والحساب عند انتهاء صلاحيتها فقط)
+        """
+        if self.data is None:
+            allowed = tuple(sorted(self.allowed_indicators)) if self.allowed_indicators is not None else None
+            
+            def compute():
+                # محلل جديد في كل مرة (إعادة الحساب في الخلفية تجلب بيانات جديدة)
+                analyzer = TechnicalAnalyzer(self.symbol, self.period, self.interval, self.use_cache,
+                                             self.allowed_indicators)
+                signals = analyzer._generate_signals()
+                return {'signals': signals, 'data': analyzer.data, 'indicators': analyzer.indicators}
+            
+            result = get_result_cache().get(
+                ('signals', self.symbol, self.period, self.interval, allowed),
+                self.symbol, self.interval, compute
+            )
+            # الشموع والمؤشرات التي حسبت منها الإشارات متاحة في المحلل كما لو جلبها بنفسه
+            self.data = result['data']
+            self.indicators = result['indicators']
+            return result['signals']
+        return self._generate_signals()
+    
+    def _generate_signals(self) -> Dict:
         analysis = self.get_trend_analysis()
-        latest = self.get_latest_values()
+        latest = self.get_latest_values(self.SIGNAL_INDICATORS)
         
         buy_signals = []
         sell_signals = []
@@ -338,14 +756,59 @@ class TechnicalAnalyzer:
         }
 
 
-def analyze_stock(symbol: str, period: str = "6mo") -> Dict:
+def fetch_bulk_data(symbols: List[str], period: str = "1y", interval: str = "1d",
+                    use_cache: bool = None, start: pd.Timestamp = None) -> Dict[str, pd.DataFrame]:
+    """
+    جلب بيانات عدة أسهم بطلبات جماعية بدلاً من طلب لكل سهم
+    :param start: جلب الشموع من وقت ثابت بدلاً من period
+    :return: قاموس {السهم: DataFrame} - الأسهم التي لا تتوفر بياناتها لا تظهر فيه
+    """
+    use_cache = config.DATA_CACHE_ENABLED if use_cache is None else use_cache
+    provider = get_provider()
+    
+    def download_many(chunk: List[str], **kwargs) -> Dict[str, pd.DataFrame]:
+        return provider.get_history_many(chunk, interval, **kwargs)
+    
+    def download() -> Dict[str, pd.DataFrame]:
+        if use_cache and provider.cacheable:
+            return get_bar_cache().get_bars_many(list(symbols), period, interval, download_many, start=start)
+        if start is not None:
+            return download_many(list(symbols), start=start)
+        return download_many(list(symbols), period=period)
+    
+    # نفس الدفعة من عدة طلبات متزامنة = تحميل واحد (نسخة من القاموس لكل طلب)
+    frames = get_single_flight().do(('history_many', tuple(symbols), period, start, interval, use_cache),
+                                    download)
+    return dict(frames)
+
+
+def analyze_stock(symbol: str, period: str = "6mo", data: pd.DataFrame = None,
+                  indicators: Dict[str, pd.Series] = None,
+                  allowed_indicators: List[str] = None, interval: str = "1d") -> Dict:
     """
     دالة سريعة لتحليل سهم
+    :param data: بيانات جاهزة (من fetch_bulk_data) لتجنب طلب منفصل
+    :param indicators: مؤشرات محسوبة مسبقاً لنفس البيانات (من compute_indicators_many)
+    :param allowed_indicators: المؤشرات المسموحة (مثلاً حسب باقة المستخدم)
+    :param interval: الفاصل الزمني للشموع المجلوبة
     """
-    analyzer = TechnicalAnalyzer(symbol, period=period)
-    analyzer.fetch_data()
-    analyzer.calculate_all_indicators()
-    return analyzer.generate_signals()
+    def analyze(data):
+        analyzer = TechnicalAnalyzer(symbol, period=period, interval=interval,
+                                     allowed_indicators=allowed_indicators)
+        if data is not None:
+            analyzer.set_data(data, indicators)
+        else:
+            analyzer.fetch_data()
+        # المؤشرات اللازمة للإشارات فقط تحسب عند الحاجة
+        return analyzer.generate_signals()
+    
+    if data is not None:
+        return analyze(data)
+    
+    # من ذاكرة النتائج - تحليل نفس السهم من عدة طلبات متزامنة = جلب وتحليل واحد
+    allowed = tuple(sorted(allowed_indicators)) if allowed_indicators is not None else None
+    return get_result_cache().get(('analyze', symbol, period, interval, allowed), symbol, interval,
+                                  lambda: analyze(None))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+"""
+🧪 اختبار واجهة نتائج التحليل
+يتحقق من الصفحات بالمؤشر والترتيب والتصفية حسب السوق وبث NDJSON في مسار /api/analysis
+"""
+
+import base64
+import json
+import analysis_snapshot
+from analysis_api import CursorError, StaleCursorError, paginate
+from analysis_snapshot import SnapshotRefresher, get_snapshot_refresher
+from market_data import ReplayProvider, get_provider, set_provider
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_cursor_pagination():
+    """اختبار أن الصفحات المتتالية تغطي كل الأسهم مرة واحدة ورفض المؤشرات غير الصالحة"""
+    print_section("اختبار الصفحات بالمؤشر")
+
+    rows = [{'symbol': f"S{n:02d}", 'score': n % 5, 'price': 10.0 + n, 'rsi': None if n == 3 else 50.0}
+            for n in range(23)]
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = paginate(rows, "score", True, 5, cursor, version="v1")
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert len(seen) == 23 and len({row['symbol'] for row in seen}) == 23
+    assert [row['score'] for row in seen] == sorted((row['score'] for row in seen), reverse=True)
+
+    # القيم المفقودة في آخر الترتيب التنازلي
+    page, _ = paginate(rows, "rsi", True, 100)
+    assert page[-1]['symbol'] == "S03"
+
+    # مؤشر من لقطة سابقة يرفض بدلاً من تكرار أو تخطي أسهم
+    _, cursor = paginate(rows, "score", True, 5, version="v1")
+    try:
+        paginate(rows, "score", True, 5, cursor, version="v2")
+        assert False, "يجب رفض المؤشر القديم"
+    except StaleCursorError:
+        pass
+
+    page, cursor = paginate(rows, "symbol", False, 2)
+    assert [row['symbol'] for row in page] == ["S00", "S01"]
+
+    def forged(payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    for bad in ("garbage", cursor, forged(["score", True, 5, None]),
+                forged(["score", True, ["x", "AAPL"], None]), forged(["score", True, [True, "x", "AAPL"], None]),
+                forged({"sort": "score"})):
+        try:
+            paginate(rows, "score", True, 2, bad)
+            assert False, "يجب رفض المؤشر"
+        except CursorError:
+            pass
+
+    print("✅ نجح")
+
+
+def test_analysis_route():
+    """اختبار /api/analysis: صفحات من اللقطة وتصفية السوق والبث"""
+    print_section("اختبار مسار /api/analysis")
+
+    frames = {symbol: make_bars(200, n) for n, symbol in enumerate(
+        ["S0", "S1", "S2", "S3", "S4", "1010.SR", "2222.SR", "7010.SR"])}
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={'1d': frames}))
+    previous_refresher = analysis_snapshot._snapshot_refresher
+    try:
+        refresher = get_snapshot_refresher()
+        analysis_snapshot._snapshot_refresher = refresher = SnapshotRefresher(
+            list(frames), interval=3600, indicator_sets=list(refresher._indicator_sets.values()))
+
+        from web_app import app
+        client = app.test_client()
+
+        symbols, cursor = [], None
+        while True:
+            query = {'limit': 3, 'market': 'us'}
+            if cursor:
+                query['cursor'] = cursor
+            data = client.get('/api/analysis', query_string=query).get_json()
+            symbols += [row['symbol'] for row in data['stocks']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        assert sorted(symbols) == ["S0", "S1", "S2", "S3", "S4"] and data['total'] == 5
+
+        assert client.get('/api/analysis', query_string={'market': 'XX'}).status_code == 400
+        assert client.get('/api/analysis', query_string={'cursor': 'bad'}).status_code == 400
+
+        # اللقطة تحدثت بين صفحتين
+        cursor = client.get('/api/analysis', query_string={'limit': 2}).get_json()['next_cursor']
+        refresher.refresh()
+        assert client.get('/api/analysis', query_string={'limit': 2, 'cursor': cursor}).status_code == 409
+
+        # البث: سطر لكل سهم من اللقطة ثم الملخص (بدون حساب جديد)
+        refreshes = refresher.refreshes
+        response = client.get('/api/analysis', query_string={'format': 'ndjson', 'market': 'SA'})
+        assert response.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        scores = [line['score'] for line in lines[:-1]]
+        assert sorted(line['symbol'] for line in lines[:-1]) == ["1010.SR", "2222.SR", "7010.SR"]
+        assert scores == sorted(scores, reverse=True)
+        assert lines[-1]['done'] and lines[-1]['count'] == 3 and refresher.refreshes == refreshes
+        refresher.stop(timeout=10)
+    finally:
+        analysis_snapshot._snapshot_refresher = previous_refresher
+        set_provider(previous)
+
+    print(f"✅ نجح | {len(symbols)} سهم أمريكي في {len(symbols) // 3 + 1} صفحات")
+
+
+if __name__ == "__main__":
+    test_cursor_pagination()
+    test_analysis_route()
@@ -0,0 +1,87 @@
+"""
+🧪 اختبار لقطة التحليل في الخلفية
+يتحقق من حساب اللقطة لكل باقة مؤشرات واستبدالها ومن أن /analyze يقرأها بدون حساب
+"""
+
+import time
+import analysis_snapshot
+from analysis_snapshot import SnapshotRefresher, get_snapshot_refresher
+from market_data import ReplayProvider, get_provider, set_provider
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_refresh_views_and_background_thread():
+    """اختبار نتائج كل باقة والتحديث في الخلفية"""
+    print_section("اختبار لقطة التحليل")
+
+    frames = {f"S{n}": make_bars(200, n) for n in range(12)}
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={'1d': frames}))
+    try:
+        refresher = SnapshotRefresher(list(frames) + ["MISSING"], interval=0.05,
+                                      indicator_sets=[None, ['RSI', 'SMA']])
+        assert refresher.get() is None
+
+        snapshot = refresher.refresh()
+        full, free = snapshot.view(), snapshot.view(['SMA', 'RSI'])
+        assert len(full['stocks']) == len(free['stocks']) == 12
+        assert "MISSING" in snapshot.errors
+        scores = [row['score'] for row in full['stocks']]
+        assert scores == sorted(scores, reverse=True)
+        assert snapshot.view(['MACD']) is None
+
+        # الخيط الخلفي يستبدل اللقطة بأخرى جديدة
+        refresher.start()
+        deadline = time.time() + 10
+        while refresher.get() is snapshot and time.time() < deadline:
+            time.sleep(0.01)
+        refresher.stop(timeout=10)
+        assert refresher.get() is not snapshot and refresher.refreshes >= 2
+        assert not refresher.is_stale()
+    finally:
+        set_provider(previous)
+
+    print(f"✅ نجح | {refresher.get_stats()}")
+
+
+def test_analyze_route_serves_snapshot():
+    """اختبار أن /analyze يقرأ اللقطة ولا يعيد الحساب لكل طلب"""
+    print_section("اختبار مسار /analyze")
+
+    frames = {f"S{n}": make_bars(200, n) for n in range(8)}
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={'1d': frames}))
+    previous_refresher = analysis_snapshot._snapshot_refresher
+    try:
+        refresher = get_snapshot_refresher()
+        analysis_snapshot._snapshot_refresher = refresher = SnapshotRefresher(
+            list(frames), interval=3600, indicator_sets=list(refresher._indicator_sets.values()))
+
+        from web_app import app
+        client = app.test_client()
+        first = client.get('/analyze')
+        assert first.status_code == 200
+        for _ in range(20):
+            response = client.get('/analyze')
+            assert response.get_json() == first.get_json()
+        data = first.get_json()
+        assert len(data['stocks']) == len(frames) and not data['stale']
+        assert refresher.refreshes == 1
+        refresher.stop(timeout=10)
+    finally:
+        analysis_snapshot._snapshot_refresher = previous_refresher
+        set_provider(previous)
+
+    print(f"✅ نجح | {len(data['stocks'])} سهم")
+
+
+if __name__ == "__main__":
+    test_refresh_views_and_background_thread()
+    test_analyze_route_serves_snapshot()
@@ -0,0 +1,106 @@
+"""
+🧪 اختبار ذاكرة نتائج الاختبار الخلفي
+يتحقق من تطابق النتائج المحفوظة والمكملة مع الحساب الكامل ومن حذف الأقدم استخداماً
+"""
+
+import os
+import shutil
+import tempfile
+import pandas as pd
+from backtest_cache import BacktestCache, anchored_start
+from market_data import ReplayProvider, get_provider, set_provider
+from trading_strategy import BreakoutStrategy, TrendFollowingStrategy, backtest_strategy
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_cache_hit_resume_and_eviction():
+    """اختبار الإصابة والإكمال بعد شموع جديدة والحذف حسب الحجم"""
+    print_section("اختبار ذاكرة النتائج")
+
+    full = make_bars(500, 5)
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = BacktestCache(cache_dir)
+        strategy = TrendFollowingStrategy()
+
+        def run(data, cache=None):
+            return backtest_strategy("AAPL", strategy, data=data, min_confidence=0, cache=cache)
+
+        first = run(full.iloc[:450], cache)
+        again = run(full.iloc[:450], cache)
+        assert first['num_trades'] > 0
+        assert first == run(full.iloc[:450])
+        assert again == first
+        assert cache.hits == 1 and cache.misses == 1
+
+        # شموع جديدة: إكمال من الحالة المحفوظة (بمركز مفتوح) بنفس نتيجة الحساب الكامل
+        extended = run(full, cache)
+        assert cache.resumed == 1
+        assert extended == run(full)
+
+        # معاملات مختلفة = مفتاح مختلف
+        backtest_strategy("AAPL", BreakoutStrategy(volume_ratio=2.0), data=full, cache=cache)
+        backtest_strategy("AAPL", BreakoutStrategy(volume_ratio=2.5), data=full, cache=cache)
+        assert cache.misses == 3
+
+        # حد صغير: يبقى الأحدث استخداماً فقط
+        entries = os.path.join(cache_dir, "entries")
+        paths = [os.path.join(entries, name) for name in os.listdir(entries)]
+        size = os.path.getsize(max(paths, key=os.path.getmtime))
+        small = BacktestCache(cache_dir, max_bytes=size)
+        small.evict()
+        assert len(os.listdir(entries)) == 1
+        backtest_strategy("AAPL", BreakoutStrategy(volume_ratio=2.5), data=full, cache=small)
+        assert small.hits == 1
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"✅ نجح | {cache.get_stats()}")
+
+
+def test_rolling_window_and_anchored_start():
+    """اختبار أن النافذة المتدحرجة لا تكمل من حالة خاطئة وأن البداية الثابتة تكمل"""
+    print_section("اختبار البداية الثابتة")
+
+    now = pd.Timestamp("2026-10-18", tz="UTC")
+    assert anchored_start("1y", now) == pd.Timestamp("2025-10-01", tz="UTC")
+    assert anchored_start("1y", now, freq="year") == pd.Timestamp("2025-01-01", tz="UTC")
+    assert anchored_start("max") is None
+
+    full = make_bars(500, 5)
+    cache_dir = tempfile.mkdtemp()
+    previous = get_provider()
+    try:
+        cache = BacktestCache(cache_dir)
+        strategy = TrendFollowingStrategy()
+
+        # يوم جديد في نافذة متدحرجة: أول شمعة تغيرت = حساب كامل بنفس نتيجة الحساب بدون ذاكرة
+        backtest_strategy("AAPL", strategy, data=full.iloc[:450], min_confidence=0, cache=cache)
+        rolled = backtest_strategy("AAPL", strategy, data=full.iloc[1:451], min_confidence=0, cache=cache)
+        assert cache.resumed == 0 and cache.misses == 2
+        assert rolled == backtest_strategy("AAPL", strategy, data=full.iloc[1:451], min_confidence=0)
+
+        # بداية ثابتة: بعد أول حساب كل يوم جديد يكمل من حالة اليوم السابق
+        start = full.index[0]
+        for bars in (460, 470, 480):
+            set_provider(ReplayProvider(frames={'1d': {"AAPL": full.iloc[:bars]}}))
+            result = backtest_strategy("AAPL", strategy, start=start, min_confidence=0, cache=cache)
+            assert result == backtest_strategy("AAPL", strategy, data=full.iloc[:bars], min_confidence=0)
+        assert cache.resumed == 2
+    finally:
+        set_provider(previous)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"✅ نجح | {cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    test_cache_hit_resume_and_eviction()
+    test_rolling_window_and_anchored_start()
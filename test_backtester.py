@@ -0,0 +1,92 @@
+"""
+🧪 اختبار محرك الاختبار الخلفي
+يتحقق من أن المحرك السريع يعطي نفس الصفقات التي تعطيها إعادة الحساب لكل شمعة
+"""
+
+import time
+from backtester import BarView
+from market_data import ReplayProvider, get_provider, set_provider
+from trading_strategy import (
+    MomentumStrategy, TrendFollowingStrategy, BreakoutStrategy,
+    MeanReversionStrategy, CompositeStrategy, backtest_strategy
+)
+from technical_analysis import TechnicalAnalyzer
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_vectorized_matches_loop():
+    """اختبار تطابق الصفقات مع الحلقة الأصلية على بيانات مسجلة"""
+    print_section("اختبار تطابق الاختبار الخلفي")
+
+    symbols = {'AAPL': make_bars(300, 0), 'MSFT': make_bars(300, 3)}
+    strategies = [MomentumStrategy(), TrendFollowingStrategy(), BreakoutStrategy(),
+                  MeanReversionStrategy(), CompositeStrategy()]
+
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={'1d': symbols}))
+    try:
+        total_trades = 0
+        for symbol in symbols:
+            for strategy in strategies:
+                expected = backtest_strategy(symbol, strategy, period="2y", vectorized=False)
+                result = backtest_strategy(symbol, strategy, period="2y")
+                assert result == expected, (symbol, strategy.name)
+                total_trades += len(result['trades'])
+    finally:
+        set_provider(previous)
+
+    assert total_trades > 0
+    print(f"✅ نجح | {total_trades} صفقة متطابقة")
+
+
+def test_signal_series_matches_generate_signal():
+    """اختبار أن إشارات كل الشموع تطابق generate_signal عند كل شمعة"""
+    print_section("اختبار سلاسل الإشارات")
+
+    analyzer = TechnicalAnalyzer("AAPL")
+    analyzer.set_data(make_bars(300, 2))
+    analyzer.calculate_all_indicators()
+    view = BarView.from_analyzer(analyzer)
+
+    for strategy in [MomentumStrategy(), TrendFollowingStrategy(), BreakoutStrategy(),
+                     MeanReversionStrategy(), CompositeStrategy()]:
+        series = strategy.signal_series(analyzer)
+        assert len(series) == len(view)
+        for i in range(0, len(view), 7):
+            view.position = i
+            signal = strategy.generate_signal(view)
+            assert series['action'].iloc[i] == signal['action'], (strategy.name, i)
+            assert series['confidence'].iloc[i] == signal['confidence'], (strategy.name, i)
+            if 'buy_votes' in signal:
+                assert series['buy_votes'].iloc[i] == signal['buy_votes']
+                assert series['sell_votes'].iloc[i] == signal['sell_votes']
+
+    counts = CompositeStrategy().signal_series(analyzer)['action'].value_counts().to_dict()
+    print(f"✅ نجح | {counts}")
+
+
+def test_multi_year_backtest():
+    """اختبار سرعة اختبار خلفي لعدة سنوات"""
+    print_section("اختبار خلفي لخمس سنوات")
+
+    bars = make_bars(1260, 5)
+    started = time.perf_counter()
+    result = backtest_strategy("AAPL", TrendFollowingStrategy(), data=bars)
+    elapsed = time.perf_counter() - started
+
+    assert result['num_trades'] > 0
+    assert elapsed < 2
+    print(f"✅ نجح | {result['num_trades']} صفقة في {elapsed * 1000:.1f} ملي ثانية")
+
+
+if __name__ == "__main__":
+    test_vectorized_matches_loop()
+    test_signal_series_matches_generate_signal()
+    test_multi_year_backtest()
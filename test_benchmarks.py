@@ -0,0 +1,56 @@
+"""
+🧪 اختبار مجموعة قياس الأداء
+يتحقق من النسب وحفظ النتائج ومقارنتها بخط الأساس وفشل التشغيل عند التراجع
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+from benchmarks import run_benchmarks, save_results, load_results, compare, main
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_benchmarks_report_and_baseline():
+    """اختبار التقرير والمقارنة بخط الأساس"""
+    print_section("اختبار قياس الأداء")
+
+    report = run_benchmarks(['backtest', 'risk_update', 'scan_market'], repeat=4, bars=300,
+                            symbols=['AAPL', 'MSFT', '2222.SR'])
+    assert set(report['results']) == {'backtest', 'risk_update', 'scan_market'}
+    for stats in report['results'].values():
+        assert 0 < stats['min_ms'] <= stats['p50_ms'] <= stats['p90_ms'] <= stats['p99_ms'] <= stats['max_ms']
+        assert stats['throughput'] > 0
+    assert report['results']['scan_market']['items'] == 3
+
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, "baseline.json")
+        save_results(report, path)
+        baseline = load_results(path)
+        assert all(not row['regression'] for row in compare(report, baseline, threshold=0.25))
+
+        # خط أساس أسرع بكثير = تراجع
+        for stats in baseline['results'].values():
+            stats['p50_ms'] /= 10
+        save_results(baseline, path)
+        assert all(row['regression'] for row in compare(report, baseline, threshold=0.25))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = main(['--only', 'backtest', '--repeat', '3', '--bars', '300', '--baseline', path])
+        assert code == 1
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print("✅ نجح")
+
+
+if __name__ == "__main__":
+    test_benchmarks_report_and_baseline()
@@ -0,0 +1,83 @@
+"""
+🧪 اختبار التخزين المضغوط للشموع والمؤشرات
+يتحقق من أن النسخة المضغوطة تحافظ على القيم والأوقات وتستهلك ذاكرة أقل
+"""
+
+import numpy as np
+import config
+from bot import TradingBot
+from compact_storage import CompactBars, pandas_memory
+from market_data import ReplayProvider, get_provider, set_provider
+from technical_analysis import TechnicalAnalyzer
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_compact_roundtrip():
+    """اختبار تطابق القيم والأوقات والعروض بدون نسخ"""
+    print_section("اختبار التخزين المضغوط")
+
+    analyzer = TechnicalAnalyzer("AAPL")
+    analyzer.set_data(make_bars(500))
+    indicators = analyzer.calculate_all_indicators()
+    compact = analyzer.to_compact()
+
+    assert compact.block.dtype == np.float32
+    assert compact.index.equals(analyzer.data.index)
+    assert str(compact.index.tz) == str(analyzer.data.index.tz)
+
+    for key, series in indicators.items():
+        restored = compact.series(key)
+        assert np.allclose(restored.to_numpy(), series.to_numpy(), rtol=1e-6, equal_nan=True), key
+        # الـ Series عرض على الكتلة وليست نسخة
+        assert np.shares_memory(restored.to_numpy(), compact.block), key
+
+    frame = compact.to_frame()
+    assert list(frame.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert np.allclose(frame['Close'].to_numpy(), analyzer.data['Close'].to_numpy(), rtol=1e-6)
+
+    latest = compact.latest()
+    expected = analyzer.get_latest_values()
+    assert latest['Timestamp'] == expected['Timestamp']
+    assert np.isclose(latest['RSI'], expected['RSI'], rtol=1e-5)
+
+    # float64 عند الحاجة للدقة الكاملة
+    exact = CompactBars.from_analyzer(analyzer, dtype=np.float64)
+    assert np.array_equal(exact.column('MACD'), indicators['MACD'].to_numpy(), equal_nan=True)
+
+    full = pandas_memory(analyzer.data, indicators)
+    assert compact.nbytes < full / 2
+    print(f"✅ نجح | مضغوط: {compact.nbytes:,} بايت | pandas: {full:,} بايت")
+
+
+def test_bot_history_memory_report():
+    """اختبار سجل التحليلات المضغوط في البوت وتقرير الذاكرة"""
+    print_section("اختبار تقرير ذاكرة البوت")
+
+    symbols = config.WATCHLIST[:3]
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={'1d': {s: make_bars(300, i) for i, s in enumerate(symbols)}}))
+    try:
+        bot = TradingBot(symbols, history="compact")
+        bot.scan_market()
+    finally:
+        set_provider(previous)
+
+    report = bot.get_memory_report()
+    assert report['count'] == len(symbols)
+    for symbol in symbols:
+        history = bot.analyses[symbol]['history']
+        assert isinstance(history, CompactBars)
+        assert report['symbols'][symbol]['total_bytes'] == history.nbytes
+    print(f"✅ نجح | متوسط الذاكرة لكل سهم: {report['avg_bytes']:,.0f} بايت")
+
+
+if __name__ == "__main__":
+    test_compact_roundtrip()
+    test_bot_history_memory_report()
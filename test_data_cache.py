@@ -0,0 +1,114 @@
+"""
+🧪 اختبار مخزن الشموع على القرص
+يتحقق من أن التحميل التزايدي يعطي نفس البيانات مع تحميل الشموع الجديدة فقط
+"""
+
+import tempfile
+import numpy as np
+import pandas as pd
+from data_cache import BarCache
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def make_bars(count):
+    """شموع يومية صناعية"""
+    index = pd.date_range('2024-01-01', periods=count, freq='D', tz='America/New_York', name='Date')
+    close = 100 + np.cumsum(np.random.default_rng(1).normal(0, 1, count))
+    return pd.DataFrame({
+        'Open': close,
+        'High': close + 1,
+        'Low': close - 1,
+        'Close': close,
+        'Volume': np.full(count, 1000.0)
+    }, index=index)
+
+
+def test_incremental_download():
+    """اختبار تحميل الشموع الجديدة فقط"""
+    print_section("اختبار التحميل التزايدي")
+
+    full = make_bars(300)
+    available = {'count': 250}
+    calls = []
+
+    def download(period=None, start=None):
+        calls.append({'period': period, 'start': start})
+        bars = full.iloc[:available['count']]
+        return bars[bars.index >= start] if start is not None else bars
+
+    cache = BarCache(tempfile.mkdtemp())
+
+    first = cache.get_bars('AAPL', 'max', '1d', download)
+    assert len(first) == 250
+    assert calls[-1]['period'] == 'max'
+
+    # وصول 5 شموع جديدة
+    available['count'] = 255
+    second = cache.get_bars('AAPL', 'max', '1d', download)
+
+    assert calls[-1]['start'] == first.index[-1]
+    assert cache.get_stats()['incremental_downloads'] == 1
+    assert cache.get_stats()['bars_downloaded'] == 250 + 6
+    assert second.index.equals(full.index[:255])
+    assert np.array_equal(second.to_numpy(), full.iloc[:255].to_numpy())
+
+    # بداية ثابتة داخل التغطية: من المخزن بدون تحميل كامل
+    anchored = cache.get_bars('AAPL', '1y', '1d', download, start=full.index[100])
+    assert anchored.index[0] == full.index[100] and cache.get_stats()['full_downloads'] == 1
+
+    # بداية ثابتة لسهم جديد: التحميل الكامل من البداية لا من period
+    cache.get_bars('MSFT', '1y', '1d', download, start=full.index[100])
+    assert calls[-1] == {'period': None, 'start': full.index[100]}
+    print("✅ نجح | تم تحميل 6 شموع فقط بدلاً من 255")
+
+
+def test_stale_symbol_naive_index_and_columns():
+    """اختبار أن السهم المتأخر لا يوسع التحميل للباقي والفهرس بدون منطقة زمنية والأعمدة الإضافية"""
+    print_section("اختبار التحميل الجماعي التزايدي")
+
+    now = pd.Timestamp.now(tz='UTC').floor('D')
+    index = pd.date_range(end=now.tz_localize(None), periods=400, freq='D', name='Date')
+    full = {
+        symbol: pd.DataFrame({'Open': 1.0 + n, 'High': 2.0 + n, 'Low': 0.5, 'Close': 1.5 + n,
+                              'Volume': 100.0, 'Dividends': 0.0, 'Stock Splits': 0.0}, index=index)
+        for n, symbol in enumerate(['AAPL', 'MSFT', 'OLD'])
+    }
+    available = {'AAPL': 390, 'MSFT': 390, 'OLD': 200}
+    calls = []
+
+    def download_many(symbols, period=None, start=None):
+        calls.append((sorted(symbols), start))
+        frames = {}
+        for symbol in symbols:
+            bars = full[symbol].iloc[:available[symbol]]
+            if start is not None:
+                bars = bars[bars.index >= start].drop(columns=['Dividends', 'Stock Splits'])
+            frames[symbol] = bars
+        return frames
+
+    cache = BarCache(tempfile.mkdtemp())
+    first = cache.get_bars_many(['AAPL', 'MSFT', 'OLD'], '2y', '1d', download_many)
+    assert list(first['AAPL'].columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    available.update(AAPL=400, MSFT=400, OLD=210)
+    second = cache.get_bars_many(['AAPL', 'MSFT', 'OLD'], '1y', '1d', download_many)
+
+    # طلب لكل يوم آخر شمعة: OLD لا يعيد تحميل 190 يوماً لـ AAPL و MSFT
+    incremental = sorted(calls[1:])
+    assert incremental == [(['AAPL', 'MSFT'], index[389]), (['OLD'], index[199])]
+    assert cache.get_stats()['bars_downloaded'] == 390 * 2 + 200 + 11 * 2 + 11
+    assert second['AAPL'].index[-1] == index[-1] and second['AAPL'].index.tz is None
+    assert list(second['OLD'].columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert not second['OLD'].isna().any().any()
+    print(f"✅ نجح | {len(calls) - 1} طلبات تزايدية")
+
+
+if __name__ == "__main__":
+    test_incremental_download()
+    test_stale_symbol_naive_index_and_columns()
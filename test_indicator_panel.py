@@ -0,0 +1,79 @@
+"""
+🧪 اختبار محرك المؤشرات المتجه
+يتحقق من أن حساب كل الأسهم دفعة واحدة يطابق TechnicalAnalyzer لكل سهم
+"""
+
+import numpy as np
+from technical_analysis import TechnicalAnalyzer, analyze_stock
+from indicator_panel import build_panels, compute_indicators_many
+from indicator_stream import IndicatorStream
+from market_data import ReplayProvider, set_provider, get_provider
+from scanner import WatchlistScanner
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def make_frames():
+    """أسهم أمريكية وسعودية بأطوال تاريخ مختلفة"""
+    symbols = ["AAPL", "MSFT", "TSLA", "2222.SR", "1120.SR"]
+    return {symbol: make_bars(60 + 70 * i, seed=i) for i, symbol in enumerate(symbols)}
+
+
+def test_panel_matches_analyzer():
+    """اختبار تطابق اللوحة مع الحساب لكل سهم على حدة"""
+    print_section("اختبار اللوحة المتجهة")
+
+    frames = make_frames()
+    panels = build_panels(frames)
+    assert sorted(panels) == ['SA', 'US']
+    assert panels['SA'].symbols == ["2222.SR", "1120.SR"]
+
+    results = compute_indicators_many(frames)
+    for symbol, data in frames.items():
+        analyzer = TechnicalAnalyzer(symbol)
+        analyzer.set_data(data)
+        expected = analyzer.calculate_all_indicators()
+
+        for key in IndicatorStream.KEYS:
+            assert results[symbol][key].index.equals(data.index), (symbol, key)
+            assert np.allclose(results[symbol][key].to_numpy(dtype=float),
+                               expected[key].to_numpy(dtype=float),
+                               rtol=1e-9, atol=1e-9, equal_nan=True), (symbol, key)
+
+    print(f"✅ نجح | {len(frames)} أسهم في {len(panels)} لوحات")
+
+
+def test_scanner_batch_indicators():
+    """اختبار الماسح مع حساب المؤشرات لكل دفعة"""
+    print_section("اختبار الماسح مع اللوحة")
+
+    frames = make_frames()
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={"1d": frames}))
+    try:
+        results = list(WatchlistScanner(max_workers=2, chunk_size=3).scan(
+            list(frames),
+            lambda symbol, data, indicators: analyze_stock(symbol, data=data, indicators=indicators),
+            period="max",
+            batch_indicators=True
+        ))
+    finally:
+        set_provider(previous)
+
+    assert all(error is None for _, _, error in results)
+    for symbol, result, _ in results:
+        expected = analyze_stock(symbol, data=frames[symbol])
+        assert result['score'] == expected['score']
+        assert result['recommendation'] == expected['recommendation']
+    print(f"✅ نجح | {len(results)} نتيجة")
+
+
+if __name__ == "__main__":
+    test_panel_matches_analyzer()
+    test_scanner_batch_indicators()
@@ -0,0 +1,100 @@
+"""
+🧪 اختبار التحديث التزايدي للمؤشرات
+يتحقق من أن update_with_bar يعطي نفس نتائج الحساب الدفعي الكامل
+"""
+
+import numpy as np
+from technical_analysis import TechnicalAnalyzer
+from indicator_stream import IndicatorStream
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def assert_same_indicators(streamed, batch):
+    for key in IndicatorStream.KEYS:
+        assert streamed[key].index.equals(batch[key].index), key
+        assert np.allclose(streamed[key].to_numpy(dtype=float), batch[key].to_numpy(dtype=float),
+                           rtol=1e-9, atol=1e-9, equal_nan=True), key
+
+
+def test_stream_matches_batch():
+    """اختبار تطابق التحديث التزايدي مع الحساب الدفعي"""
+    print_section("اختبار التحديث التزايدي")
+
+    bars = make_bars(400)
+
+    batch = TechnicalAnalyzer("AAPL")
+    batch.set_data(bars)
+    expected = batch.calculate_all_indicators()
+
+    analyzer = TechnicalAnalyzer("AAPL")
+    analyzer.set_data(bars.iloc[:250])
+    analyzer.calculate_all_indicators()
+    for timestamp, bar in bars.iloc[250:].iterrows():
+        latest = analyzer.update_with_bar(bar)
+
+    assert latest['Timestamp'] == bars.index[-1]
+    assert np.isclose(latest['RSI'], expected['RSI'].iloc[-1])
+    assert analyzer.get_latest_values() == latest
+    assert_same_indicators(analyzer.indicators, expected)
+    assert analyzer.data.index.equals(bars.index)
+    print("✅ نجح | 150 شمعة تزايدية = الحساب الكامل لـ 400 شمعة")
+
+
+def test_replace_unfinished_bar():
+    """اختبار استبدال الشمعة غير المكتملة (نفس الوقت) بدل إضافتها"""
+    print_section("اختبار استبدال الشمعة الأخيرة")
+
+    bars = make_bars(300)
+    expected = TechnicalAnalyzer("AAPL")
+    expected.set_data(bars)
+    expected.calculate_all_indicators()
+
+    # آخر شمعة في البيانات المحفوظة تتحدث عدة مرات قبل اكتمالها
+    partial = bars.copy()
+    partial.iloc[-1, partial.columns.get_loc('Close')] -= 3
+    analyzer = TechnicalAnalyzer("AAPL")
+    analyzer.set_data(partial)
+
+    tick = bars.iloc[-1].copy()
+    for close in (tick['Close'] + 1, tick['Close'] - 1, tick['Close']):
+        tick['Close'] = close
+        analyzer.update_with_bar(tick)
+
+    assert len(analyzer.data) == len(bars)
+    assert_same_indicators(analyzer.indicators, expected.indicators)
+    print("✅ نجح | تحديثات نفس الشمعة تستبدلها")
+
+
+def test_stream_undo():
+    """اختبار أن undo يعيد الحالة تماماً كما كانت قبل آخر شمعة (بما فيها النوافذ)"""
+    print_section("اختبار التراجع عن آخر شمعة")
+
+    rows = make_bars(260).to_numpy(dtype=float)
+    straight, undone = IndicatorStream(), IndicatorStream()
+    for n, row in enumerate(rows):
+        # شمعة متطرفة تخرج كل عناصر الأعلى/الأدنى ثم تستبدل (مرتين أحياناً)
+        open_, high, low, close, volume = row
+        for _ in range(1 + n % 2):
+            undone.update(open_, high * 10, low / 10, close * 2, volume * 5)
+            undone.undo()
+        expected = straight.update(*row)
+        values = undone.update(*row)
+        assert np.allclose(list(values.values()), list(expected.values()), rtol=0, atol=0, equal_nan=True), n
+
+    assert list(undone.sma[200].values) == list(straight.sma[200].values)
+    assert undone.stoch_high._items == straight.stoch_high._items
+    assert undone.bars == straight.bars and list(undone.stoch_k) == list(straight.stoch_k)
+    print(f"✅ نجح | {len(rows)} شمعة مع استبدال كل منها")
+
+
+if __name__ == "__main__":
+    test_stream_matches_batch()
+    test_replace_unfinished_bar()
+    test_stream_undo()
@@ -0,0 +1,98 @@
+"""
+🧪 اختبار الحساب الكسول للمؤشرات
+يتحقق من أن كل استراتيجية/باقة تحسب المؤشرات التي تحتاجها فقط وبنفس النتائج
+"""
+
+import numpy as np
+import ta
+from technical_analysis import TechnicalAnalyzer, analyze_stock
+from trading_strategy import BreakoutStrategy, CompositeStrategy
+from subscription_system import SubscriptionManager
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_strategy_computes_only_required():
+    """اختبار أن الاستراتيجية تحسب مؤشراتها فقط"""
+    print_section("اختبار مؤشرات الاستراتيجية")
+
+    bars = make_bars(300)
+
+    analyzer = TechnicalAnalyzer("AAPL")
+    analyzer.set_data(bars)
+    BreakoutStrategy().generate_signal(analyzer)
+    assert set(analyzer.indicators) == {'BB_High', 'BB_Mid', 'BB_Low', 'BB_Width',
+                                        'Volume_SMA', 'OBV', 'Volume_Ratio'}
+
+    # الاستراتيجية المركبة تعطي نفس الإشارة مع الحساب الكسول
+    composite = CompositeStrategy()
+    lazy = TechnicalAnalyzer("AAPL")
+    lazy.set_data(bars)
+    full = TechnicalAnalyzer("AAPL")
+    full.set_data(bars)
+    full.calculate_all_indicators()
+
+    assert composite.generate_signal(lazy) == composite.generate_signal(full)
+    assert 'ADX' not in lazy.indicators and 'Stoch_K' not in lazy.indicators
+    print(f"✅ نجح | {len(lazy.indicators)} من {len(full.indicators)} مؤشر")
+
+
+def test_free_plan_indicators():
+    """اختبار أن الباقة المجانية تحسب RSI و SMA فقط"""
+    print_section("اختبار مؤشرات الباقة المجانية")
+
+    allowed = SubscriptionManager.PLANS['free']['features']['technical_indicators']
+    analyzer = TechnicalAnalyzer("AAPL", allowed_indicators=allowed)
+    analyzer.set_data(make_bars(300))
+    result = analyzer.generate_signals()
+
+    assert set(analyzer.indicators) == {'RSI', 'SMA_20', 'SMA_50', 'SMA_200'}
+    assert result['analysis']['macd_signal'] == "محايد"
+    assert 'MACD' not in analyzer.get_latest_values()
+
+    full = analyze_stock("AAPL", data=make_bars(300))
+    assert full['analysis']['rsi_value'] == result['analysis']['rsi_value']
+    print(f"✅ نجح | التوصية: {result['recommendation']}")
+
+
+def test_shared_intermediates():
+    """اختبار أن إعادة استخدام الحسابات الوسيطة لا تغير أي قيمة"""
+    print_section("اختبار الحسابات الوسيطة المشتركة")
+
+    bars = make_bars(300)
+    analyzer = TechnicalAnalyzer("AAPL")
+    analyzer.set_data(bars)
+    indicators = analyzer.calculate_all_indicators()
+
+    high, low, close = bars['High'], bars['Low'], bars['Close']
+    bb = ta.volatility.BollingerBands(close, window=20, window_dev=2)
+    adx = ta.trend.ADXIndicator(high, low, close, window=14)
+    expected = {
+        'BB_Mid': bb.bollinger_mavg(),
+        'BB_Width': bb.bollinger_wband(),
+        'MACD_Signal': ta.trend.MACD(close).macd_signal(),
+        'ATR': ta.volatility.average_true_range(high, low, close, window=14),
+        'ADX': adx.adx(),
+        'ADX_Pos': adx.adx_pos(),
+        'Volume_Ratio': bars['Volume'] / ta.trend.sma_indicator(bars['Volume'], window=20),
+    }
+    for key, series in expected.items():
+        assert indicators[key].name == series.name, key
+        assert np.array_equal(indicators[key].to_numpy(), series.to_numpy(), equal_nan=True), key
+
+    # SMA_20 و EMA 12/26 و SMA الحجم والمدى الحقيقي تحسب مرة واحدة
+    stats = analyzer.get_intermediate_stats()
+    assert stats['reused'] == 4
+    print(f"✅ نجح | {stats}")
+
+
+if __name__ == "__main__":
+    test_strategy_computes_only_required()
+    test_free_plan_indicators()
+    test_shared_intermediates()
@@ -0,0 +1,113 @@
+"""
+🧪 اختبار مزود البيانات المسجلة (ReplayProvider)
+يتحقق من إمكانية تشغيل التحليل بالكامل بدون شبكة
+"""
+
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from market_data import ReplayProvider, set_provider, get_provider
+from quote_cache import QuoteCache
+from technical_analysis import TechnicalAnalyzer, fetch_bulk_data
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def make_bars(count, seed=0):
+    """شموع يومية صناعية"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2024-01-01', periods=count, freq='B', tz='America/New_York')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    return pd.DataFrame({
+        'Open': close,
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(1000, 5000, count).astype(float)
+    }, index=index)
+
+
+def test_replay_from_csv():
+    """اختبار قراءة الملفات المسجلة وتحليلها بدون شبكة"""
+    print_section("اختبار إعادة تشغيل ملفات CSV")
+
+    data_dir = tempfile.mkdtemp()
+    for i, symbol in enumerate(["AAPL", "MSFT"]):
+        path = ReplayProvider.fixture_path(data_dir, symbol, "1d")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        make_bars(300, seed=i).to_csv(path)
+
+    previous = get_provider()
+    set_provider(ReplayProvider(data_dir))
+    try:
+        frames = fetch_bulk_data(["AAPL", "MSFT", "NOPE"], period="6mo")
+        assert set(frames) == {"AAPL", "MSFT"}
+
+        analyzer = TechnicalAnalyzer("AAPL", period="1y")
+        analyzer.fetch_data()
+        analyzer.calculate_all_indicators()
+        latest = analyzer.get_latest_values()
+
+        assert abs(latest['Close'] - make_bars(300)['Close'].iloc[-1]) < 1e-9
+        assert get_provider().get_quote("AAPL") == latest['Close']
+        print(f"✅ نجح | RSI = {latest['RSI']:.2f} بدون أي طلب شبكة")
+    finally:
+        set_provider(previous)
+
+
+def test_replay_clock():
+    """اختبار الساعة الافتراضية - لا تظهر الشموع المستقبلية"""
+    print_section("اختبار الساعة الافتراضية")
+
+    bars = make_bars(100)
+    start = bars.index[49]
+    provider = ReplayProvider(frames={"1d": {"AAPL": bars}}, speed=0.0, start=start)
+
+    assert len(provider.get_history("AAPL", "1d")) == 50
+    assert provider.get_quote("AAPL") == bars['Close'].iloc[49]
+    print("✅ نجح | يتم عرض الشموع حتى الوقت الافتراضي فقط")
+
+
+def test_quote_cache_coalescing():
+    """اختبار أن الطلبات المتزامنة لنفس السهم تكلف طلباً واحداً"""
+    print_section("اختبار ذاكرة الأسعار")
+
+    class SlowProvider(ReplayProvider):
+        calls = 0
+
+        def get_quote(self, symbol):
+            SlowProvider.calls += 1
+            time.sleep(0.05)
+            return super().get_quote(symbol)
+
+    previous = get_provider()
+    set_provider(SlowProvider(frames={"1d": {"AAPL": make_bars(10)}}))
+    try:
+        cache = QuoteCache(ttl=60)
+        threads = [threading.Thread(target=cache.get, args=("AAPL",)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        cache.get("AAPL")
+    finally:
+        set_provider(previous)
+
+    stats = cache.get_stats()
+    assert SlowProvider.calls == 1
+    assert stats['misses'] == 1 and stats['hits'] + stats['coalesced'] == 10
+    print(f"✅ نجح | 11 طلب = طلب واحد للمزود ({stats})")
+
+
+if __name__ == "__main__":
+    test_replay_from_csv()
+    test_replay_clock()
+    test_quote_cache_coalescing()
@@ -0,0 +1,93 @@
+"""
+🧪 اختبار قياس زمن المراحل
+يتحقق من المدرج التكراري وملخص المسح ونص Prometheus في مسار /metrics
+"""
+
+import contextlib
+import io
+from bot import TradingBot
+from market_data import ReplayProvider, get_provider, set_provider
+from metrics import Metrics, get_metrics
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_histogram_and_prometheus():
+    """اختبار العدادات والحدود والأخطاء والتعطيل"""
+    print_section("اختبار المدرج التكراري")
+
+    metrics = Metrics(enabled=True, buckets=(0.01, 0.1))
+    metrics.observe("fetch", 0.005)
+    metrics.observe("fetch", 0.05)
+    metrics.observe("strategy", 0.5, symbol="AAPL")
+    before = metrics.snapshot()
+    try:
+        with metrics.timer("strategy", "AAPL"):
+            raise ValueError("فشل")
+    except ValueError:
+        pass
+
+    text = metrics.render_prometheus()
+    assert 'trading_stage_seconds_bucket{stage="fetch",symbol="",le="0.01"} 1' in text
+    assert 'trading_stage_seconds_bucket{stage="fetch",symbol="",le="0.1"} 2' in text
+    assert 'trading_stage_seconds_bucket{stage="fetch",symbol="",le="+Inf"} 2' in text
+    assert 'trading_stage_seconds_count{stage="strategy",symbol="AAPL"} 2' in text
+    assert 'trading_stage_errors_total{stage="strategy",symbol="AAPL"} 1' in text
+
+    # الملخص منذ snapshot يحتوي آخر استدعاء فقط
+    rows = metrics.summary(before)
+    assert [(row['stage'], row['calls'], row['errors']) for row in rows] == [("strategy", 1, 1)]
+
+    disabled = Metrics(enabled=False)
+    with disabled.timer("fetch"):
+        pass
+    disabled.observe("fetch", 1.0)
+    assert disabled.snapshot() == {} and disabled.summary() == []
+
+    print("✅ نجح")
+
+
+def test_bot_cycle_stages_and_endpoint():
+    """اختبار تسجيل مراحل دورة البوت وظهورها في /metrics"""
+    print_section("اختبار مراحل دورة البوت")
+
+    frames = {f"S{n}": make_bars(260, n) for n in range(6)}
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={'1d': frames}))
+    metrics = get_metrics()
+    try:
+        before = metrics.snapshot()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            TradingBot(list(frames)).run_once()
+
+        stages = {row['stage']: row for row in metrics.summary(before)}
+        assert {'fetch', 'indicators', 'strategy', 'print'} <= set(stages)
+        assert stages['strategy']['calls'] == len(frames)
+        # المؤشرات الناقصة تحسب في مرحلة المؤشرات لكل سهم قبل الاستراتيجية
+        assert stages['indicators']['calls'] > len(frames)
+        assert "زمن مراحل المسح" in output.getvalue()
+    finally:
+        set_provider(previous)
+
+    from web_app import app
+    response = app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'trading_stage_seconds_count{stage="strategy",symbol="S0"}' in text
+    assert 'trading_stage_seconds_count{stage="indicators",symbol="S0"}' in text
+    assert '# TYPE trading_single_flight_coalesced_total counter' in text
+
+    print(f"✅ نجح | {', '.join(sorted(stages))}")
+
+
+if __name__ == "__main__":
+    test_histogram_and_prometheus()
+    test_bot_cycle_stages_and_endpoint()
@@ -0,0 +1,67 @@
+"""
+🧪 اختبار البحث عن أفضل معاملات الاستراتيجيات
+يتحقق من أن البحث المتوازي يطابق الاختبار الخلفي العادي لنفس المعاملات
+"""
+
+import numpy as np
+from compact_storage import SharedBars
+from param_sweep import ParameterSweep, grid_space, random_space, prepare_bars
+from trading_strategy import MomentumStrategy, backtest_strategy
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_sweep_matches_backtest():
+    """اختبار تطابق نتائج البحث المتوازي مع backtest_strategy"""
+    print_section("اختبار البحث المتوازي")
+
+    frames = {'AAPL': make_bars(400, 0), 'MSFT': make_bars(400, 1), 'GOOGL': make_bars(400, 2)}
+    space = {'rsi_oversold': [30, 40], 'rsi_overbought': [60, 70], 'min_confidence': [60, 75]}
+
+    parallel = ParameterSweep('momentum', space, max_workers=2).run(frames=frames)
+    serial = ParameterSweep('momentum', space, max_workers=1).run(frames=frames)
+    assert parallel.equals(serial)
+    assert len(parallel) == 8
+    assert list(parallel['total_return']) == sorted(parallel['total_return'], reverse=True)
+
+    best = parallel.iloc[0]
+    strategy = MomentumStrategy(rsi_oversold=best['rsi_oversold'], rsi_overbought=best['rsi_overbought'])
+    results = [backtest_strategy(symbol, strategy, data=data, min_confidence=best['min_confidence'])
+               for symbol, data in frames.items()]
+    assert best['total_return'] == np.mean([r['total_return'] for r in results])
+    assert best['num_trades'] == sum(r['num_trades'] for r in results)
+    assert 0 <= best['max_drawdown'] < 100
+    print(f"✅ نجح\n{parallel.head(3).to_string()}")
+
+
+def test_shared_bars_and_spaces():
+    """اختبار الذاكرة المشتركة وفضاءات البحث"""
+    print_section("اختبار الذاكرة المشتركة")
+
+    items = prepare_bars({'AAPL': make_bars(200, 4)}, ['RSI'])
+    shared = SharedBars.create(items)
+    try:
+        attached = SharedBars.attach(shared.name, shared.layout)
+        bars = attached.get('AAPL')
+        assert np.array_equal(bars.column('RSI'), items['AAPL'].column('RSI'), equal_nan=True)
+        assert bars.index.equals(items['AAPL'].index)
+        del bars
+        attached.close()
+    finally:
+        shared.close()
+
+    assert len(grid_space({'a': [1, 2, 3], 'b': [4, 5]})) == 6
+    samples = random_space({'a': (10, 40), 'b': [1.5, 2.0]}, 5, seed=1)
+    assert len(samples) == 5 and all(10 <= s['a'] <= 40 and isinstance(s['a'], int) for s in samples)
+    print("✅ نجح")
+
+
+if __name__ == "__main__":
+    test_sweep_matches_backtest()
+    test_shared_bars_and_spaces()
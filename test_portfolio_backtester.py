@@ -0,0 +1,108 @@
+"""
+🧪 اختبار الاختبار الخلفي للمحفظة
+يتحقق من الساعة الافتراضية وحدود المخاطر المشتركة وسرعة تشغيل قائمة مراقبة كاملة
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from clock import SimulatedClock
+from portfolio_backtester import PortfolioBacktester
+from risk_management import RiskManager
+from trading_strategy import BreakoutStrategy
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_simulated_clock_in_risk_manager():
+    """اختبار تسجيل الصفقات والعدادات اليومية بالوقت الافتراضي"""
+    print_section("اختبار الساعة الافتراضية")
+
+    clock = SimulatedClock('2024-03-01 10:00')
+    rm = RiskManager(10000, max_portfolio_risk=0.01, clock=clock, verbose=False)
+    assert rm.open_position('AAPL', 10, 100.0, stop_loss=95.0)
+    clock.set('2024-03-01 15:00')
+    assert rm.close_position('AAPL', 80.0)
+    assert rm.trade_history[0]['timestamp'] == pd.Timestamp('2024-03-01 10:00')
+    assert rm.trade_history[1]['holding_time'] == 5
+    assert not rm.can_trade()  # تجاوز الخسارة اليومية
+
+    clock.set('2024-03-04 10:00')
+    assert rm.can_trade() and rm.daily_loss == 0
+    print("✅ نجح")
+
+
+def test_portfolio_backtest():
+    """اختبار حدود المراكز وترتيب الأحداث والسرعة"""
+    print_section("اختبار المحفظة")
+
+    frames = {f"S{n}": make_bars(1260, n) for n in range(80)}
+    start = time.perf_counter()
+    backtester = PortfolioBacktester(BreakoutStrategy(), initial_capital=100000, min_confidence=60,
+                                     close_at_end=False)
+    result = backtester.run(frames=frames)
+    elapsed = time.perf_counter() - start
+
+    trades = result['trades']
+    assert result['batches'] == 1260 and len(result['equity']) == 1260
+    assert trades['timestamp'].is_monotonic_increasing
+    assert trades['timestamp'].min() >= result['equity'].index[backtester.warmup]
+    assert trades['timestamp'].max() <= result['equity'].index[-1]
+
+    # المراكز المفتوحة لا تتجاوز الحد في أي وقت
+    opened = trades['action'].map({'OPEN': 1, 'CLOSE': -1}).cumsum()
+    assert len(trades) > 0 and opened.max() <= backtester.risk_manager.max_positions
+
+    summary = result['summary']
+    assert summary['total_value'] == result['equity'].iloc[-1]
+    assert elapsed < 30
+    print(f"✅ نجح | {result['symbols']} سهم × {result['batches']} شمعة في {elapsed:.2f} ثانية | "
+          f"الصفقات: {summary['total_trades']} | العائد: {summary['total_return']:.2f}%")
+
+
+class ScriptedStrategy:
+    """استراتيجية بإشارات محددة مسبقاً: {(السهم، رقم الشمعة): الإجراء}"""
+    required_indicators = []
+
+    def __init__(self, script):
+        self.script = script
+
+    def signal_series(self, analyzer):
+        actions = [self.script.get((analyzer.symbol, i), 'HOLD') for i in range(len(analyzer.data))]
+        confidence = [0.0 if action == 'HOLD' else 100.0 for action in actions]
+        return pd.DataFrame({'action': actions, 'confidence': confidence}, index=analyzer.data.index)
+
+
+def test_daily_loss_resets_between_days():
+    """اختبار أن الخسارة اليومية لا توقف التداول في الأيام التالية من البيانات"""
+    print_section("اختبار الخسارة اليومية في الاختبار الخلفي")
+
+    index = pd.date_range('2024-01-01', periods=30, freq='B')
+
+    def frame(closes):
+        close = np.asarray(closes, dtype=float)
+        return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+                             'Close': close, 'Volume': 1e6}, index=index)
+
+    # خسارة كبيرة في يوم ثم إشارة شراء لسهم آخر بعد أسبوعين
+    losing = [100.0] * 11 + [60.0] * 19
+    strategy = ScriptedStrategy({('A', 10): 'BUY', ('A', 11): 'SELL', ('B', 20): 'BUY'})
+    backtester = PortfolioBacktester(strategy, warmup=5, close_at_end=False)
+    result = backtester.run(frames={'A': frame(losing), 'B': frame([50.0] * 30)})
+
+    trades = result['trades']
+    assert list(zip(trades['symbol'], trades['action'])) == [('A', 'OPEN'), ('A', 'CLOSE'), ('B', 'OPEN')]
+    assert backtester.risk_manager.last_reset_date == index[20].date()
+    print(f"✅ نجح | {len(trades)} صفقات")
+
+
+if __name__ == "__main__":
+    test_simulated_clock_in_risk_manager()
+    test_portfolio_backtest()
+    test_daily_loss_resets_between_days()
@@ -0,0 +1,130 @@
+"""
+🧪 اختبار بث تغييرات المحفظة
+يتحقق من أن المنتج يبني الحالة مرة واحدة لكل المشتركين ويرسل الفروق فقط
+"""
+
+import json
+from portfolio_stream import PortfolioStream, _Subscriber, portfolio_delta
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def parse(message):
+    """(الحدث، البيانات) من رسالة SSE"""
+    fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return fields['event'], json.loads(fields['data'])
+
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(parse(subscriber.queue.get_nowait()))
+    return messages
+
+
+def test_delta_and_fan_out():
+    """اختبار الفروق والتوزيع وإعادة إرسال الحالة للمتأخر"""
+    print_section("اختبار بث المحفظة")
+
+    position = {'symbol': 'AAPL', 'current_price': 100.0, 'profit': 0.0}
+    state = {'active': True, 'available_capital': 1000.0, 'positions': [dict(position)]}
+    stream = PortfolioStream(lambda: json.loads(json.dumps(state)), heartbeat=0.01, queue_size=3,
+                             max_subscribers=100)
+
+    # مشتركون بدون تشغيل خيط المنتج (الخطوات تنفذ هنا بـ poll)
+    viewers = [_Subscriber(3) for _ in range(50)]
+    stream._subscribers.extend(viewers)
+
+    assert parse(stream.poll())[0] == 'snapshot'
+    # بدون تغيير: لا رسالة
+    assert stream.poll() is None and stream.poll() is None
+
+    state['positions'][0]['current_price'] = 101.0
+    event, delta = parse(stream.poll())
+    assert event == 'delta' and delta['set'] == {} and delta['remove'] == []
+    assert delta['upsert'] == [dict(position, current_price=101.0)]
+
+    state['positions'] = []
+    state['available_capital'] = 1100.0
+    event, delta = parse(stream.poll())
+    assert delta == {'set': {'available_capital': 1100.0}, 'upsert': [], 'remove': ['AAPL']}
+
+    # عمل المنتج لا يتضاعف بعدد المشتركين
+    assert stream.builds == 5 and stream.published == 3
+    assert all(len(drain(viewer)) == 3 for viewer in viewers[1:])
+
+    # مشترك لا يقرأ: قائمته تستبدل بالحالة كاملة عند امتلائها
+    state['available_capital'] = 2000.0
+    stream.poll()
+    assert drain(viewers[0]) == [('snapshot', state)] and stream.resyncs == 1
+    assert portfolio_delta(state, json.loads(json.dumps(state))) is None
+
+    # مشترك جديد يستلم الحالة كاملة
+    late = stream.subscribe()
+    assert parse(late.queue.get(timeout=5)) == ('snapshot', state)
+    stream.stop(timeout=5)
+
+    print(f"✅ نجح | {stream.get_stats()}")
+
+
+def test_notify_wakes_producer():
+    """اختبار أن notify يرسل التغيير فوراً بدون انتظار الفاصل"""
+    print_section("اختبار الإيقاظ الفوري")
+
+    state = {'active': False, 'positions': []}
+    stream = PortfolioStream(lambda: json.loads(json.dumps(state)), interval=60, heartbeat=60)
+    viewer = stream.subscribe()
+    try:
+        assert parse(viewer.queue.get(timeout=5))[0] == 'snapshot'
+        for n in range(20):
+            state['available_capital'] = float(n)
+            stream.notify()
+            event, delta = parse(viewer.queue.get(timeout=5))
+            assert event == 'delta' and delta['set'] == {'available_capital': float(n)}
+    finally:
+        stream.stop(timeout=5)
+
+    print("✅ نجح")
+
+
+def test_stream_route():
+    """اختبار مسار /api/portfolio/stream"""
+    print_section("اختبار مسار البث")
+
+    from web_app import app, portfolio_stream
+    response = app.test_client().get('/api/portfolio/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    message = next(chunk for chunk in chunks if not chunk.startswith(b":"))
+    event, data = parse(message.decode())
+    assert event == 'snapshot' and data['active'] is False
+    assert portfolio_stream.subscribers == 1
+    response.close()
+    assert portfolio_stream.subscribers == 0
+
+    # امتلاء الاتصالات: 503 والمتصفح يعود للاستعلام الدوري
+    previous = portfolio_stream.max_subscribers
+    portfolio_stream.max_subscribers = 1
+    try:
+        client = app.test_client()
+        first = client.get('/api/portfolio/stream', buffered=False)
+        rejected = client.get('/api/portfolio/stream', buffered=False)
+        assert rejected.status_code == 503 and rejected.get_json()['fallback'] == '/api/portfolio'
+        assert portfolio_stream.subscribers == 1 and portfolio_stream.rejected >= 1
+        first.close()
+        assert portfolio_stream.subscribers == 0
+    finally:
+        portfolio_stream.max_subscribers = previous
+
+    print("✅ نجح")
+
+
+if __name__ == "__main__":
+    test_delta_and_fan_out()
+    test_notify_wakes_producer()
+    test_stream_route()
@@ -0,0 +1,143 @@
+"""
+🧪 اختبار ذاكرة نتائج التحليل
+يتحقق من صلاحية النتائج حسب جلسات السوق وإعادة النتيجة القديمة مع إعادة حسابها في الخلفية
+"""
+
+import pandas as pd
+from clock import SimulatedClock
+from market_data import ReplayProvider, get_provider, set_provider
+from result_cache import ResultCache, fresh_until, get_result_cache
+from technical_analysis import TechnicalAnalyzer, analyze_stock
+from trading_strategy import CompositeStrategy
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_fresh_until_sessions():
+    """اختبار الصلاحية: اليومية حتى افتتاح الجلسة القادمة واللحظية مدة ثابتة"""
+    print_section("اختبار صلاحية النتائج")
+
+    # الجمعة بعد الإغلاق في نيويورك = حتى افتتاح الاثنين
+    friday = pd.Timestamp("2026-10-16 17:00", tz="America/New_York")
+    assert fresh_until("AAPL", "1d", friday, 60) == pd.Timestamp("2026-10-19 09:30", tz="America/New_York")
+
+    # الخميس بعد الإغلاق في تداول = حتى افتتاح الأحد
+    thursday = pd.Timestamp("2026-10-15 16:00", tz="Asia/Riyadh")
+    assert fresh_until("2222.SR", "1d", thursday, 60) == pd.Timestamp("2026-10-18 10:00", tz="Asia/Riyadh")
+
+    # أثناء الجلسة الشمعة اليومية تتغير = مثل اللحظية
+    session = pd.Timestamp("2026-10-15 11:00", tz="America/New_York")
+    assert fresh_until("AAPL", "1d", session, 60) == session + pd.Timedelta(seconds=60)
+    assert fresh_until("AAPL", "5m", friday, 60) == friday + pd.Timedelta(seconds=60)
+
+    print("✅ نجح")
+
+
+def test_stale_while_revalidate():
+    """اختبار النتيجة القديمة الفورية وإعادة الحساب في الخلفية والحساب المباشر بعد حد القدم"""
+    print_section("اختبار Stale-While-Revalidate")
+
+    clock = SimulatedClock(pd.Timestamp("2026-10-15 11:00", tz="America/New_York"))
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={'5m': {}}, clock=clock))
+    cache = ResultCache(max_stale=600, intraday_ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(len(calls) + 1)
+        return calls[-1]
+
+    def get():
+        return cache.get(('signals', 'AAPL'), 'AAPL', '5m', compute)
+
+    try:
+        assert get() == 1
+        clock.advance(30)
+        assert get() == 1 and calls == [1]
+
+        # منتهية: القديمة فوراً والجديدة بعد إعادة الحساب
+        clock.advance(60)
+        assert get() == 1
+        cache.wait_refreshes()
+        assert calls == [1, 2] and get() == 2
+
+        # فشل إعادة الحساب يبقي النتيجة القديمة
+        clock.advance(120)
+
+        def failing():
+            raise ValueError("فشل")
+
+        assert cache.get(('signals', 'AAPL'), 'AAPL', '5m', failing) == 2
+        cache.wait_refreshes()
+
+        # بعد حد القدم: حساب مباشر
+        clock.advance(3600)
+        assert get() == 3
+
+        stats = cache.get_stats()
+        assert (stats['hits'], stats['stale_hits'], stats['misses']) == (2, 2, 2)
+        assert stats['refreshes'] == 1 and stats['refresh_errors'] == 1
+
+        # مزود جديد = نتائج جديدة
+        set_provider(ReplayProvider(frames={'5m': {}}, clock=clock))
+        assert get() == 4
+    finally:
+        set_provider(previous)
+
+    print(f"✅ نجح | {stats}")
+
+
+def test_analysis_served_from_cache():
+    """اختبار أن تكرار التحليل لا يعيد الجلب"""
+    print_section("اختبار تحليل من الذاكرة")
+
+    class CountingProvider(ReplayProvider):
+        calls = 0
+
+        def get_history(self, symbol, interval="1d", period=None, start=None):
+            CountingProvider.calls += 1
+            return super().get_history(symbol, interval, period=period, start=start)
+
+    previous = get_provider()
+    set_provider(CountingProvider(frames={"1d": {"AAPL": make_bars(260)}, "1h": {"AAPL": make_bars(260)}}))
+    try:
+        first = analyze_stock("AAPL")
+        # تعديل النتيجة عند أحد الطلبات لا يصل للطلبات الأخرى
+        first['buy_signals'].append("تعديل")
+        first['score'] = None
+        second = analyze_stock("AAPL")
+        assert second['score'] is not None and "تعديل" not in second['buy_signals']
+        assert CountingProvider.calls == 1
+
+        strategy = CompositeStrategy()
+        detailed = strategy.get_detailed_analysis("AAPL")
+        assert CompositeStrategy().get_detailed_analysis("AAPL") == detailed
+        assert CountingProvider.calls == 2
+
+        # الإشارات من الذاكرة تترك الشموع والمؤشرات في المحلل كما لو جلبها بنفسه
+        for _ in range(2):
+            analyzer = TechnicalAnalyzer("AAPL", period="6mo")
+            signals = analyzer.generate_signals()
+            assert not analyzer.data.empty and 'RSI' in analyzer.indicators
+            assert signals['analysis']['rsi_value'] == analyzer.get_latest_values()['RSI']
+        assert CountingProvider.calls == 3
+
+        # الفاصل الزمني جزء من المفتاح
+        analyze_stock("AAPL", interval="1h")
+        assert CountingProvider.calls == 4
+    finally:
+        set_provider(previous)
+
+    print(f"✅ نجح | {get_result_cache().get_stats()}")
+
+
+if __name__ == "__main__":
+    test_fresh_until_sessions()
+    test_stale_while_revalidate()
+    test_analysis_served_from_cache()
@@ -0,0 +1,63 @@
+"""
+🧪 اختبار الماسح المتوازي ومحدد المعدل
+"""
+
+import time
+from market_data import ReplayProvider, set_provider, get_provider
+from rate_limiter import TokenBucket
+from scanner import WatchlistScanner
+from technical_analysis import analyze_stock
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_token_bucket():
+    """اختبار أن المحدد يلتزم بالمعدل بعد استهلاك الدفعة الأولية"""
+    print_section("اختبار محدد المعدل")
+
+    bucket = TokenBucket(rate=100, burst=5)
+    started = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    elapsed = time.monotonic() - started
+
+    # 5 فورية + 10 بمعدل 100/ثانية = 0.1 ثانية تقريباً
+    assert elapsed >= 0.09
+    assert not bucket.try_acquire(5)
+    print(f"✅ نجح | 15 طلب في {elapsed:.3f} ثانية")
+
+
+def test_scan_all_symbols():
+    """اختبار أن الماسح يعيد نتيجة لكل سهم (بما فيها الأخطاء)"""
+    print_section("اختبار الماسح المتوازي")
+
+    symbols = [f"SYM{i}" for i in range(12)]
+    frames = {symbol: make_bars(150, seed=i) for i, symbol in enumerate(symbols)}
+
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={"1d": frames}))
+    try:
+        scanner = WatchlistScanner(max_workers=4, chunk_size=5)
+        results = list(scanner.scan(
+            symbols + ["NOPE"],
+            lambda symbol, data: analyze_stock(symbol, data=data),
+            period="6mo"
+        ))
+    finally:
+        set_provider(previous)
+
+    assert sorted(r[0] for r in results) == sorted(symbols + ["NOPE"])
+    errors = [symbol for symbol, _, error in results if error]
+    assert errors == ["NOPE"]
+    print(f"✅ نجح | {len(results)} نتيجة")
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_scan_all_symbols()
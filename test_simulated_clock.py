@@ -0,0 +1,58 @@
+"""
+🧪 اختبار إعادة تشغيل البوت بساعة افتراضية
+أسبوع تداول كامل من البيانات المسجلة يعاد في ثوانٍ بنفس منطق البوت
+"""
+
+import time
+import pandas as pd
+from auto_trading_bot import AutoTradingBot
+from clock import SimulatedClock
+from market_data import ReplayProvider, get_provider, set_provider
+from quote_cache import get_quote
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_replay_week_with_simulated_clock():
+    """اختبار تقدم الساعة مع البيانات وتسجيل الصفقات بالوقت الافتراضي"""
+    print_section("اختبار أسبوع بساعة افتراضية")
+
+    frames = {f"S{n}": make_bars(260, n) for n in range(30)}
+    start = pd.Timestamp('2024-08-05', tz='America/New_York')
+    clock = SimulatedClock()
+    previous = get_provider()
+    set_provider(ReplayProvider(frames={'1d': frames}, start=start, clock=clock))
+    try:
+        assert clock.now() == start
+        assert get_quote('S0') == frames['S0']['Close'].loc[start]
+
+        bot = AutoTradingBot(initial_capital=100000, clock=clock)
+        bot.watchlist = list(frames)
+
+        began = time.perf_counter()
+        bot.run_continuous(interval_minutes=6 * 60, max_scans=29, close_on_exit=True)
+        elapsed = time.perf_counter() - began
+
+        # 28 انتظاراً × 6 ساعات = أسبوع
+        assert pd.Timestamp(clock.now()) - start == pd.Timedelta(days=7)
+        # السعر الحالي يتبع الساعة (بدون سعر قديم من الذاكرة)
+        assert get_quote('S0') == frames['S0']['Close'].loc[:clock.now()].iloc[-1]
+
+        history = bot.risk_manager.trade_history
+        assert history and all(start <= t['timestamp'] <= clock.now() for t in history)
+        assert not bot.risk_manager.positions
+        assert elapsed < 30
+    finally:
+        set_provider(previous)
+
+    print(f"✅ نجح | {len(history)} عملية في {elapsed:.2f} ثانية")
+
+
+if __name__ == "__main__":
+    test_replay_week_with_simulated_clock()
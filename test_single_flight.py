@@ -0,0 +1,108 @@
+"""
+🧪 اختبار دمج الطلبات المتزامنة
+يتحقق من أن الطلبات المتزامنة بنفس المفتاح تنفذ مرة واحدة وتتشارك النتيجة أو الخطأ
+"""
+
+import threading
+import time
+from market_data import ReplayProvider, get_provider, set_provider
+from single_flight import SingleFlight, get_single_flight
+from technical_analysis import analyze_stock
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def run_together(count, target):
+    """تشغيل target من عدة خيوط في نفس اللحظة وإرجاع نتائجها"""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(n):
+        barrier.wait()
+        try:
+            results[n] = target()
+        except Exception as e:
+            results[n] = e
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_single_flight_shares_result_and_error():
+    """اختبار النتيجة المشتركة والخطأ المشترك والمفاتيح المستقلة"""
+    print_section("اختبار دمج الطلبات")
+
+    flight = SingleFlight()
+    calls = []
+
+    def slow(value):
+        def work():
+            calls.append(value)
+            time.sleep(0.1)
+            if value == "boom":
+                raise ValueError(value)
+            return {'value': value}
+        return work
+
+    results = run_together(20, lambda: flight.do(('history', 'AAPL', '6mo', '1d'), slow("AAPL")))
+    assert calls == ["AAPL"]
+    assert all(result is results[0] for result in results)
+
+    errors = run_together(5, lambda: flight.do(('history', 'BAD', '6mo', '1d'), slow("boom")))
+    assert all(isinstance(error, ValueError) for error in errors)
+
+    # بعد انتهاء العملية ينفذ الطلب التالي من جديد
+    flight.do(('history', 'AAPL', '6mo', '1d'), slow("AAPL"))
+    assert calls == ["AAPL", "boom", "AAPL"] and flight.in_flight() == 0
+
+    stats = flight.get_stats()['history']
+    assert stats['executed'] == 3 and stats['coalesced'] == 23 and stats['errors'] == 1
+
+    print(f"✅ نجح | {stats}")
+
+
+def test_concurrent_analyze_stock():
+    """اختبار أن تحليل نفس السهم من عدة طلبات متزامنة يجلب البيانات مرة واحدة"""
+    print_section("اختبار تحليل متزامن")
+
+    class SlowProvider(ReplayProvider):
+        calls = 0
+
+        def get_history(self, symbol, interval="1d", period=None, start=None):
+            SlowProvider.calls += 1
+            time.sleep(0.1)
+            return super().get_history(symbol, interval, period=period, start=start)
+
+    previous = get_provider()
+    set_provider(SlowProvider(frames={"1d": {"AAPL": make_bars(200), "MSFT": make_bars(200, 1)}}))
+    before = get_single_flight().get_stats().get('analyze', {}).get('coalesced', 0)
+    try:
+        results = run_together(12, lambda: analyze_stock("AAPL"))
+        assert SlowProvider.calls == 1
+        # نفس النتيجة لكل الطلبات في نسخ مستقلة (من ذاكرة النتائج)
+        assert all(result == results[0] and result is not results[0] for result in results[1:])
+
+        # باقات مختلفة = تحليل منفصل لكل باقة
+        run_together(6, lambda: analyze_stock("MSFT", allowed_indicators=['RSI', 'SMA']))
+        assert SlowProvider.calls == 2
+    finally:
+        set_provider(previous)
+
+    coalesced = get_single_flight().get_stats()['analyze']['coalesced'] - before
+    assert coalesced == 16
+    print(f"✅ نجح | 18 طلب = 2 تحميل ({coalesced} مدمج)")
+
+
+if __name__ == "__main__":
+    test_single_flight_shares_result_and_error()
+    test_concurrent_analyze_stock()
@@ -0,0 +1,84 @@
+"""
+🧪 اختبار مولد الشموع الصناعية
+يتحقق من التقويمات وأوقات الجلسات وصحة الشموع وثبات الناتج وكتابتها بتنسيق ReplayProvider
+"""
+
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from market_data import ReplayProvider
+from synthetic_data import SyntheticMarket, synthetic_symbols, write_fixtures
+from technical_analysis import TechnicalAnalyzer
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+def test_calendars_and_bars():
+    """اختبار أيام التداول وأوقات الشموع وحدود High/Low وثبات الناتج"""
+    print_section("اختبار التقويمات والشموع")
+
+    us, sa = synthetic_symbols(2)
+    assert (us, sa) == ("SYN0000", "SYN0001.SR")
+
+    daily = SyntheticMarket(sa).generate(end='2024-12-31', sessions=300)
+    assert len(daily) == 300 and daily.index.name == 'Date'
+    # تداول السعودية من الأحد إلى الخميس
+    assert not daily.index.dayofweek.isin([4, 5]).any()
+
+    intraday = SyntheticMarket(us).generate(end='2024-12-31', interval='5m', sessions=20)
+    local = intraday.index.tz_convert('America/New_York')
+    assert len(intraday) == 20 * 78 and not local.dayofweek.isin([5, 6]).any()
+    minutes = local.hour * 60 + local.minute
+    assert minutes.min() == 9 * 60 + 30 and minutes.max() == 16 * 60 - 5
+
+    for data in (daily, intraday):
+        assert (data['High'] >= data[['Open', 'Close']].max(axis=1)).all()
+        assert (data['Low'] <= data[['Open', 'Close']].min(axis=1)).all()
+        assert (data['Low'] > 0).all() and (data['Volume'] > 0).all()
+
+    # نفس السهم والبذرة = نفس الشموع مهما كان حجم الدفعة
+    chunked = pd.concat(SyntheticMarket(us).chunks(end='2024-12-31', interval='5m', sessions=20,
+                                                   sessions_per_chunk=3))
+    assert chunked.index.equals(intraday.index)
+    assert np.allclose(chunked.to_numpy(), intraday.to_numpy(), rtol=1e-10)
+    assert not SyntheticMarket(us, seed=1).generate(end='2024-12-31', sessions=50)['Close'].equals(
+        SyntheticMarket(us).generate(end='2024-12-31', sessions=50)['Close'])
+
+    print(f"✅ نجح | {len(daily)} يوم و {len(intraday)} شمعة 5 دقائق")
+
+
+def test_write_fixtures_for_replay():
+    """اختبار قراءة الملفات المكتوبة عبر ReplayProvider والتحليل الفني"""
+    print_section("اختبار كتابة الشموع")
+
+    symbols = synthetic_symbols(4)
+    folder = tempfile.mkdtemp()
+    try:
+        paths = write_fixtures(symbols, folder, end='2024-12-31', sessions=260, sessions_per_chunk=40)
+        assert len(paths) == 4
+
+        replay = ReplayProvider(folder)
+        for symbol in symbols:
+            data = replay.get_history(symbol, "1d")
+            expected = SyntheticMarket(symbol).generate(end='2024-12-31', sessions=260)
+            assert len(data) == 260
+            assert np.allclose(data['Close'].to_numpy(), expected['Close'].to_numpy())
+
+        analyzer = TechnicalAnalyzer(symbols[1])
+        analyzer.set_data(replay.get_history(symbols[1], "1d"))
+        assert analyzer.generate_signals()['recommendation']
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print("✅ نجح")
+
+
+if __name__ == "__main__":
+    test_calendars_and_bars()
+    test_write_fixtures_for_replay()
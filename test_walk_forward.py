@@ -0,0 +1,90 @@
+"""
+🧪 اختبار التحسين المتدحرج
+يتحقق من توازي النوافذ وحفظ نتائجها وإعادة استخدامها عند إضافة بيانات جديدة
+"""
+
+import shutil
+import tempfile
+from walk_forward import WalkForward
+from sample_bars import make_bars
+
+
+def print_section(title):
+    """طباعة عنوان القسم"""
+    print("\n" + "="*70)
+    print(f"🧪 {title}")
+    print("="*70 + "\n")
+
+
+SPACE = {'volume_ratio': [1.2, 1.5, 2.0], 'min_confidence': [50, 70]}
+
+
+def test_walk_forward_windows_and_cache():
+    """اختبار النوافذ المتوازية وإعادة استخدام النوافذ المحفوظة"""
+    print_section("اختبار التحسين المتدحرج")
+
+    full = {'AAPL': make_bars(800, 0), 'MSFT': make_bars(800, 1)}
+    frames = {symbol: data.iloc[:700] for symbol, data in full.items()}
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        def walk_forward(max_workers, directory=cache_dir):
+            return WalkForward('breakout', SPACE, train_bars=200, test_bars=100,
+                               max_workers=max_workers, cache_dir=directory)
+
+        parallel = walk_forward(2).run(frames=frames)
+        serial = walk_forward(1, "").run(frames=frames)
+        assert len(parallel['windows']) == 4
+        assert parallel['computed_windows'] == 4
+        assert parallel['windows'].equals(serial['windows'])
+        assert parallel['equity'].equals(serial['equity'])
+        assert set(parallel['equity'].columns) == {'AAPL', 'MSFT', 'Portfolio'}
+
+        # نفس البيانات: كل النوافذ من القرص
+        again = walk_forward(2).run(frames=frames)
+        assert again['cached_windows'] == 4 and again['computed_windows'] == 0
+        assert again['windows'].equals(parallel['windows'])
+        assert again['equity'].equals(parallel['equity'])
+
+        # شموع جديدة تكمل نافذة إضافية: تحسب النافذة الجديدة فقط
+        extended = walk_forward(2).run(frames=full)
+        assert len(extended['windows']) == 5
+        assert extended['cached_windows'] == 4 and extended['computed_windows'] == 1
+        assert extended['windows'].iloc[:4].equals(parallel['windows'])
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"✅ نجح | العائد خارج العينة: {extended['total_return']:.2f}% | "
+          f"أقصى تراجع: {extended['max_drawdown']:.2f}%")
+
+
+def test_rolling_data_with_anchor():
+    """اختبار أن إسقاط الشموع الأقدم لا يبطل النوافذ التي لا تعتمد عليها"""
+    print_section("اختبار النافذة المتدحرجة مع بداية ثابتة")
+
+    full = {'AAPL': make_bars(800, 0), 'MSFT': make_bars(800, 1)}
+    anchor = full['AAPL'].index[50]
+    cache_dir = tempfile.mkdtemp()
+    try:
+        def walk_forward(directory=cache_dir):
+            return WalkForward('breakout', SPACE, train_bars=200, test_bars=100, anchor=anchor,
+                               max_workers=1, cache_dir=directory)
+
+        first = walk_forward().run(frames={symbol: data.iloc[:700] for symbol, data in full.items()})
+        # نفس الفترة بعد 40 يوماً: أقدم 40 شمعة سقطت
+        rolled_frames = {symbol: data.iloc[40:740] for symbol, data in full.items()}
+        rolled = walk_forward().run(frames=rolled_frames)
+        assert len(first['windows']) == 4 and len(rolled['windows']) == 4
+        assert rolled['windows'].equals(first['windows'])
+        # النافذتان الأوليان تقرآن شموعاً سقطت (فترة الإحماء) فتحسبان من جديد
+        assert rolled['cached_windows'] == 2 and rolled['computed_windows'] == 2
+        assert rolled['windows'].equals(walk_forward("").run(frames=rolled_frames)['windows'])
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"✅ نجح | {rolled['cached_windows']} من القرص")
+
+
+if __name__ == "__main__":
+    test_walk_forward_windows_and_cache()
+    test_rolling_data_with_anchor()
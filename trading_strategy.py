@@ -3,21 +3,101 @@
 يحتوي على عدة استراتيجيات للتداول الآلي
 """
 
-from typing import Dict, List, Optional
+import json
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from technical_analysis import TechnicalAnalyzer
+from backtester import run_backtest, WARMUP_BARS, MIN_CONFIDENCE
+from backtest_cache import strategy_fingerprint
+from result_cache import get_result_cache
+
+
+def _column(values: Dict[str, np.ndarray], key: str) -> np.ndarray:
+    """عمود من القيم (المؤشر غير المحسوب أو غير المسموح = قيم فارغة)"""
+    column = values.get(key)
+    if column is None:
+        return np.full(len(values['Close']), np.nan)
+    return column
+
+
+def _truthy(*columns: np.ndarray) -> np.ndarray:
+    """مكافئ all([...]) للقيم المفردة: القيمة الفارغة والصفر تعتبران خاطئتين"""
+    mask = np.ones(len(columns[0]), dtype=bool)
+    for column in columns:
+        mask &= ~np.isnan(column) & (column != 0)
+    return mask
+
+
+def series_values(analyzer: TechnicalAnalyzer, names: Optional[List[str]]) -> Dict[str, np.ndarray]:
+    """أعمدة السعر والمؤشرات المطلوبة لكل الشموع كمصفوفات"""
+    indicators = analyzer.ensure_indicators(names)
+    values = {
+        'Close': analyzer.data['Close'].to_numpy(dtype=float),
+        'Volume': analyzer.data['Volume'].to_numpy(dtype=float),
+    }
+    values.update({key: series.to_numpy(dtype=float) for key, series in indicators.items()})
+    return values
+
+
+def latest_values(analyzer: TechnicalAnalyzer, names: Optional[List[str]]) -> Dict[str, np.ndarray]:
+    """أحدث القيم كمصفوفات بطول 1 (None = قيمة فارغة)"""
+    latest = analyzer.get_latest_values(names)
+    return {
+        key: np.array([np.nan if value is None else value], dtype=float)
+        for key, value in latest.items() if key not in ('Symbol', 'Timestamp')
+    }
 
 
 class TradingStrategy:
-    """استراتيجية التداول الأساسية"""
+    """
+    استراتيجية التداول الأساسية
+    القواعد تكتب مرة واحدة في evaluate على مصفوفات القيم:
+    - signal_series: الإجراء والثقة لكل الشموع دفعة واحدة
+    - generate_signal: إشارة آخر شمعة (نفس القواعد على مصفوفات بطول 1)
+    """
+    
+    # المؤشرات التي تقرأها الاستراتيجية (مجموعات أو مفاتيح) - None = كل المؤشرات
+    required_indicators: Optional[List[str]] = None
     
     def __init__(self, name: str):
         self.name = name
+    
+    def evaluate(self, values: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, List[Tuple[np.ndarray, str]]]:
+        """
+        تطبيق قواعد الاستراتيجية على كل الشموع
+        :param values: أعمدة السعر والمؤشرات {key: ndarray}
+        :return: (الإجراءات, الثقة, [(الشموع التي ينطبق عليها السبب, نص السبب)])
+        """
+        raise NotImplementedError("يجب تطبيق هذه الدالة في الفئة المشتقة")
+    
+    def signal_series(self, analyzer: TechnicalAnalyzer) -> pd.DataFrame:
+        """الإجراء والثقة لكل شمعة في بيانات المحلل"""
+        values = series_values(analyzer, self.required_indicators)
+        actions, confidence, _ = self.evaluate(values)
+        return pd.DataFrame({'action': actions, 'confidence': confidence}, index=analyzer.data.index)
         
     def generate_signal(self, analyzer: TechnicalAnalyzer) -> Dict:
-        """توليد إشارة تداول"""
-        raise NotImplementedError("يجب تطبيق هذه الدالة في الفئة المشتقة")
+        """توليد إشارة تداول لآخر شمعة"""
+        values = latest_values(analyzer, self.required_indicators)
+        actions, confidence, reasons = self.evaluate(values)
+        latest = {key: column[0] for key, column in values.items()}
+        
+        return {
+            'strategy': self.name,
+            'action': actions[0],
+            'confidence': float(confidence[0]),
+            'reasons': [text.format(**latest) for mask, text in reasons if mask[0]]
+        }
+
+
+def _decide(conditions: List[np.ndarray], actions: List[str],
+            confidences: List) -> Tuple[np.ndarray, np.ndarray]:
+    """أول شرط متحقق يحدد الإجراء والثقة (الباقي HOLD بثقة 0)"""
+    action = np.select(conditions, actions, 'HOLD').astype(object)
+    confidence = np.select(conditions, confidences, 0.0).astype(float)
+    return action, confidence
 
 
 class MomentumStrategy(TradingStrategy):
@@ -26,54 +106,42 @@ class MomentumStrategy(TradingStrategy):
     تعتمد على RSI و MACD لتحديد نقاط الدخول والخروج
     """
     
-    def __init__(self):
+    required_indicators = ['RSI', 'MACD']
+    
+    def __init__(self, rsi_oversold: float = 30, rsi_overbought: float = 70):
         super().__init__("Momentum Strategy")
-        self.rsi_oversold = 30
-        self.rsi_overbought = 70
-        
-    def generate_signal(self, analyzer: TechnicalAnalyzer) -> Dict:
-        latest = analyzer.get_latest_values()
-        
-        signal = {
-            'strategy': self.name,
-            'action': 'HOLD',
-            'confidence': 0,
-            'reasons': []
-        }
-        
-        rsi = latest.get('RSI')
-        macd = latest.get('MACD')
-        macd_signal = latest.get('MACD_Signal')
+        self.rsi_oversold = rsi_oversold
+        self.rsi_overbought = rsi_overbought
         
-        # شروط الشراء
-        buy_score = 0
-        if rsi and rsi < self.rsi_oversold:
-            buy_score += 2
-            signal['reasons'].append(f"RSI منخفض ({rsi:.2f})")
+    def evaluate(self, values: Dict[str, np.ndarray]):
+        rsi = _column(values, 'RSI')
+        macd = _column(values, 'MACD')
+        macd_signal = _column(values, 'MACD_Signal')
         
-        if macd and macd_signal and macd > macd_signal:
-            buy_score += 2
-            signal['reasons'].append("MACD صاعد")
+        has_rsi = _truthy(rsi)
+        has_macd = _truthy(macd, macd_signal)
         
-        # شروط البيع
-        sell_score = 0
-        if rsi and rsi > self.rsi_overbought:
-            sell_score += 2
-            signal['reasons'].append(f"RSI مرتفع ({rsi:.2f})")
+        rsi_low = has_rsi & (rsi < self.rsi_oversold)
+        macd_up = has_macd & (macd > macd_signal)
+        rsi_high = has_rsi & (rsi > self.rsi_overbought)
+        macd_down = has_macd & (macd < macd_signal)
         
-        if macd and macd_signal and macd < macd_signal:
-            sell_score += 2
-            signal['reasons'].append("MACD هابط")
+        # شروط الشراء والبيع
+        buy_score = 2 * rsi_low + 2 * macd_up
+        sell_score = 2 * rsi_high + 2 * macd_down
         
         # اتخاذ القرار
-        if buy_score >= 3:
-            signal['action'] = 'BUY'
-            signal['confidence'] = min(buy_score * 25, 100)
-        elif sell_score >= 3:
-            signal['action'] = 'SELL'
-            signal['confidence'] = min(sell_score * 25, 100)
-        
-        return signal
+        actions, confidence = _decide(
+            [buy_score >= 3, sell_score >= 3], ['BUY', 'SELL'],
+            [np.minimum(buy_score * 25, 100), np.minimum(sell_score * 25, 100)]
+        )
+        reasons = [
+            (rsi_low, "RSI منخفض ({RSI:.2f})"),
+            (macd_up, "MACD صاعد"),
+            (rsi_high, "RSI مرتفع ({RSI:.2f})"),
+            (macd_down, "MACD هابط"),
+        ]
+        return actions, confidence, reasons
 
 
 class TrendFollowingStrategy(TradingStrategy):
@@ -82,74 +150,56 @@ class TrendFollowingStrategy(TradingStrategy):
     تعتمد على المتوسطات المتحركة
     """
     
-    def __init__(self):
+    required_indicators = ['SMA_20', 'SMA_50', 'EMA_12', 'EMA_26']
+    
+    def __init__(self, min_score: int = 3):
+        """
+        :param min_score: أقل عدد نقاط للشراء أو البيع
+        """
         super().__init__("Trend Following Strategy")
+        self.min_score = min_score
         
-    def generate_signal(self, analyzer: TechnicalAnalyzer) -> Dict:
-        latest = analyzer.get_latest_values()
-        
-        signal = {
-            'strategy': self.name,
-            'action': 'HOLD',
-            'confidence': 0,
-            'reasons': []
-        }
-        
-        price = latest.get('Close')
-        sma_20 = latest.get('SMA_20')
-        sma_50 = latest.get('SMA_50')
-        ema_12 = latest.get('EMA_12')
-        ema_26 = latest.get('EMA_26')
-        
-        if not all([price, sma_20, sma_50, ema_12, ema_26]):
-            return signal
+    def evaluate(self, values: Dict[str, np.ndarray]):
+        price = values['Close']
+        sma_20 = _column(values, 'SMA_20')
+        sma_50 = _column(values, 'SMA_50')
+        ema_12 = _column(values, 'EMA_12')
+        ema_26 = _column(values, 'EMA_26')
         
-        buy_score = 0
-        sell_score = 0
+        valid = _truthy(price, sma_20, sma_50, ema_12, ema_26)
         
         # إشارات الشراء
-        if price > sma_20:
-            buy_score += 1
-            signal['reasons'].append("السعر فوق SMA 20")
-        
-        if price > sma_50:
-            buy_score += 1
-            signal['reasons'].append("السعر فوق SMA 50")
-        
-        if ema_12 > ema_26:
-            buy_score += 2
-            signal['reasons'].append("EMA 12 عبر فوق EMA 26")
-        
-        if sma_20 > sma_50:
-            buy_score += 1
-            signal['reasons'].append("SMA 20 فوق SMA 50 (اتجاه صاعد)")
+        above_20 = valid & (price > sma_20)
+        above_50 = valid & (price > sma_50)
+        ema_up = valid & (ema_12 > ema_26)
+        sma_up = valid & (sma_20 > sma_50)
+        buy_score = above_20.astype(int) + above_50 + 2 * ema_up + sma_up
         
         # إشارات البيع
-        if price < sma_20:
-            sell_score += 1
-            signal['reasons'].append("السعر تحت SMA 20")
-        
-        if price < sma_50:
-            sell_score += 1
-            signal['reasons'].append("السعر تحت SMA 50")
-        
-        if ema_12 < ema_26:
-            sell_score += 2
-            signal['reasons'].append("EMA 12 عبر تحت EMA 26")
-        
-        if sma_20 < sma_50:
-            sell_score += 1
-            signal['reasons'].append("SMA 20 تحت SMA 50 (اتجاه هابط)")
+        below_20 = valid & (price < sma_20)
+        below_50 = valid & (price < sma_50)
+        ema_down = valid & (ema_12 < ema_26)
+        sma_down = valid & (sma_20 < sma_50)
+        sell_score = below_20.astype(int) + below_50 + 2 * ema_down + sma_down
         
         # اتخاذ القرار
-        if buy_score >= 3 and buy_score > sell_score:
-            signal['action'] = 'BUY'
-            signal['confidence'] = min(buy_score * 20, 100)
-        elif sell_score >= 3 and sell_score > buy_score:
-            signal['action'] = 'SELL'
-            signal['confidence'] = min(sell_score * 20, 100)
-        
-        return signal
+        actions, confidence = _decide(
+            [(buy_score >= self.min_score) & (buy_score > sell_score),
+             (sell_score >= self.min_score) & (sell_score > buy_score)],
+            ['BUY', 'SELL'],
+            [np.minimum(buy_score * 20, 100), np.minimum(sell_score * 20, 100)]
+        )
+        reasons = [
+            (above_20, "السعر فوق SMA 20"),
+            (above_50, "السعر فوق SMA 50"),
+            (ema_up, "EMA 12 عبر فوق EMA 26"),
+            (sma_up, "SMA 20 فوق SMA 50 (اتجاه صاعد)"),
+            (below_20, "السعر تحت SMA 20"),
+            (below_50, "السعر تحت SMA 50"),
+            (ema_down, "EMA 12 عبر تحت EMA 26"),
+            (sma_down, "SMA 20 تحت SMA 50 (اتجاه هابط)"),
+        ]
+        return actions, confidence, reasons
 
 
 class BreakoutStrategy(TradingStrategy):
@@ -158,47 +208,40 @@ class BreakoutStrategy(TradingStrategy):
     تعتمد على نطاقات بولينجر والحجم
     """
     
-    def __init__(self):
+    required_indicators = ['BB_High', 'BB_Low', 'BB_Width', 'Volume_Ratio']
+    
+    def __init__(self, volume_ratio: float = 1.5, squeeze_width: float = 0.1):
+        """
+        :param volume_ratio: أقل نسبة حجم لتأكيد الاختراق
+        :param squeeze_width: عرض نطاق بولينجر الذي يعتبر ضيقاً
+        """
         super().__init__("Breakout Strategy")
-        
-    def generate_signal(self, analyzer: TechnicalAnalyzer) -> Dict:
-        latest = analyzer.get_latest_values()
-        
-        signal = {
-            'strategy': self.name,
-            'action': 'HOLD',
-            'confidence': 0,
-            'reasons': []
-        }
-        
-        price = latest.get('Close')
-        bb_high = latest.get('BB_High')
-        bb_low = latest.get('BB_Low')
-        bb_width = latest.get('BB_Width')
-        volume_ratio = latest.get('Volume_Ratio')
-        
-        if not all([price, bb_high, bb_low, volume_ratio]):
-            return signal
-        
-        # اختراق صعودي
-        if price > bb_high and volume_ratio > 1.5:
-            signal['action'] = 'BUY'
-            signal['confidence'] = 75
-            signal['reasons'].append(f"اختراق صعودي بحجم كبير (نسبة الحجم: {volume_ratio:.2f})")
-        
-        # اختراق هبوطي
-        elif price < bb_low and volume_ratio > 1.5:
-            signal['action'] = 'SELL'
-            signal['confidence'] = 75
-            signal['reasons'].append(f"اختراق هبوطي بحجم كبير (نسبة الحجم: {volume_ratio:.2f})")
-        
-        # نطاق ضيق (احتمال اختراق قريب)
-        elif bb_width and bb_width < 0.1:
-            signal['action'] = 'WATCH'
-            signal['confidence'] = 50
-            signal['reasons'].append("نطاق بولينجر ضيق - ترقب اختراق")
-        
-        return signal
+        self.volume_ratio = volume_ratio
+        self.squeeze_width = squeeze_width
+        
+    def evaluate(self, values: Dict[str, np.ndarray]):
+        price = values['Close']
+        bb_high = _column(values, 'BB_High')
+        bb_low = _column(values, 'BB_Low')
+        bb_width = _column(values, 'BB_Width')
+        volume_ratio = _column(values, 'Volume_Ratio')
+        
+        valid = _truthy(price, bb_high, bb_low, volume_ratio)
+        
+        # اختراق صعودي ثم هبوطي ثم نطاق ضيق (احتمال اختراق قريب)
+        breakout_up = valid & (price > bb_high) & (volume_ratio > self.volume_ratio)
+        breakout_down = valid & ~breakout_up & (price < bb_low) & (volume_ratio > self.volume_ratio)
+        squeeze = valid & ~breakout_up & ~breakout_down & _truthy(bb_width) & (bb_width < self.squeeze_width)
+        
+        actions, confidence = _decide(
+            [breakout_up, breakout_down, squeeze], ['BUY', 'SELL', 'WATCH'], [75, 75, 50]
+        )
+        reasons = [
+            (breakout_up, "اختراق صعودي بحجم كبير (نسبة الحجم: {Volume_Ratio:.2f})"),
+            (breakout_down, "اختراق هبوطي بحجم كبير (نسبة الحجم: {Volume_Ratio:.2f})"),
+            (squeeze, "نطاق بولينجر ضيق - ترقب اختراق"),
+        ]
+        return actions, confidence, reasons
 
 
 class MeanReversionStrategy(TradingStrategy):
@@ -207,47 +250,41 @@ class MeanReversionStrategy(TradingStrategy):
     تعتمد على افتراض أن السعر يعود للمتوسط
     """
     
-    def __init__(self):
+    required_indicators = ['BB_High', 'BB_Low', 'BB_Mid', 'RSI']
+    
+    def __init__(self, rsi_oversold: float = 30, rsi_overbought: float = 70, mid_band: float = 0.01):
+        """
+        :param mid_band: المسافة النسبية من المتوسط التي تعتبر "قريبة"
+        """
         super().__init__("Mean Reversion Strategy")
-        
-    def generate_signal(self, analyzer: TechnicalAnalyzer) -> Dict:
-        latest = analyzer.get_latest_values()
-        
-        signal = {
-            'strategy': self.name,
-            'action': 'HOLD',
-            'confidence': 0,
-            'reasons': []
-        }
-        
-        price = latest.get('Close')
-        bb_high = latest.get('BB_High')
-        bb_low = latest.get('BB_Low')
-        bb_mid = latest.get('BB_Mid')
-        rsi = latest.get('RSI')
-        
-        if not all([price, bb_high, bb_low, bb_mid, rsi]):
-            return signal
-        
-        # شراء عند التشبع البيعي
-        if price < bb_low and rsi < 30:
-            signal['action'] = 'BUY'
-            signal['confidence'] = 80
-            signal['reasons'].append("السعر تحت النطاق السفلي مع RSI منخفض")
-        
-        # بيع عند التشبع الشرائي
-        elif price > bb_high and rsi > 70:
-            signal['action'] = 'SELL'
-            signal['confidence'] = 80
-            signal['reasons'].append("السعر فوق النطاق العلوي مع RSI مرتفع")
-        
-        # الاقتراب من المتوسط
-        elif abs(price - bb_mid) / bb_mid < 0.01:
-            signal['action'] = 'HOLD'
-            signal['confidence'] = 60
-            signal['reasons'].append("السعر قريب من المتوسط")
-        
-        return signal
+        self.rsi_oversold = rsi_oversold
+        self.rsi_overbought = rsi_overbought
+        self.mid_band = mid_band
+        
+    def evaluate(self, values: Dict[str, np.ndarray]):
+        price = values['Close']
+        bb_high = _column(values, 'BB_High')
+        bb_low = _column(values, 'BB_Low')
+        bb_mid = _column(values, 'BB_Mid')
+        rsi = _column(values, 'RSI')
+        
+        valid = _truthy(price, bb_high, bb_low, bb_mid, rsi)
+        
+        # شراء عند التشبع البيعي ثم بيع عند التشبع الشرائي ثم الاقتراب من المتوسط
+        oversold = valid & (price < bb_low) & (rsi < self.rsi_oversold)
+        overbought = valid & ~oversold & (price > bb_high) & (rsi > self.rsi_overbought)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            near_mid = valid & ~oversold & ~overbought & (np.abs(price - bb_mid) / bb_mid < self.mid_band)
+        
+        actions, confidence = _decide(
+            [oversold, overbought, near_mid], ['BUY', 'SELL', 'HOLD'], [80, 80, 60]
+        )
+        reasons = [
+            (oversold, "السعر تحت النطاق السفلي مع RSI منخفض"),
+            (overbought, "السعر فوق النطاق العلوي مع RSI مرتفع"),
+            (near_mid, "السعر قريب من المتوسط"),
+        ]
+        return actions, confidence, reasons
 
 
 class CompositeStrategy:
@@ -256,12 +293,88 @@ class CompositeStrategy:
     """
     
     def __init__(self):
+        self.name = "Composite Strategy"
         self.strategies = [
             MomentumStrategy(),
             TrendFollowingStrategy(),
             BreakoutStrategy(),
             MeanReversionStrategy()
         ]
+    
+    @property
+    def required_indicators(self) -> Optional[List[str]]:
+        """اتحاد المؤشرات التي تحتاجها الاستراتيجيات (None = كل المؤشرات)"""
+        names = []
+        for strategy in self.strategies:
+            if strategy.required_indicators is None:
+                return None
+            names.extend(name for name in strategy.required_indicators if name not in names)
+        return names
+    
+    @staticmethod
+    def vote(actions: List[np.ndarray], confidences: List[np.ndarray], size: int) -> Dict[str, np.ndarray]:
+        """
+        تجميع إشارات الاستراتيجيات بالتصويت لكل الشموع
+        :param actions: إجراءات كل استراتيجية (مصفوفة لكل استراتيجية)
+        :param confidences: ثقة كل استراتيجية
+        :param size: عدد الشموع
+        """
+        actions = np.array(actions, dtype=object).reshape(-1, size)
+        confidences = np.array(confidences, dtype=float).reshape(-1, size)
+        
+        buys = actions == 'BUY'
+        sells = actions == 'SELL'
+        buy_votes = buys.sum(axis=0)
+        sell_votes = sells.sum(axis=0)
+        hold_votes = (actions == 'HOLD').sum(axis=0)
+        
+        total_buy_confidence = np.where(buys, confidences, 0.0).sum(axis=0)
+        total_sell_confidence = np.where(sells, confidences, 0.0).sum(axis=0)
+        
+        # القرار النهائي
+        buy = (buy_votes > sell_votes) & (buy_votes > hold_votes)
+        sell = ~buy & (sell_votes > buy_votes) & (sell_votes > hold_votes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            action, confidence = _decide(
+                [buy, sell, ~buy & ~sell], ['BUY', 'SELL', 'HOLD'],
+                [np.minimum(total_buy_confidence / buy_votes, 100),
+                 np.minimum(total_sell_confidence / sell_votes, 100), 50]
+            )
+        
+        return {
+            'action': action,
+            'confidence': confidence,
+            'buy_votes': buy_votes,
+            'sell_votes': sell_votes,
+            'hold_votes': hold_votes,
+        }
+    
+    def evaluate_votes(self, values: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """الإشارة المجمعة وعدد الأصوات لكل شمعة من أعمدة القيم"""
+        actions, confidences = [], []
+        for strategy in self.strategies:
+            try:
+                action, confidence, _ = strategy.evaluate(values)
+                actions.append(action)
+                confidences.append(confidence)
+            except NotImplementedError:
+                # استراتيجية بدون قواعد متجهة: الخطأ يصل للمستدعي (strategy_signals في backtester
+                # يعود للتقييم شمعة بشمعة) بدلاً من أن يبتلعه except Exception أدناه
+                raise
+            except Exception as e:
+                print(f"خطأ في استراتيجية {strategy.name}: {str(e)}")
+        
+        return self.vote(actions, confidences, len(values['Close']))
+    
+    def evaluate(self, values: Dict[str, np.ndarray]):
+        """نفس واجهة TradingStrategy.evaluate (بدون أسباب)"""
+        votes = self.evaluate_votes(values)
+        return votes['action'], votes['confidence'], []
+    
+    def signal_series(self, analyzer: TechnicalAnalyzer) -> pd.DataFrame:
+        """الإشارة المجمعة وعدد الأصوات لكل شمعة (المؤشرات تحسب مرة واحدة لكل الاستراتيجيات)"""
+        values = series_values(analyzer, self.required_indicators)
+        return pd.DataFrame(self.evaluate_votes(values), index=analyzer.data.index)
         
     def generate_signal(self, analyzer: TechnicalAnalyzer) -> Dict:
         """توليد إشارة مجمعة من جميع الاستراتيجيات"""
@@ -275,44 +388,29 @@ class CompositeStrategy:
                 print(f"خطأ في استراتيجية {strategy.name}: {str(e)}")
         
         # تجميع الإشارات
-        buy_votes = sum(1 for s in signals if s['action'] == 'BUY')
-        sell_votes = sum(1 for s in signals if s['action'] == 'SELL')
-        hold_votes = sum(1 for s in signals if s['action'] == 'HOLD')
-        
-        total_buy_confidence = sum(s['confidence'] for s in signals if s['action'] == 'BUY')
-        total_sell_confidence = sum(s['confidence'] for s in signals if s['action'] == 'SELL')
+        votes = self.vote([[s['action']] for s in signals], [[s['confidence']] for s in signals], 1)
         
-        # القرار النهائي
-        composite_signal = {
+        return {
             'strategy': 'Composite Strategy',
-            'action': 'HOLD',
-            'confidence': 0,
-            'buy_votes': buy_votes,
-            'sell_votes': sell_votes,
-            'hold_votes': hold_votes,
+            'action': votes['action'][0],
+            'confidence': float(votes['confidence'][0]),
+            'buy_votes': int(votes['buy_votes'][0]),
+            'sell_votes': int(votes['sell_votes'][0]),
+            'hold_votes': int(votes['hold_votes'][0]),
             'details': signals
         }
-        
-        if buy_votes > sell_votes and buy_votes > hold_votes:
-            composite_signal['action'] = 'BUY'
-            composite_signal['confidence'] = min(total_buy_confidence / buy_votes if buy_votes > 0 else 0, 100)
-        elif sell_votes > buy_votes and sell_votes > hold_votes:
-            composite_signal['action'] = 'SELL'
-            composite_signal['confidence'] = min(total_sell_confidence / sell_votes if sell_votes > 0 else 0, 100)
-        else:
-            composite_signal['action'] = 'HOLD'
-            composite_signal['confidence'] = 50
-        
-        return composite_signal
     
     def get_detailed_analysis(self, symbol: str) -> Dict:
-        """تحليل شامل مع جميع الاستراتيجيات"""
+        """تحليل شامل مع جميع الاستراتيجيات (من ذاكرة النتائج حتى تنتهي صلاحيتها)"""
+        key = ('detailed', symbol, json.dumps(strategy_fingerprint(self), sort_keys=True, default=str))
+        return get_result_cache().get(key, symbol, "1d", lambda: self._detailed_analysis(symbol))
+    
+    def _detailed_analysis(self, symbol: str) -> Dict:
         analyzer = TechnicalAnalyzer(symbol)
         analyzer.fetch_data()
-        analyzer.calculate_all_indicators()
         
         signal = self.generate_signal(analyzer)
-        latest = analyzer.get_latest_values()
+        latest = analyzer.get_latest_values(self.required_indicators)
         
         return {
             'symbol': symbol,
@@ -324,13 +422,33 @@ class CompositeStrategy:
 
 
 def backtest_strategy(symbol: str, strategy: TradingStrategy, 
-                     period: str = "1y", initial_capital: float = 10000) -> Dict:
+                     period: str = "1y", initial_capital: float = 10000,
+                     data: pd.DataFrame = None, vectorized: bool = True,
+                     min_confidence: float = MIN_CONFIDENCE, cache=None,
+                     start: pd.Timestamp = None) -> Dict:
     """
     اختبار خلفي لاستراتيجية على بيانات تاريخية
+    :param data: بيانات جاهزة بدلاً من جلبها
+    :param start: جلب الشموع من وقت ثابت بدلاً من بداية period (عبر مخزن الشموع مثل period)
+                  مع cache: الأيام الجديدة تكمل محاكاة الصفقات من القرص (المؤشرات والإشارات تحسب كاملة)
+    :param vectorized: حساب المؤشرات مرة واحدة ثم تنفيذ الإشارات في مرور واحد
+                       (False = إعادة حساب المؤشرات على البيانات حتى كل شمعة - أبطأ بكثير وبنفس النتيجة)
+    :param min_confidence: أقل ثقة لتنفيذ الإشارة
+    :param cache: ذاكرة النتائج على القرص (BacktestCache) - تستخدم المحرك السريع دائماً
     """
     analyzer = TechnicalAnalyzer(symbol, period=period)
-    analyzer.fetch_data()
-    analyzer.calculate_all_indicators()
+    if data is not None:
+        analyzer.set_data(data)
+    else:
+        analyzer.fetch_data(start=start)
+    
+    if cache is not None:
+        return cache.run(symbol, strategy, analyzer.data, analyzer.interval, initial_capital,
+                         min_confidence=min_confidence)
+    
+    if vectorized:
+        return run_backtest(symbol, strategy, analyzer.data, initial_capital,
+                            min_confidence=min_confidence)
     
     capital = initial_capital
     shares = 0
@@ -338,17 +456,17 @@ def backtest_strategy(symbol: str, strategy: TradingStrategy,
     
     data = analyzer.data
     
-    for i in range(50, len(data)):  # نبدأ من 50 لضمان وجود بيانات كافية للمؤشرات
+    for i in range(WARMUP_BARS, len(data)):  # نبدأ من 50 لضمان وجود بيانات كافية للمؤشرات
         # إنشاء محلل مؤقت للبيانات حتى هذه النقطة
         temp_analyzer = TechnicalAnalyzer(symbol)
         temp_analyzer.data = data.iloc[:i+1]
-        temp_analyzer.calculate_all_indicators()
+        # الاستراتيجية تحسب المؤشرات التي تحتاجها فقط
         
         signal = strategy.generate_signal(temp_analyzer)
         current_price = data['Close'].iloc[i]
         
         # تنفيذ الإشارة
-        if signal['action'] == 'BUY' and signal['confidence'] > 60 and shares == 0:
+        if signal['action'] == 'BUY' and signal['confidence'] > min_confidence and shares == 0:
             shares = capital / current_price
             capital = 0
             trades.append({
@@ -359,7 +477,7 @@ def backtest_strategy(symbol: str, strategy: TradingStrategy,
                 'confidence': signal['confidence']
             })
         
-        elif signal['action'] == 'SELL' and signal['confidence'] > 60 and shares > 0:
+        elif signal['action'] == 'SELL' and signal['confidence'] > min_confidence and shares > 0:
             capital = shares * current_price
             trades.append({
                 'date': data.index[i],
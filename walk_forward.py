@@ -0,0 +1,394 @@
+"""
+التحسين المتدحرج (Walk-Forward) لمعاملات الاستراتيجيات
+- أفضل معاملات على نافذة التدريب k تختبر على النافذة التالية ثم تتقدم النوافذ
+- المؤشرات تحسب مرة واحدة على كامل التاريخ وإشارات كل مجموعة معاملات تحسب مرة واحدة
+  ثم تقتطع منها النوافذ المتداخلة (كل المؤشرات سببية)
+- النوافذ تعمل بالتوازي على ذاكرة مشتركة
+- نتيجة كل نافذة تحفظ على القرص بمفتاح من أوقات وقيم الشموع التي تعتمد عليها فقط
+  (فترة إحماء المؤشرات قبل التدريب حتى نهاية الاختبار) - إضافة شموع جديدة تحسب النوافذ الجديدة فقط
+- النوافذ تبدأ من تاريخ ثابت (anchor أو بداية ثابتة للبيانات المجلوبة) لا من أول شمعة في نافذة متدحرجة
+- منحنيات رأس المال خارج العينة توصل ببعضها لكل سهم وللمحفظة
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from backtest_cache import anchored_start
+from backtester import WARMUP_BARS, MIN_CONFIDENCE, simulate_trades, equity_curve, max_drawdown
+from compact_storage import CompactBars, SharedBars
+from market_data import OHLCV_COLUMNS
+from param_sweep import STRATEGIES, DEFAULT_SPACES, grid_space, random_space, prepare_bars
+from technical_analysis import fetch_bulk_data
+
+# عدد الشموع قبل بداية التدريب التي تؤثر على المؤشرات (أطولها SMA_200)
+INDICATOR_LOOKBACK = 200
+
+
+class WindowEvaluator:
+    """تقييم مجموعات المعاملات على أجزاء من نفس الكتل (الإشارات تحفظ لكل مجموعة معاملات)"""
+
+    def __init__(self, items: Dict[str, CompactBars], strategy: str, initial_capital: float = 10000):
+        self.items = items
+        self.strategy = strategy
+        self.initial_capital = initial_capital
+        self._signals: Dict[tuple, Dict[str, tuple]] = {}
+        self._indexes = {}
+
+    def signals(self, params: Dict) -> Dict[str, tuple]:
+        """إشارات كل الأسهم على كامل التاريخ لمجموعة معاملات {symbol: (الإجراءات, الثقة)}"""
+        params = {k: v for k, v in params.items() if k != 'min_confidence'}
+        key = tuple(sorted(params.items()))
+        if key not in self._signals:
+            strategy = STRATEGIES[self.strategy](**params)
+            signals = {}
+            for symbol, bars in self.items.items():
+                values = {name: bars.column(name) for name in bars.columns}
+                actions, confidence, _ = strategy.evaluate(values)
+                signals[symbol] = (actions, confidence)
+            self._signals[key] = signals
+        return self._signals[key]
+
+    def index(self, symbol: str) -> pd.DatetimeIndex:
+        if symbol not in self._indexes:
+            self._indexes[symbol] = self.items[symbol].index
+        return self._indexes[symbol]
+
+    def evaluate(self, params: Dict, begin: int, end: int) -> Dict[str, Dict]:
+        """
+        اختبار مجموعة معاملات على الشموع بين وقتين (بدون تداول قبل begin ومركز مغلق عند end)
+        :param begin: بداية النافذة (نانو ثانية UTC)
+        :param end: نهاية النافذة (غير شاملة)
+        """
+        min_confidence = params.get('min_confidence', MIN_CONFIDENCE)
+        results = {}
+        for symbol, (actions, confidence) in self.signals(params).items():
+            bars = self.items[symbol]
+            start, stop = np.searchsorted(bars.timestamps, [begin, end])
+            if stop - start < 2:
+                continue
+
+            index = self.index(symbol)[start:stop]
+            close = bars.column('Close')[start:stop]
+            capital, trades = simulate_trades(index, close, actions[start:stop], confidence[start:stop],
+                                              self.initial_capital, min_confidence=min_confidence)
+            equity = equity_curve(index, close, trades, self.initial_capital)
+            results[symbol] = {
+                'total_return': ((capital - self.initial_capital) / self.initial_capital) * 100,
+                'max_drawdown': max_drawdown(equity),
+                'num_trades': len([t for t in trades if t['action'] == 'BUY']),
+                'timestamps': bars.timestamps[start:stop],
+                'equity': equity,
+            }
+        return results
+
+    def run_window(self, window: Dict, parameter_sets: List[Dict]) -> Dict:
+        """أفضل معاملات على فترة التدريب ثم اختبارها على الفترة التالية"""
+        best, best_score = None, None
+        for params in parameter_sets:
+            train = self.evaluate(params, window['train_start'], window['test_start'])
+            if not train:
+                continue
+            score = float(np.mean([r['total_return'] for r in train.values()]))
+            if best_score is None or score > best_score:
+                best, best_score = params, score
+
+        test = self.evaluate(best, window['test_start'], window['test_end']) if best is not None else {}
+        return {
+            **window,
+            'params': best,
+            'train_return': best_score,
+            'test': test,
+        }
+
+
+# ==================== العمليات العاملة ====================
+
+_shared = None
+_evaluator = None
+
+
+def _init_worker(name: str, layout: Dict[str, Dict], strategy: str, initial_capital: float):
+    """فتح الذاكرة المشتركة مرة واحدة لكل عملية"""
+    global _shared, _evaluator
+    _shared = SharedBars.attach(name, layout)
+    items = {symbol: _shared.get(symbol) for symbol in _shared.symbols}
+    _evaluator = WindowEvaluator(items, strategy, initial_capital)
+
+
+def _run_window(task) -> Dict:
+    window, parameter_sets = task
+    return _evaluator.run_window(window, parameter_sets)
+
+
+class WalkForward:
+    """خط التحسين المتدحرج لاستراتيجية على مجموعة أسهم"""
+
+    def __init__(self, strategy: str, space: Dict = None, search: str = "grid",
+                 samples: int = 50, seed: int = None, train_bars: int = 252, test_bars: int = 63,
+                 anchor: pd.Timestamp = None, max_workers: int = None,
+                 initial_capital: float = 10000, cache_dir: str = None):
+        """
+        :param strategy: اسم الاستراتيجية (momentum, trend, breakout, mean_reversion, composite)
+        :param space: فضاء المعاملات (الافتراضي DEFAULT_SPACES)
+        :param train_bars: طول نافذة التدريب بالشموع
+        :param test_bars: طول نافذة الاختبار بالشموع (وهو أيضاً خطوة التقدم)
+        :param anchor: بداية أول نافذة - ثابتة حتى تبقى النوافذ السابقة كما هي عند إضافة بيانات
+                       (الافتراضي: أول شمعة بعد فترة الإحماء)
+        :param max_workers: عدد العمليات (1 = في نفس العملية)
+        :param cache_dir: مجلد نتائج النوافذ (None = من config، "" = بدون حفظ)
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"استراتيجية غير معروفة: {strategy}")
+
+        self.strategy = strategy
+        self.space = space or DEFAULT_SPACES[strategy]
+        self.search = search
+        self.samples = samples
+        self.seed = seed
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.anchor = pd.Timestamp(anchor) if anchor is not None else None
+        self.max_workers = max_workers or config.SWEEP_MAX_WORKERS or os.cpu_count() or 1
+        self.initial_capital = initial_capital
+        self.cache_dir = config.WALK_FORWARD_CACHE_DIR if cache_dir is None else cache_dir
+
+        # إحصائيات
+        self.cached_windows = 0
+        self.computed_windows = 0
+
+    def parameter_sets(self) -> List[Dict]:
+        """مجموعات المعاملات التي تختبر في كل نافذة"""
+        if self.search == "random":
+            return random_space(self.space, self.samples, self.seed)
+        return grid_space(self.space)
+
+    # ==================== النوافذ ====================
+
+    def windows(self, items: Dict[str, CompactBars]) -> List[Dict]:
+        """
+        حدود النوافذ على التقويم المشترك للأسهم (نانو ثانية UTC)
+        النافذة الأخيرة تضاف فقط عند اكتمال فترة الاختبار
+        """
+        calendar = np.unique(np.concatenate([bars.timestamps for bars in items.values()]))
+        if self.anchor is not None:
+            anchor = self.anchor if self.anchor.tz is not None else self.anchor.tz_localize('UTC')
+            first = int(np.searchsorted(calendar, anchor.value))
+        else:
+            first = WARMUP_BARS
+
+        windows = []
+        start = first
+        while start + self.train_bars + self.test_bars <= len(calendar):
+            test_start = start + self.train_bars
+            test_stop = test_start + self.test_bars
+            windows.append({
+                'train_start': int(calendar[start]),
+                'test_start': int(calendar[test_start]),
+                # نهاية غير شاملة: أول شمعة بعد النافذة أو ما بعد آخر شمعة
+                'test_end': int(calendar[test_stop]) if test_stop < len(calendar) else int(calendar[-1]) + 1,
+            })
+            start += self.test_bars
+        return windows
+
+    def _window_key(self, window: Dict, items: Dict[str, CompactBars], parameter_sets: List[Dict]) -> str:
+        """
+        مفتاح النافذة: الإعدادات + أوقات وقيم الشموع من INDICATOR_LOOKBACK شمعة قبل التدريب
+        حتى نهاية الاختبار (الشموع الأقدم أو اللاحقة لا تغيره)
+        """
+        digest = hashlib.sha1()
+        digest.update(json.dumps({
+            'strategy': self.strategy,
+            'parameter_sets': parameter_sets,
+            'window': window,
+            'initial_capital': self.initial_capital,
+        }, sort_keys=True, default=str).encode())
+
+        for symbol in sorted(items):
+            bars = items[symbol]
+            begin, stop = np.searchsorted(bars.timestamps, [window['train_start'], window['test_end']])
+            begin = max(0, int(begin) - INDICATOR_LOOKBACK)
+            digest.update(symbol.encode())
+            digest.update(bars.timestamps[begin:stop].tobytes())
+            for name in OHLCV_COLUMNS:
+                if name in bars:
+                    digest.update(np.ascontiguousarray(bars.column(name)[begin:stop]).tobytes())
+        return digest.hexdigest()
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, self.strategy, f"{key}.npz")
+
+    def _load_window(self, key: str) -> Optional[Dict]:
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                result = json.loads(str(archive['meta']))
+                for i, symbol in enumerate(result['symbols']):
+                    result['test'][symbol]['timestamps'] = archive[f"timestamps_{i}"]
+                    result['test'][symbol]['equity'] = archive[f"equity_{i}"]
+                del result['symbols']
+        except Exception:
+            # ملف تالف - تعاد النافذة
+            return None
+        return result
+
+    def _save_window(self, key: str, result: Dict):
+        """حفظ نتيجة النافذة (كتابة ذرية عبر ملف مؤقت)"""
+        if not self.cache_dir:
+            return
+        path = self._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        symbols = list(result['test'])
+        meta = {key: value for key, value in result.items() if key != 'test'}
+        meta['symbols'] = symbols
+        meta['test'] = {
+            symbol: {k: v for k, v in metrics.items() if k not in ('timestamps', 'equity')}
+            for symbol, metrics in result['test'].items()
+        }
+
+        arrays = {'meta': np.array(json.dumps(meta))}
+        for i, symbol in enumerate(symbols):
+            arrays[f"timestamps_{i}"] = result['test'][symbol]['timestamps']
+            arrays[f"equity_{i}"] = result['test'][symbol]['equity']
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+
+    # ==================== التشغيل ====================
+
+    def run(self, symbols: List[str] = None, frames: Dict[str, pd.DataFrame] = None,
+            period: str = "5y", interval: str = "1d") -> Dict:
+        """
+        تشغيل التحسين المتدحرج
+        :param frames: بيانات جاهزة {symbol: DataFrame} بدلاً من جلبها
+                       (بدون anchor يجب أن تبدأ من تاريخ ثابت حتى تبقى النوافذ السابقة كما هي)
+        :param period: الفترة المجلوبة - بدون anchor تجلب من بداية ثابتة تغطيها (anchored_start)
+        """
+        if frames is None:
+            # بداية أول السنة: النوافذ لا تتحرك إلا مرة في السنة
+            start = anchored_start(period, freq="year") if self.anchor is None else None
+            frames = fetch_bulk_data(symbols or config.WATCHLIST, period, interval, start=start)
+        if not frames:
+            raise ValueError("لا توجد بيانات للتحسين")
+
+        names = STRATEGIES[self.strategy]().required_indicators
+        items = prepare_bars(frames, names)
+        parameter_sets = self.parameter_sets()
+        windows = self.windows(items)
+
+        # النوافذ المحفوظة لا يعاد حسابها
+        results: List[Optional[Dict]] = []
+        pending = []
+        for window in windows:
+            key = self._window_key(window, items, parameter_sets)
+            cached = self._load_window(key)
+            results.append(cached)
+            if cached is None:
+                pending.append((len(results) - 1, key, window))
+        self.cached_windows = len(windows) - len(pending)
+        self.computed_windows = len(pending)
+
+        computed = self._run_windows(items, [window for _, _, window in pending], parameter_sets)
+        for (position, key, _), result in zip(pending, computed):
+            self._save_window(key, result)
+            results[position] = result
+
+        return self.report(items, results)
+
+    def _run_windows(self, items: Dict[str, CompactBars], windows: List[Dict],
+                     parameter_sets: List[Dict]) -> List[Dict]:
+        if not windows:
+            return []
+
+        if self.max_workers <= 1 or len(windows) <= 1:
+            evaluator = WindowEvaluator(items, self.strategy, self.initial_capital)
+            return [evaluator.run_window(window, parameter_sets) for window in windows]
+
+        shared = SharedBars.create(items)
+        try:
+            workers = min(self.max_workers, len(windows))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shared.name, shared.layout, self.strategy,
+                                               self.initial_capital)) as pool:
+                return list(pool.map(_run_window, [(window, parameter_sets) for window in windows]))
+        finally:
+            shared.close()
+
+    def report(self, items: Dict[str, CompactBars], results: List[Dict]) -> Dict:
+        """
+        جدول النوافذ ومنحنيات رأس المال خارج العينة موصولة
+        كل نافذة اختبار تبدأ من رأس مال نهاية النافذة السابقة لنفس السهم
+        """
+        rows = []
+        curves: Dict[str, List[pd.Series]] = {symbol: [] for symbol in items}
+        levels = {symbol: 1.0 for symbol in items}
+
+        for result in results:
+            test = result['test']
+            rows.append({
+                'train_start': pd.Timestamp(result['train_start'], tz='UTC'),
+                'test_start': pd.Timestamp(result['test_start'], tz='UTC'),
+                'test_end': pd.Timestamp(result['test_end'], tz='UTC'),
+                'params': result['params'],
+                'train_return': result['train_return'],
+                'test_return': float(np.mean([r['total_return'] for r in test.values()])) if test else 0.0,
+                'test_drawdown': max((r['max_drawdown'] for r in test.values()), default=0.0),
+                'num_trades': sum(r['num_trades'] for r in test.values()),
+            })
+
+            for symbol, metrics in test.items():
+                index = pd.DatetimeIndex(pd.to_datetime(metrics['timestamps'], utc=True))
+                curve = pd.Series(metrics['equity'] * levels[symbol], index=index)
+                curves[symbol].append(curve)
+                levels[symbol] = curve.iloc[-1] / self.initial_capital
+
+        equity = pd.DataFrame({
+            symbol: pd.concat(parts) for symbol, parts in curves.items() if parts
+        })
+        if not equity.empty:
+            # المحفظة: أوزان متساوية بين الأسهم (آخر قيمة معروفة في الأيام التي لا يتداول فيها السهم)
+            equity['Portfolio'] = equity.ffill().mean(axis=1)
+
+        portfolio = equity['Portfolio'].dropna().to_numpy() if not equity.empty else np.array([])
+        return {
+            'strategy': self.strategy,
+            'windows': pd.DataFrame(rows),
+            'equity': equity,
+            'total_return': ((portfolio[-1] - self.initial_capital) / self.initial_capital * 100)
+                            if len(portfolio) else 0.0,
+            'max_drawdown': max_drawdown(portfolio),
+            'cached_windows': self.cached_windows,
+            'computed_windows': self.computed_windows,
+        }
+
+
+if __name__ == "__main__":
+    # مثال: تحسين متدحرج لاستراتيجية الزخم على أسهم السوق السعودي
+    from markets import group_by_market
+
+    symbols = group_by_market(config.WATCHLIST).get('SA', [])
+    walk_forward = WalkForward('momentum')
+    report = walk_forward.run(symbols, period="5y")
+
+    print("=" * 70)
+    print(f"التحسين المتدحرج لـ {report['strategy']} ({len(report['windows'])} نافذة، "
+          f"{report['cached_windows']} محفوظة)")
+    print("=" * 70)
+    print(report['windows'].to_string())
+    print(f"\nالعائد خارج العينة: {report['total_return']:.2f}%")
+    print(f"أقصى تراجع: {report['max_drawdown']:.2f}%")
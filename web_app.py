@@ -2,16 +2,20 @@
 واجهة ويب تفاعلية للبوت - يشتري ويبيع تلقائياً
 """
 
-from flask import Flask, render_template_string, jsonify, request, session, redirect, url_for
-from technical_analysis import TechnicalAnalyzer, analyze_stock
+from flask import Flask, Response, render_template_string, jsonify, request, session, redirect, url_for, stream_with_context
 from trading_strategy import CompositeStrategy
-from risk_management import RiskManager
+from quote_cache import get_quote, quote_cache
+from metrics import get_metrics, stage
+from single_flight import get_single_flight, render_prometheus as render_single_flight
+from analysis_snapshot import get_snapshot_refresher
+from analysis_api import (CursorError, StaleCursorError, filter_market, paginate, parse_market,
+                          sort_rows, stream_rows)
+from portfolio_stream import PortfolioStream, StreamFullError
 from payment_system import payment_processor, security_manager
 from user_system import user_db
 from whatsapp_notifications import whatsapp_notifier
 from subscription_system import subscription_manager
 import config
-from datetime import datetime
 import threading
 import webbrowser
 import secrets
@@ -1134,8 +1138,52 @@ HTML_TEMPLATE = """
         async function updatePortfolio() {
             try {
                 const response = await fetch('/api/portfolio');
-                const data = await response.json();
+                renderPortfolio(await response.json());
+            } catch (error) {
+                console.error('Error updating portfolio:', error);
+            }
+        }
+        
+        // حالة المحفظة من البث: الحالة كاملة عند الاتصال ثم الفروق فقط عند التغيير
+        let portfolioState = null;
+        
+        function connectPortfolioStream() {
+            if (!window.EventSource) {
+                setInterval(updatePortfolio, 5000); // متصفح بدون دعم البث
+                return;
+            }
+            
+            const source = new EventSource('/api/portfolio/stream');
+            
+            // الخادم رفض الاتصال (امتلأت اتصالات البث): استعلام دوري بدلاً منه
+            source.addEventListener('error', () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    updatePortfolio();
+                    setInterval(updatePortfolio, 5000);
+                }
+            });
+            
+            source.addEventListener('snapshot', event => {
+                portfolioState = JSON.parse(event.data);
+                renderPortfolio(portfolioState);
+            });
+            
+            source.addEventListener('delta', event => {
+                if (!portfolioState) return;
+                const delta = JSON.parse(event.data);
+                Object.assign(portfolioState, delta.set);
+                
+                const positions = new Map(portfolioState.positions.map(pos => [pos.symbol, pos]));
+                delta.remove.forEach(symbol => positions.delete(symbol));
+                delta.upsert.forEach(pos => positions.set(pos.symbol, pos));
+                portfolioState.positions = Array.from(positions.values());
                 
+                renderPortfolio(portfolioState);
+            });
+        }
+        
+        function renderPortfolio(data) {
+            try {
                 if (data.active && data.positions.length > 0) {
                     document.getElementById('portfolio-summary').style.display = 'block';
                     
@@ -1224,8 +1272,11 @@ HTML_TEMPLATE = """
         function displayResults(data) {
             const resultsContainer = document.getElementById('resultsContainer');
             
+            // وقت آخر تحديث للتحليل (يحسب في الخلفية)
+            let html = `<div class="stock-info" style="text-align: center;">🕒 آخر تحديث: ${data.timestamp}${data.stale ? ' ⚠️ قديم' : ''}</div>`;
+            
             // عرض الأسهم
-            let html = '<div class="results">';
+            html += '<div class="results">';
             
             data.stocks.forEach(stock => {
                 let recClass = 'hold';
@@ -1302,7 +1353,7 @@ HTML_TEMPLATE = """
             calculateReturns(); // Initialize calculator
             analyzeStocks(); // تحليل الأسهم
             loadSubscriptionInfo(); // تحميل معلومات الاشتراك
-            setInterval(updatePortfolio, 5000); // Update every 5 seconds
+            connectPortfolioStream(); // تحديث المحفظة عند التغيير فقط
         };
         
         // تسجيل الخروج
@@ -1498,66 +1549,81 @@ def dashboard():
 
 @app.route('/analyze')
 def analyze():
-    """تحليل الأسهم وإرجاع النتائج"""
+    """نتائج تحليل الأسهم من آخر لقطة محسوبة في الخلفية"""
     try:
-        # الأسهم من config
-        watchlist = getattr(config, 'WATCHLIST', ["AAPL", "MSFT", "GOOGL", "TSLA"])[:6]
+        refresher = get_snapshot_refresher().start()
+        snapshot = refresher.get() or refresher.wait_ready(config.ANALYSIS_SNAPSHOT_WAIT)
         
-        results = []
+        # المؤشرات المسموحة في باقة المستخدم - كل باقة لها نتائجها في اللقطة
+        allowed = subscription_manager.get_allowed_indicators(session.get('user_id'))
+        view = snapshot.view(allowed) if snapshot else None
         
-        for symbol in watchlist:
-            try:
-                # تحليل السهم
-                result = analyze_stock(symbol)
-                
-                stock_data = {
-                    'symbol': symbol,
-                    'price': result['analysis']['price'],
-                    'recommendation': result['recommendation'],
-                    'score': result['score'],
-                    'rsi': result['analysis']['rsi_value'],
-                    'buy_signals': result.get('buy_signals', []),
-                    'sell_signals': result.get('sell_signals', [])
-                }
-                
-                results.append(stock_data)
-                
-            except Exception as e:
-                print(f"خطأ في {symbol}: {str(e)}")
-                continue
+        if view is None:
+            refresher.track(allowed)
+            return jsonify({'error': 'جارٍ تجهيز التحليل... حاول بعد قليل'}), 503
         
-        # ترتيب حسب النقاط
-        results.sort(key=lambda x: x['score'], reverse=True)
+        return jsonify({
+            'stocks': view['stocks'],
+            'best_opportunity': view['best_opportunity'],
+            'timestamp': snapshot.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'age_seconds': round(snapshot.age(refresher.clock.now())),
+            'stale': refresher.is_stale(snapshot)
+        })
         
-        # أفضل فرصة
-        best = None
-        if results and results[0]['score'] > 0:
-            best_stock = results[0]
-            
-            # حساب إدارة المخاطر
-            rm = RiskManager(initial_capital=10000, max_risk_per_trade=0.02)
-            entry_price = best_stock['price']
-            stop_loss = entry_price * 0.98
-            take_profit = entry_price * 1.05
-            position_size = rm.calculate_position_size(best_stock['symbol'], entry_price, stop_loss)
-            
-            if position_size > 0:
-                best = {
-                    'symbol': best_stock['symbol'],
-                    'price': entry_price,
-                    'position_size': position_size,
-                    'total_value': position_size * entry_price,
-                    'stop_loss': stop_loss,
-                    'take_profit': take_profit,
-                    'risk_amount': position_size * (entry_price - stop_loss)
-                }
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analysis')
+def analysis_api():
+    """
+    نتائج تحليل قائمة المراقبة كاملة من آخر لقطة محسوبة في الخلفية
+    - صفحات: ?limit=50&cursor=...&sort=score|symbol|price|rsi&order=desc|asc&market=SA|US
+    - بث: ?format=ndjson (أو Accept: application/x-ndjson) - سطر لكل سهم من اللقطة بدون تجميع الرد
+    """
+    try:
+        market = parse_market(request.args.get('market'))
+        sort = request.args.get('sort', 'score')
+        descending = request.args.get('order', 'desc' if sort != 'symbol' else 'asc') != 'asc'
+        limit = request.args.get('limit', type=int)
+        allowed = subscription_manager.get_allowed_indicators(session.get('user_id'))
+        
+        refresher = get_snapshot_refresher().start()
+        snapshot = refresher.get() or refresher.wait_ready(config.ANALYSIS_SNAPSHOT_WAIT)
+        view = snapshot.view(allowed) if snapshot else None
+        if view is None:
+            refresher.track(allowed)
+            return jsonify({'error': 'جارٍ تجهيز التحليل... حاول بعد قليل'}), 503
+        
+        rows = filter_market(view['stocks'], market, lambda row: row['symbol'])
+        meta = {
+            'timestamp': snapshot.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'age_seconds': round(snapshot.age(refresher.clock.now())),
+            'stale': refresher.is_stale(snapshot)
+        }
+        
+        if request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+            return Response(
+                stream_rows(sort_rows(rows, sort, descending), meta),
+                mimetype='application/x-ndjson',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        # المؤشر صالح لنفس اللقطة فقط
+        stocks, next_cursor = paginate(rows, sort, descending, limit, request.args.get('cursor'),
+                                       version=snapshot.updated_at.isoformat())
         
         return jsonify({
-            'stocks': results,
-            'best_opportunity': best,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'stocks': stocks,
+            'next_cursor': next_cursor,
+            'total': len(rows),
+            **meta
         })
         
+    except StaleCursorError as e:
+        return jsonify({'error': str(e)}), 409
+    except (CursorError, ValueError) as e:
+        # مؤشر أو معامل غير صالح
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1603,7 +1669,8 @@ def toggle_trading():
         def run_trading():
             while auto_trading_active:
                 try:
-                    trading_bot.run_once()
+                    with stage("cycle"):
+                        trading_bot.run_once()
                     import time
                     time.sleep(60)  # كل دقيقة
                 except Exception as e:
@@ -1611,35 +1678,34 @@ def toggle_trading():
         
         threading.Thread(target=run_trading, daemon=True).start()
     
+    portfolio_stream.notify()
+    
     return jsonify({
         'active': auto_trading_active,
         'message': 'تم تشغيل التداول التلقائي' if auto_trading_active else 'تم إيقاف التداول'
     })
 
-@app.route('/api/portfolio')
-def get_portfolio():
-    """الحصول على معلومات المحفظة"""
-    global trading_bot, auto_trading_active
-    
+def build_portfolio():
+    """حالة المحفظة الحالية (مشتركة بين /api/portfolio والبث)"""
     if not auto_trading_active or trading_bot is None:
-        return jsonify({
+        return {
             'active': False,
             'positions': [],
             'total_invested': 0,
             'total_profit': 0,
             'total_profit_percent': 0
-        })
+        }
     
     positions_data = []
     total_invested = 0
     total_profit = 0
     
-    for pos in trading_bot.rm.positions:
+    for pos in list(trading_bot.rm.positions.values()):
         # جلب السعر الحالي
         try:
-            import yfinance as yf
-            ticker = yf.Ticker(pos.symbol)
-            current_price = ticker.history(period='1d')['Close'].iloc[-1]
+            current_price = get_quote(pos.symbol)
+            if current_price is None:
+                continue
             
             profit = (current_price - pos.entry_price) * pos.quantity
             profit_percent = ((current_price - pos.entry_price) / pos.entry_price) * 100
@@ -1662,14 +1728,51 @@ def get_portfolio():
     
     total_profit_percent = (total_profit / total_invested * 100) if total_invested > 0 else 0
     
-    return jsonify({
+    return {
         'active': True,
         'positions': positions_data,
         'total_invested': float(total_invested),
         'total_profit': float(total_profit),
         'total_profit_percent': float(total_profit_percent),
         'available_capital': float(trading_bot.rm.current_capital)
-    })
+    }
+
+# منتج واحد لحالة المحفظة يوزع التغييرات على كل المتصفحات المفتوحة
+portfolio_stream = PortfolioStream(build_portfolio)
+
+@app.route('/api/portfolio')
+def get_portfolio():
+    """الحصول على معلومات المحفظة"""
+    return jsonify(build_portfolio())
+
+@app.route('/api/portfolio/stream')
+def stream_portfolio():
+    """
+    بث تغييرات المحفظة (Server-Sent Events) - الحالة كاملة عند الاتصال ثم الفروق فقط
+    عند امتلاء الاتصالات: 503 والمتصفح يستعلم من /api/portfolio دورياً
+    """
+    try:
+        subscriber = portfolio_stream.subscribe()
+    except StreamFullError as e:
+        response = jsonify({'error': str(e), 'fallback': '/api/portfolio'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '60'
+        return response
+    response = Response(
+        stream_with_context(portfolio_stream.events(subscriber)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # الاتصال قد يغلق قبل أول رسالة (المولد لم يبدأ فلا يلغي الاشتراك بنفسه)
+    response.call_on_close(lambda: portfolio_stream.unsubscribe(subscriber))
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """أزمنة مراحل المسح والتداول والطلبات المدمجة بتنسيق Prometheus"""
+    flights = {**get_single_flight().get_stats(), **quote_cache.get_flight_stats()}
+    text = get_metrics().render_prometheus() + render_single_flight(flights)
+    return Response(text, mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/api/payment/card', methods=['POST'])
 def process_card_payment():
@@ -1887,6 +1990,9 @@ if __name__ == '__main__':
     print("⚠️ لإيقاف الخادم: اضغط Ctrl+C\n")
     print("="*70 + "\n")
     
+    # تجهيز لقطة التحليل قبل أول طلب
+    get_snapshot_refresher().start()
+    
     # فتح المتصفح في خيط منفصل
     threading.Timer(1.5, open_browser).start()
     